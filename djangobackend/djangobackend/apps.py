@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 import logging
 import os
 
@@ -16,14 +17,18 @@ class DjangobackendConfig(AppConfig):
         otherwise Django's auto-reloader would create a second thread.
         """
         # Only run in the main Django process (not in the autoreload worker)
-        if os.environ.get('RUN_MAIN') == 'true':
+        # With POLLER_AUTOSTART_IN_WEB off, `manage.py run_poller` polls instead
+        if os.environ.get('RUN_MAIN') == 'true' and settings.POLLER_AUTOSTART_IN_WEB:
             try:
-                from .utils.background_poller import device_poller
+                from .utils.background_poller import get_active_poller, follow_device_registry
                 from .utils.device_storage import get_all_device_ids
 
+                poller = get_active_poller()
+                # Poll devices added later as soon as they are saved
+                follow_device_registry(poller)
                 device_ids = get_all_device_ids()
                 if device_ids:
-                    device_poller.start_polling_all_devices()
+                    poller.start_polling_all_devices()
                     logger.info(f"Auto-started polling for {len(device_ids)} devices: {device_ids}")
                 else:
                     logger.info("No devices found in storage, polling not started")
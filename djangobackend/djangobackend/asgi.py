@@ -2,6 +2,8 @@
 ASGI config for djangobackend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to the monitoring stream (server-sent events fed from Redis pub/sub)
+are served by a plain ASGI app, everything else by Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
@@ -13,4 +15,13 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangobackend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from .utils.monitoring_stream import STREAM_PATH, monitoring_stream_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'http' and scope['path'] == STREAM_PATH:
+        await monitoring_stream_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from djangobackend.utils.redis_manager import monitoring_redis
+
+
+class Command(BaseCommand):
+    help = "Move current monitoring values between per-parameter keys and per-component hashes"
+
+    def add_arguments(self, parser):
+        parser.add_argument('layout', choices=['keys', 'hash'],
+                            help="Target layout, set REDIS_MONITORING_LAYOUT to the same value afterwards")
+        parser.add_argument('--device', help="Only migrate values of this device ID")
+
+    def handle(self, *args, **options):
+        stats = monitoring_redis.migrate_monitoring_layout(options['layout'], device_id=options['device'])
+        self.stdout.write(
+            f"Moved {stats['values']} values of {stats['components']} components to the '{options['layout']}' layout"
+        )
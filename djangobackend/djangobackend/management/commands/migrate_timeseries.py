@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from djangobackend.utils.redis_manager import monitoring_redis
+from djangobackend.utils.timeseries_backends import TIMESERIES_BACKENDS, get_timeseries_backend, migrate_timeseries
+
+
+class Command(BaseCommand):
+    help = "Rewrite monitoring time series keys into another storage backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('backend', choices=sorted(TIMESERIES_BACKENDS),
+                            help="Target backend, set REDIS_TIMESERIES_BACKEND to the same value afterwards")
+        parser.add_argument('--device', help="Only migrate keys of this device ID")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Only count the keys and samples that would be migrated")
+
+    def handle(self, *args, **options):
+        client = monitoring_redis.redis_client
+        try:
+            target = get_timeseries_backend(options['backend'], client)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        match = f"device:{options['device'] or '*'}:timeseries:*"
+        stats = migrate_timeseries(client, target, match=match, dry_run=options['dry_run'])
+
+        verb = "Would migrate" if options['dry_run'] else "Migrated"
+        self.stdout.write(
+            f"{verb} {stats['samples_migrated']} samples in {stats['keys_migrated']} of "
+            f"{stats['keys_scanned']} keys to '{target.name}'"
+        )
+        if stats['failed_keys']:
+            self.stderr.write(f"Failed keys: {', '.join(stats['failed_keys'])}")
@@ -0,0 +1,41 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from djangobackend.utils.background_poller import get_active_poller
+from djangobackend.utils.poller_daemon import PollerDaemon
+
+
+class Command(BaseCommand):
+    help = "Run the device poller as its own process (SIGTERM/SIGINT drain and exit, SIGHUP reloads devices)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--health-host', default=settings.POLLER_HEALTH_HOST,
+                            help="Address of the /health and /metrics endpoint")
+        parser.add_argument('--health-port', type=int, default=settings.POLLER_HEALTH_PORT,
+                            help="Port of the /health and /metrics endpoint, 0 disables it")
+        parser.add_argument('--reload-interval', type=float, default=settings.POLLER_DEVICE_RELOAD_SECONDS,
+                            help="Seconds between device list reloads, 0 reloads only on SIGHUP")
+        parser.add_argument('--drain-timeout', type=float, default=settings.POLLER_DRAIN_SECONDS,
+                            help="Seconds to let polls in flight finish before exiting")
+
+    def handle(self, *args, **options):
+        daemon = PollerDaemon(get_active_poller(), reload_seconds=options['reload_interval'],
+                              drain_seconds=options['drain_timeout'])
+        if options['health_port']:
+            try:
+                daemon.serve_health(options['health_host'], options['health_port'])
+            except OSError as e:
+                raise CommandError(f"Cannot serve health endpoint on port {options['health_port']}: {e}")
+
+        signal.signal(signal.SIGTERM, lambda signum, frame: daemon.drain())
+        signal.signal(signal.SIGINT, lambda signum, frame: daemon.drain())
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, lambda signum, frame: daemon.reload())
+
+        self.stdout.write(f"Polling in '{settings.POLLER_MODE}' mode")
+        if daemon.run():
+            self.stdout.write("Poller stopped")
+        else:
+            self.stderr.write(f"Poller stopped with polls still running after {options['drain_timeout']}s")
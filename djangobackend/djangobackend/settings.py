@@ -156,6 +156,154 @@ REDIS_CONFIG = {
 
 
 
+# Layout of current monitoring values: 'keys' stores one string key per
+# parameter (device:{id}:monitoring:{component}:{parameter}), 'hash' one hash
+# per component (device:{id}:snapshot:{component}, field = parameter). Reads
+# fall back to the other layout; `manage.py migrate_monitoring_layout` moves
+# existing values.
+REDIS_MONITORING_LAYOUT = 'keys'
+
+# Upper bound on selectors (device, component, parameters) accepted by one
+# request to /api/redis/monitoring/batch
+MONITORING_BATCH_MAX_SELECTORS = 500
+
+# Writes publish changed values on the pub/sub channel device:{id}:changes.
+# The ASGI app (djangobackend.asgi) streams them to browsers as server-sent
+# events at /api/redis/stream?deviceId=..., sending a comment line every
+# MONITORING_STREAM_KEEPALIVE_SECONDS so proxies keep the connection open.
+MONITORING_CHANGE_NOTIFICATIONS = True
+MONITORING_STREAM_KEEPALIVE_SECONDS = 15
+
+# Every key written for a device is listed in the set device:{id}:keys so
+# cleanup and status never need KEYS. A process re-adds a key it already
+# registered at most this often.
+KEY_REGISTRY_REFRESH_SECONDS = 5 * 60
+
+# Time series retention per component in seconds ('default' applies to any
+# component not listed). Trimming runs in the background: a key is trimmed once
+# TIMESERIES_TRIM_INTERVAL_SECONDS passed or TIMESERIES_TRIM_WRITE_THRESHOLD
+# samples were written since its last trim.
+TIMESERIES_RETENTION_SECONDS = {
+    'default': 24 * 60 * 60,
+}
+TIMESERIES_TRIM_INTERVAL_SECONDS = 60
+TIMESERIES_TRIM_WRITE_THRESHOLD = 1000
+TIMESERIES_TRIM_TICK_SECONDS = 1
+
+# Storage layout of the monitoring history (see utils/timeseries_backends.py):
+# 'zset' keeps JSON samples in sorted sets, 'redistimeseries' stores numeric
+# samples with TS.ADD and needs the RedisTimeSeries module on the server,
+# 'chunked' keeps Gorilla compressed chunks in plain Redis strings.
+# Existing keys are converted with `manage.py migrate_timeseries`.
+REDIS_TIMESERIES_BACKEND = 'zset'
+# Span of one compressed chunk of the 'chunked' backend
+TIMESERIES_CHUNK_SECONDS = 2 * 60
+
+# Rollup tiers aggregated from the monitoring samples (min/max/sum/count/first/last
+# per bucket), kept longer than the raw history. Bucketed queries use the
+# coarsest tier that fits the requested resolution and range.
+TIMESERIES_ROLLUPS_ENABLED = True
+TIMESERIES_ROLLUP_TIERS = [
+    {'name': '1s', 'resolution_seconds': 1, 'retention_seconds': 24 * 60 * 60},
+    {'name': '1m', 'resolution_seconds': 60, 'retention_seconds': 30 * 24 * 60 * 60},
+    {'name': '1h', 'resolution_seconds': 60 * 60, 'retention_seconds': 365 * 24 * 60 * 60},
+]
+# An idle bucket is written once its resolution plus this grace period passed
+TIMESERIES_ROLLUP_GRACE_SECONDS = 2
+TIMESERIES_ROLLUP_FLUSH_SECONDS = 1
+
+# Upper bound on points returned by one time series range or bucketed query
+TIMESERIES_MAX_POINTS = 5000
+
+# Worker threads polling devices in parallel. Each device is polled on its
+# own deadline, so one slow device does not delay the others.
+POLLER_MAX_WORKERS = 32
+# Due devices waiting for a free worker; when full the scheduler retries later
+POLLER_DEVICE_QUEUE_SIZE = 256
+# Shared threads running the parallel RPCs of device polls (EDFAs, ports).
+# A device worker blocks while this queue is full.
+POLLER_SUBTASK_WORKERS = 64
+POLLER_SUBTASK_QUEUE_SIZE = 256
+
+# Polling engine: 'threads' runs device polls on the worker pools above,
+# 'asyncio' runs every device as a task of one event loop (see
+# utils/async_poller.py) with redis.asyncio writes. NETCONF RPCs of the
+# asyncio engine go through asyncssh (in requirements.txt); without it they
+# fall back to POLLER_ASYNC_BLOCKING_THREADS threads running ncclient.
+POLLER_ENGINE = 'threads'
+# Concurrent RPCs (and NETCONF sessions) per device, and overall
+POLLER_ASYNC_DEVICE_CONCURRENCY = 2
+POLLER_ASYNC_MAX_CONCURRENCY = 1000
+POLLER_ASYNC_BLOCKING_THREADS = 8
+
+# Poller mode: 'local' polls from threads of the web process, 'sharded'
+# spawns POLLER_SHARDS processes (0 = one per CPU core), each polling a
+# consistent hash slice of the devices (see utils/sharded_poller.py).
+# 'cluster' splits the devices between every process running in this mode
+# through Redis leases (see utils/poller_cluster.py).
+POLLER_MODE = 'local'
+POLLER_SHARDS = 0
+# Seconds between throughput reports of a shard
+POLLER_SHARD_REPORT_SECONDS = 5
+# Seconds before a crashed shard is respawned; its devices move to the
+# other shards meanwhile
+POLLER_SHARD_RESTART_SECONDS = 5
+# Points per shard on the hash ring; more points spread devices more evenly
+POLLER_HASH_RING_REPLICAS = 100
+# Cluster node id, defaults to host:pid:random so local processes differ
+POLLER_NODE_ID = None
+# A node renews its heartbeat and leases every POLLER_LEASE_RENEW_SECONDS;
+# devices of a node silent for POLLER_LEASE_TTL_MS move to other nodes
+POLLER_LEASE_TTL_MS = 15000
+POLLER_LEASE_RENEW_SECONDS = 5
+
+# Start the poller inside the web process (apps.ready() under runserver, and
+# on device requests). Set to False when `manage.py run_poller` polls
+# instead; the daemon picks up added and removed devices on its own.
+# Read from the environment, e.g. POLLER_AUTOSTART_IN_WEB=false
+POLLER_AUTOSTART_IN_WEB = os.environ.get('POLLER_AUTOSTART_IN_WEB', 'true').lower() not in ('0', 'false', 'no')
+# run_poller: seconds to let polls in flight finish on SIGTERM/SIGINT, how
+# often it reloads the device list (SIGHUP reloads at once, 0 = only on
+# SIGHUP), and where it serves /health and /metrics
+POLLER_DRAIN_SECONDS = 30
+POLLER_DEVICE_RELOAD_SECONDS = 30
+POLLER_HEALTH_HOST = '127.0.0.1'
+POLLER_HEALTH_PORT = 8765
+
+# Poll classes and how often the poller fetches them. Monitoring parameters
+# are 'fast' and operational config 'config' unless POLL_PARAMETER_CLASSES
+# says otherwise. The parameters of all classes due in one cycle are fetched
+# together, one RPC per EDFA and one for all optical ports.
+POLL_CLASS_INTERVALS_MS = {
+    'fast': DEVICE_DATA_POLL_INTERVAL_MS,
+    'slow': 5 * 1000,
+    'config': 30 * 1000,
+}
+POLL_PARAMETER_CLASSES = {
+    'entity-description': 'slow',
+    'operational-state': 'slow',
+}
+
+# The poller writes a value only when it changed: numeric values must move
+# more than the deadband of their parameter away from the value last written
+# (0 for parameters not listed), anything else must differ. Unchanged values
+# are still written every MONITORING_HEARTBEAT_SECONDS.
+MONITORING_DEADBANDS = {
+    'input-power': 0.05,
+    'output-power': 0.05,
+    'measured-gain': 0.05,
+    'back-reflection-power': 0.05,
+    'optical-return-loss': 0.05,
+}
+MONITORING_HEARTBEAT_SECONDS = 30
+
+# NETCONF session pool per device: the poller's parallel tasks each borrow
+# their own session instead of serializing on one SSH channel
+NETCONF_SESSION_POOL_SIZE = 4
+# Seconds a caller waits for a free session before giving up
+NETCONF_SESSION_CHECKOUT_TIMEOUT = 30
+
+
 # Data Polling Interval (seconds)
 # Use the millisecond-based value above. Remove accidental override that
 # set an unrealistic tiny interval which could cause scheduling issues.
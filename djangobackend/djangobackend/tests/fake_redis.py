@@ -0,0 +1,310 @@
+import fnmatch
+import redis
+
+
+def _encode(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).encode()
+
+
+def _score_bound(bound):
+    if isinstance(bound, bytes):
+        bound = bound.decode()
+    if bound in ('-inf', '-'):
+        return float('-inf')
+    if bound in ('+inf', '+'):
+        return float('inf')
+    return float(bound)
+
+
+class FakeScript:
+    """Registered script run by a Python function fn(client, keys, args)"""
+
+    def __init__(self, client, fn):
+        self.client = client
+        self.fn = fn
+
+    def __call__(self, keys=(), args=(), client=None):
+        client = client or self.client
+        if isinstance(client, FakePipeline):
+            client.queue(lambda: self.fn(client.client, list(keys), list(args)))
+            return client
+        return self.fn(client, list(keys), list(args))
+
+
+class FakePipeline:
+    """Queues calls and runs them in order on execute(), like a redis-py pipeline"""
+
+    def __init__(self, client):
+        self.client = client
+        self._calls = []
+
+    def queue(self, call):
+        self._calls.append(call)
+
+    def __getattr__(self, command):
+        method = getattr(self.client, command)
+
+        def queue(*args, **kwargs):
+            self._calls.append(lambda: method(*args, **kwargs))
+            return self
+        return queue
+
+    def execute(self, raise_on_error=True):
+        calls, self._calls = self._calls, []
+        results = []
+        for call in calls:
+            try:
+                results.append(call())
+            except redis.ResponseError as e:
+                results.append(e)
+        if raise_on_error:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._calls = []
+
+
+class FakeRedis:
+    """
+    In-memory stand-in for the redis-py client, covering the commands of the
+    time series backends and the poller cluster. Clients made with binary()
+    share the data but return bytes. TS.* commands keep a minimal
+    RedisTimeSeries series; scripts are Python functions given to
+    register_script through `scripts`.
+    """
+
+    def __init__(self, decode_responses=True, scripts=None, state=None):
+        self.decode_responses = decode_responses
+        self.scripts = scripts if scripts is not None else {}
+        # Shared between the clients of one fake server
+        self.state = state if state is not None else {"data": {}, "expires": {}, "now_ms": 0}
+
+    def binary(self):
+        return FakeRedis(decode_responses=False, scripts=self.scripts, state=self.state)
+
+    @property
+    def now_ms(self):
+        return self.state["now_ms"]
+
+    def advance(self, ms):
+        self.state["now_ms"] += ms
+
+    # Helpers
+
+    @property
+    def _data(self):
+        expires = self.state["expires"]
+        for key in [key for key, at in expires.items() if at <= self.now_ms]:
+            del expires[key]
+            self.state["data"].pop(key, None)
+        return self.state["data"]
+
+    def _out(self, value):
+        if value is None or not self.decode_responses:
+            return value
+        return value.decode()
+
+    def _get_typed(self, key, kind):
+        value = self._data.get(_encode(key))
+        if value is not None and type(value) is not kind:
+            raise redis.ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def register_script(self, script):
+        return FakeScript(self, self.scripts[script])
+
+    # Keys
+
+    def type(self, key):
+        value = self._data.get(_encode(key))
+        if value is None:
+            kind = 'none'
+        elif isinstance(value, bytes):
+            kind = 'string'
+        elif isinstance(value, set):
+            kind = 'set'
+        elif isinstance(value, _TimeSeries):
+            kind = 'TSDB-TYPE'
+        else:
+            kind = 'zset'
+        return kind if self.decode_responses else kind.encode()
+
+    def exists(self, *keys):
+        data = self._data
+        return sum(1 for key in keys if _encode(key) in data)
+
+    def delete(self, *keys):
+        data = self._data
+        removed = 0
+        for key in keys:
+            if data.pop(_encode(key), None) is not None:
+                removed += 1
+            self.state["expires"].pop(_encode(key), None)
+        return removed
+
+    def rename(self, src, dst):
+        data = self._data
+        if _encode(src) not in data:
+            raise redis.ResponseError("ERR no such key")
+        data[_encode(dst)] = data.pop(_encode(src))
+        self.state["expires"].pop(_encode(dst), None)
+        if _encode(src) in self.state["expires"]:
+            self.state["expires"][_encode(dst)] = self.state["expires"].pop(_encode(src))
+        return True
+
+    def pexpire(self, key, ms):
+        if _encode(key) not in self._data:
+            return 0
+        self.state["expires"][_encode(key)] = self.now_ms + int(ms)
+        return 1
+
+    def pttl(self, key):
+        if _encode(key) not in self._data:
+            return -2
+        at = self.state["expires"].get(_encode(key))
+        return -1 if at is None else at - self.now_ms
+
+    def scan_iter(self, match=None, count=None):
+        for key in list(self._data):
+            if match is None or fnmatch.fnmatchcase(key.decode(), match):
+                yield self._out(key)
+
+    # Strings
+
+    def get(self, key):
+        return self._out(self._get_typed(key, bytes))
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        if nx and _encode(key) in self._data:
+            return None
+        self._data[_encode(key)] = _encode(value)
+        self.state["expires"].pop(_encode(key), None)
+        if ex is not None:
+            self.pexpire(key, int(ex) * 1000)
+        if px is not None:
+            self.pexpire(key, px)
+        return True
+
+    def append(self, key, value):
+        current = self._get_typed(key, bytes) or b''
+        self._data[_encode(key)] = current + _encode(value)
+        return len(current) + len(_encode(value))
+
+    def strlen(self, key):
+        return len(self._get_typed(key, bytes) or b'')
+
+    # Sets
+
+    def sadd(self, key, *members):
+        current = self._get_typed(key, set)
+        if current is None:
+            current = self._data[_encode(key)] = set()
+        added = {_encode(member) for member in members} - current
+        current.update(added)
+        return len(added)
+
+    def srem(self, key, *members):
+        current = self._get_typed(key, set) or set()
+        removed = {_encode(member) for member in members} & current
+        current.difference_update(removed)
+        if not current:
+            self._data.pop(_encode(key), None)
+        return len(removed)
+
+    def smembers(self, key):
+        return {self._out(member) for member in self._get_typed(key, set) or ()}
+
+    # Sorted sets
+
+    def _zset(self, key):
+        return self._get_typed(key, dict) or {}
+
+    def _sorted(self, key):
+        return sorted(self._zset(key).items(), key=lambda item: (item[1], item[0]))
+
+    def zadd(self, key, mapping):
+        current = self._get_typed(key, dict)
+        if current is None:
+            current = self._data[_encode(key)] = {}
+        added = 0
+        for member, score in mapping.items():
+            if _encode(member) not in current:
+                added += 1
+            current[_encode(member)] = float(score)
+        return added
+
+    def zrem(self, key, *members):
+        current = self._zset(key)
+        removed = sum(1 for member in members if current.pop(_encode(member), None) is not None)
+        if not current:
+            self._data.pop(_encode(key), None)
+        return removed
+
+    def zrangebyscore(self, key, low, high, withscores=False):
+        low, high = _score_bound(low), _score_bound(high)
+        items = [(self._out(member), score) for member, score in self._sorted(key) if low <= score <= high]
+        return items if withscores else [member for member, _ in items]
+
+    def zrevrange(self, key, start, end, withscores=False):
+        items = list(reversed(self._sorted(key)))
+        items = items[start:] if end == -1 else items[start:end + 1]
+        items = [(self._out(member), score) for member, score in items]
+        return items if withscores else [member for member, _ in items]
+
+    def zremrangebyscore(self, key, low, high):
+        low, high = _score_bound(low), _score_bound(high)
+        current = self._zset(key)
+        doomed = [member for member, score in current.items() if low <= score <= high]
+        for member in doomed:
+            del current[member]
+        if not current:
+            self._data.pop(_encode(key), None)
+        return len(doomed)
+
+    # RedisTimeSeries
+
+    def execute_command(self, command, *args):
+        command = command.upper()
+        if command == 'TS.ADD':
+            key, ts, value = args[:3]
+            series = self._get_typed(key, _TimeSeries)
+            if series is None:
+                series = self._data[_encode(key)] = _TimeSeries()
+            series[int(ts)] = float(value)
+            return int(ts)
+        key = args[0]
+        series = self._get_typed(key, _TimeSeries)
+        if series is None:
+            raise redis.ResponseError("ERR TSDB: the key does not exist")
+        if command in ('TS.RANGE', 'TS.REVRANGE'):
+            low, high = _score_bound(args[1]), _score_bound(args[2])
+            points = [[ts, str(value)] for ts, value in sorted(series.items()) if low <= ts <= high]
+            if command == 'TS.REVRANGE':
+                points.reverse()
+            if 'COUNT' in args:
+                points = points[:int(args[args.index('COUNT') + 1])]
+            return points
+        if command == 'TS.DEL':
+            low, high = _score_bound(args[1]), _score_bound(args[2])
+            doomed = [ts for ts in series if low <= ts <= high]
+            for ts in doomed:
+                del series[ts]
+            return len(doomed)
+        raise redis.ResponseError(f"ERR unknown command '{command}'")
+
+
+class _TimeSeries(dict):
+    """Points of a TS.* series: ts -> value"""
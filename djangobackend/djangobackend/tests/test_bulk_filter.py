@@ -0,0 +1,81 @@
+from lxml import etree
+from django.test import SimpleTestCase
+from djangobackend.utils.common import clean_xml_from_namespaces
+from djangobackend.utils.generate_ncclient_filter_payload import (generate_ncclient_bulk_filter_payload,
+                                                                  invalidate_filter_cache)
+from djangobackend.utils.get_data import parse_bulk_data_reply
+
+DNS = ['ne=1;chassis=1;card=1;port=4101', 'ne=1;chassis=1;card=1;port=4102', 'ne=1;chassis=1;card=1;port=5101']
+PARAMETERS = ['input-power', 'operational-state']
+
+
+def _entry(dn, input_power=None, state=None):
+    leaves = ''
+    if input_power is not None:
+        leaves += f'<input-power xmlns="http://www.lumentum.com/lumentum-ote-port-optical">{input_power}</input-power>'
+    if state is not None:
+        leaves += f'<operational-state>{state}</operational-state>'
+    return f'<physical-port><dn>{dn}</dn><state>{leaves}</state></physical-port>'
+
+
+def _reply(*entries):
+    return ('<rpc-reply xmlns="urn:ietf:params:xml:ns:netconf:base:1.0" message-id="1"><data>'
+            '<physical-ports xmlns="http://www.lumentum.com/lumentum-ote-port">'
+            + ''.join(entries) +
+            '</physical-ports><timestamp>2024-01-01T00:00:00Z</timestamp></data></rpc-reply>')
+
+
+class BulkFilterTests(SimpleTestCase):
+    def setUp(self):
+        invalidate_filter_cache()
+
+    def _parse(self, netconf_filter):
+        root = etree.fromstring(netconf_filter.encode('utf-8'))
+        clean_xml_from_namespaces(root)
+        return root
+
+    def test_one_entry_per_dn(self):
+        root = self._parse(generate_ncclient_bulk_filter_payload('optical-port', PARAMETERS, 'physical-port', DNS))
+        self.assertEqual(root.tag, 'filter')
+        entries = root.findall('.//physical-port')
+        self.assertEqual([entry.findtext('dn') for entry in entries], DNS)
+        for entry in entries:
+            for parameter in PARAMETERS:
+                self.assertIsNotNone(entry.find(f'.//{parameter}'))
+
+    def test_cached_per_dn_list(self):
+        first = generate_ncclient_bulk_filter_payload('optical-port', PARAMETERS, 'physical-port', DNS)
+        self.assertIs(generate_ncclient_bulk_filter_payload('optical-port', PARAMETERS, 'physical-port', DNS), first)
+        other = generate_ncclient_bulk_filter_payload('optical-port', PARAMETERS, 'physical-port', DNS[:1])
+        self.assertEqual(len(self._parse(other).findall('.//physical-port')), 1)
+
+    def test_list_not_on_the_path(self):
+        with self.assertRaises(ValueError):
+            generate_ncclient_bulk_filter_payload('optical-port', PARAMETERS, 'no-such-list', DNS)
+
+
+class ParseBulkReplyTests(SimpleTestCase):
+    def test_demultiplexes_by_dn(self):
+        reply = _reply(_entry(DNS[1], '-3.5', 'in-service'), _entry(DNS[0], '-20.1', 'out-of-service'))
+        results = parse_bulk_data_reply(reply, PARAMETERS, 'physical-port', DNS)
+        self.assertEqual(results[DNS[0]]['input-power'], '-20.1')
+        self.assertEqual(results[DNS[0]]['operational-state'], 'out-of-service')
+        self.assertEqual(results[DNS[1]]['input-power'], '-3.5')
+        self.assertEqual(results[DNS[1]]['operational-state'], 'in-service')
+
+    def test_missing_entries_and_leaves_are_none(self):
+        reply = _reply(_entry(DNS[0], input_power='-1.0'))
+        results = parse_bulk_data_reply(reply, PARAMETERS, 'physical-port', DNS)
+        self.assertIsNone(results[DNS[0]]['operational-state'])
+        self.assertEqual(results[DNS[2]], {'input-power': None, 'operational-state': None,
+                                           'timestamp': '2024-01-01T00:00:00Z'})
+
+    def test_unrequested_dns_are_ignored(self):
+        reply = _reply(_entry('ne=1;chassis=1;card=1;port=9999', '-7.0', 'up'), _entry(DNS[0], '-2.0', 'up'))
+        results = parse_bulk_data_reply(reply, PARAMETERS, 'physical-port', DNS[:1])
+        self.assertEqual(list(results), DNS[:1])
+        self.assertEqual(results[DNS[0]]['input-power'], '-2.0')
+
+    def test_reply_timestamp_on_every_entry(self):
+        results = parse_bulk_data_reply(_reply(_entry(DNS[0], '-2.0')), PARAMETERS, 'physical-port', DNS)
+        self.assertEqual({result['timestamp'] for result in results.values()}, {'2024-01-01T00:00:00Z'})
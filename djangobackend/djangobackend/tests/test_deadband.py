@@ -0,0 +1,100 @@
+from unittest import mock
+import redis
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils.deadband import DeadbandFilter
+from djangobackend.utils.redis_manager import RedisManager, RedisWriteBatch
+
+
+class StubPipeline:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def set(self, *args, **kwargs):
+        pass
+
+    def execute(self):
+        if self.fail:
+            raise redis.ConnectionError("connection lost")
+        return [True]
+
+
+@override_settings(MONITORING_DEADBANDS={'input-power': 0.5}, MONITORING_HEARTBEAT_SECONDS=30)
+class DeadbandFilterTests(SimpleTestCase):
+    def setUp(self):
+        self.filter = DeadbandFilter()
+        self.now = 1000.0
+        patcher = mock.patch('djangobackend.utils.deadband.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _batch(self, fail=False):
+        manager = RedisManager()
+        manager.redis_client = mock.Mock(pipeline=mock.Mock(return_value=StubPipeline(fail)))
+        batch = RedisWriteBatch(manager)
+        batch.set('key', 'value')
+        return batch
+
+    def test_numeric_deadband(self):
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'input-power', '-3.0'))
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'input-power', '-3.4'))
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'input-power', '-2.5'))
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'input-power', '-3.6'))
+
+    def test_parameters_without_deadband_write_every_change(self):
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'target-gain', '10.0'))
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'target-gain', '10.0'))
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'target-gain', '10.01'))
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'down'))
+
+    def test_heartbeat_rewrites_unchanged_values(self):
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.now += 29
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.now += 1
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+
+    def test_group_written_when_any_leaf_changes(self):
+        values = {'4101/input-power': '-3.0', '4102/input-power': '-5.0'}
+        self.assertTrue(self.filter.should_write_group('d1', 'optical-ports-mux', values))
+        self.assertFalse(self.filter.should_write_group('d1', 'optical-ports-mux', dict(values)))
+        self.assertTrue(self.filter.should_write_group('d1', 'optical-ports-mux',
+                                                       {**values, '4102/input-power': '-6.0'}))
+        # A leaf leaving the snapshot changes it too
+        self.assertTrue(self.filter.should_write_group('d1', 'optical-ports-mux', {'4101/input-power': '-3.0'}))
+
+    def test_value_remembered_only_after_flush(self):
+        batch = self._batch()
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up', batch))
+        # Not flushed yet: still due
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.filter.forget_device('d1')
+        batch = self._batch()
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up', batch))
+        batch.flush()
+        self.assertFalse(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+
+    def test_failed_flush_keeps_values_due(self):
+        batch = self._batch(fail=True)
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up', batch))
+        self.assertTrue(self.filter.should_write_group('d1', 'optical-ports-mux', {'4101/input-power': '-3.0'}, batch))
+        with self.assertRaises(redis.ConnectionError):
+            batch.flush()
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.assertTrue(self.filter.should_write_group('d1', 'optical-ports-mux', {'4101/input-power': '-3.0'}))
+
+    def test_forget_device(self):
+        self.filter.should_write('d1', 'edfa-booster', 'state', 'up')
+        self.filter.should_write('d2', 'edfa-booster', 'state', 'up')
+        self.filter.forget_device('d1')
+        self.assertTrue(self.filter.should_write('d1', 'edfa-booster', 'state', 'up'))
+        self.assertFalse(self.filter.should_write('d2', 'edfa-booster', 'state', 'up'))
+
+    def test_stats(self):
+        self.filter.should_write('d1', 'edfa-booster', 'state', 'up')
+        self.filter.should_write('d1', 'edfa-booster', 'state', 'up')
+        stats = self.filter.get_stats()
+        self.assertEqual((stats['checked'], stats['written'], stats['skipped']), (2, 1, 1))
+        self.assertEqual(stats['leaves'], 1)
+        self.assertEqual(stats['skip_ratio'], 0.5)
@@ -0,0 +1,99 @@
+import json
+import os
+import tempfile
+from unittest import mock
+from django.test import SimpleTestCase
+from djangobackend.utils.device_storage import DeviceRegistry
+
+CREDENTIALS = {'host': '10.0.0.1', 'port': '830', 'username': 'admin', 'password': 'secret'}
+
+
+class DeviceRegistryTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, 'device_storage.json')
+        self.registry = DeviceRegistry(self.path)
+        self.events = []
+        self.registry.subscribe(lambda event, device_id: self.events.append((event, device_id)))
+
+    def _read_file(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def _write_externally(self, devices):
+        # Another process replacing the file
+        temp_path = self.path + '.other'
+        with open(temp_path, 'w') as f:
+            json.dump(devices, f)
+        os.replace(temp_path, self.path)
+
+    def test_missing_file_is_created_empty(self):
+        self.assertEqual(self.registry.get_all(), {})
+        self.assertEqual(self._read_file(), {})
+
+    def test_save_normalizes_port_and_writes_file(self):
+        self.registry.save_many({'d1': CREDENTIALS})
+        self.assertEqual(self.registry.get('d1')['port'], 830)
+        self.assertEqual(self._read_file()['d1']['port'], 830)
+        self.assertEqual(self.events, [('added', 'd1')])
+        self.assertEqual(os.listdir(self.directory), ['device_storage.json'])
+
+    def test_lookups_return_copies(self):
+        self.registry.save_many({'d1': CREDENTIALS})
+        self.registry.get('d1')['host'] = 'changed'
+        self.registry.get_all()['d1']['host'] = 'changed'
+        self.assertEqual(self.registry.get('d1')['host'], '10.0.0.1')
+
+    def test_reloads_file_changed_by_another_process(self):
+        self.registry.save_many({'d1': CREDENTIALS, 'd2': CREDENTIALS})
+        self._write_externally({'d2': CREDENTIALS, 'd3': dict(CREDENTIALS, port=22)})
+        self.assertEqual(sorted(self.registry.get_ids()), ['d2', 'd3'])
+        self.assertEqual(self.registry.get('d2')['port'], 830)
+        self.assertEqual(sorted(self.events[2:]), [('added', 'd3'), ('removed', 'd1')])
+
+    def test_unchanged_file_is_not_reread(self):
+        self.registry.save_many({'d1': CREDENTIALS})
+        # Only a stat, the file is not opened again
+        with mock.patch('djangobackend.utils.device_storage.open', create=True, side_effect=AssertionError):
+            self.assertEqual(self.registry.get_ids(), ['d1'])
+            self.assertEqual(self.registry.get('d1')['port'], 830)
+
+    def test_failed_write_keeps_file_and_memory(self):
+        self.registry.save_many({'d1': CREDENTIALS})
+        with self.assertRaises(TypeError):
+            self.registry.save_many({'d2': dict(CREDENTIALS, password=object())})
+        self.assertEqual(self._read_file(), {'d1': dict(CREDENTIALS, port=830)})
+        self.assertEqual(self.registry.get_ids(), ['d1'])
+        self.assertEqual(os.listdir(self.directory), ['device_storage.json'])
+        self.assertEqual(self.events, [('added', 'd1')])
+
+    def test_delete(self):
+        self.registry.save_many({'d1': CREDENTIALS})
+        self.assertTrue(self.registry.delete('d1'))
+        self.assertFalse(self.registry.delete('d1'))
+        self.assertIsNone(self.registry.get('d1'))
+        self.assertEqual(self._read_file(), {})
+        self.assertEqual(self.events, [('added', 'd1'), ('removed', 'd1')])
+
+    def test_changed_credentials_emit_updated(self):
+        self.registry.save_many({'d1': CREDENTIALS, 'd2': CREDENTIALS})
+        self.registry.save_many({'d1': dict(CREDENTIALS, password='rotated'), 'd2': CREDENTIALS})
+        self._write_externally({'d1': dict(CREDENTIALS, password='rotated'), 'd2': dict(CREDENTIALS, port=22)})
+        self.registry.get_ids()
+        self.assertEqual(self.events[2:], [('updated', 'd1'), ('updated', 'd2')])
+
+    def test_failing_subscriber_does_not_stop_others(self):
+        def failing(event, device_id):
+            raise RuntimeError('subscriber failed')
+        registry = DeviceRegistry(self.path)
+        seen = []
+        registry.subscribe(failing)
+        registry.subscribe(lambda event, device_id: seen.append(device_id))
+        with self.assertLogs('djangobackend.utils.device_storage', 'ERROR'):
+            registry.save_many({'d1': CREDENTIALS})
+        self.assertEqual(seen, ['d1'])
+        registry.unsubscribe(failing)
+        registry.save_many({'d2': CREDENTIALS})
+        self.assertEqual(seen, ['d1', 'd2'])
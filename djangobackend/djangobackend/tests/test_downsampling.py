@@ -0,0 +1,64 @@
+from django.test import SimpleTestCase
+from djangobackend.utils.downsampling import (aggregate_values, aggregate_points, lttb,
+                                              parse_step_ms, parse_epoch_ms)
+
+
+class AggregatePointsTests(SimpleTestCase):
+    def test_epoch_aligned_buckets(self):
+        points = [(1500, 4.0), (999, 1.0), (1000, 2.0), (0, 3.0), (2999, 6.0)]
+        self.assertEqual(aggregate_points(points, 1000, ('min', 'max', 'avg', 'count', 'first', 'last')), [
+            (0, {'min': 1.0, 'max': 3.0, 'avg': 2.0, 'count': 2, 'first': 3.0, 'last': 1.0}),
+            (1000, {'min': 2.0, 'max': 4.0, 'avg': 3.0, 'count': 2, 'first': 2.0, 'last': 4.0}),
+            (2000, {'min': 6.0, 'max': 6.0, 'avg': 6.0, 'count': 1, 'first': 6.0, 'last': 6.0}),
+        ])
+
+    def test_empty(self):
+        self.assertEqual(aggregate_points([], 1000, ('avg',)), [])
+
+    def test_unknown_aggregator(self):
+        with self.assertRaises(ValueError):
+            aggregate_values([1.0], 'median')
+
+
+class LttbTests(SimpleTestCase):
+    def test_short_series_unchanged(self):
+        points = [(i, float(i)) for i in range(10)]
+        self.assertEqual(lttb(points, 10), points)
+        self.assertEqual(lttb(points, 50), points)
+        self.assertEqual(lttb(points, 2), points)
+
+    def test_keeps_endpoints_and_threshold(self):
+        points = [(i * 1000, float(i % 7)) for i in range(1000)]
+        sampled = lttb(points, 100)
+        self.assertEqual(len(sampled), 100)
+        self.assertEqual(sampled[0], points[0])
+        self.assertEqual(sampled[-1], points[-1])
+        self.assertEqual(sampled, sorted(sampled))
+        self.assertTrue(set(sampled) <= set(points))
+
+    def test_keeps_peaks(self):
+        points = [(i, 0.0) for i in range(1000)]
+        points[317] = (317, 50.0)
+        points[733] = (733, -50.0)
+        sampled = lttb(points, 20)
+        self.assertIn((317, 50.0), sampled)
+        self.assertIn((733, -50.0), sampled)
+
+    def test_unsorted_input(self):
+        points = [(i, float(i)) for i in range(100)]
+        self.assertEqual(lttb(list(reversed(points)), 10), lttb(points, 10))
+
+
+class ParseTests(SimpleTestCase):
+    def test_parse_step_ms(self):
+        self.assertEqual(parse_step_ms(500), 500)
+        self.assertEqual(parse_step_ms('500ms'), 500)
+        self.assertEqual(parse_step_ms('10s'), 10000)
+        self.assertEqual(parse_step_ms('1.5m'), 90000)
+        self.assertEqual(parse_step_ms('1h'), 3600000)
+        with self.assertRaises(ValueError):
+            parse_step_ms('5 weeks')
+
+    def test_parse_epoch_ms(self):
+        self.assertEqual(parse_epoch_ms('1700000000'), 1700000000000)
+        self.assertEqual(parse_epoch_ms('1700000000123'), 1700000000123)
@@ -0,0 +1,53 @@
+import math
+from django.test import SimpleTestCase
+from djangobackend.utils.gorilla import (encode_chunk, decode_chunk, chunk_point_count,
+                                         pack_raw_points, unpack_raw_points, RAW_RECORD)
+
+
+class GorillaChunkTests(SimpleTestCase):
+    def assertRoundtrip(self, points):
+        data = encode_chunk(points)
+        self.assertEqual(chunk_point_count(data), len(points))
+        self.assertEqual(decode_chunk(data), points)
+
+    def test_empty_chunk(self):
+        self.assertEqual(encode_chunk([]), b'')
+        self.assertEqual(decode_chunk(b''), [])
+        self.assertEqual(chunk_point_count(b''), 0)
+
+    def test_single_point(self):
+        self.assertRoundtrip([(1700000000000, -3.5)])
+
+    def test_regular_interval_and_repeated_values(self):
+        points = [(1700000000000 + i * 1000, 1.5) for i in range(500)]
+        self.assertRoundtrip(points)
+        # Repeated values and a fixed interval cost about two bits per point
+        self.assertLess(len(encode_chunk(points)), 200)
+
+    def test_irregular_timestamps_and_changing_values(self):
+        timestamps = [0, 1, 3, 1000, 1001, 70000, 70000 + 2 ** 20, 70001 + 2 ** 33]
+        values = [0.0, -23.4, 1.5, 1e300, -1e-300, 17.25, 0.1, -0.0]
+        self.assertRoundtrip(list(zip(timestamps, values)))
+
+    def test_values_needing_all_64_bits(self):
+        values = [1.0, -math.pi, 5e-324, -1.7976931348623157e308, math.e, 2.0 ** -1022]
+        self.assertRoundtrip([(i * 500, value) for i, value in enumerate(values)])
+
+    def test_special_floats(self):
+        points = decode_chunk(encode_chunk([(0, math.inf), (1, -math.inf), (2, math.nan), (3, 0.0)]))
+        self.assertEqual(points[0], (0, math.inf))
+        self.assertEqual(points[1], (1, -math.inf))
+        self.assertTrue(math.isnan(points[2][1]))
+        self.assertEqual(points[3], (3, 0.0))
+
+
+class RawRecordTests(SimpleTestCase):
+    def test_roundtrip(self):
+        points = [(1700000000000, 1.25), (1700000000500, -40.0)]
+        self.assertEqual(unpack_raw_points(pack_raw_points(points)), points)
+
+    def test_torn_trailing_record_is_ignored(self):
+        data = pack_raw_points([(1, 1.0), (2, 2.0)])
+        self.assertEqual(unpack_raw_points(data[:-3]), [(1, 1.0)])
+        self.assertEqual(unpack_raw_points(data[:RAW_RECORD.size - 1]), [])
+        self.assertEqual(unpack_raw_points(b''), [])
@@ -0,0 +1,60 @@
+from django.test import SimpleTestCase
+from djangobackend.utils.sharded_poller import HashRing
+
+DEVICES = [f"device-{i}" for i in range(2000)]
+
+
+class HashRingTests(SimpleTestCase):
+    def _ring(self, nodes, replicas=100):
+        ring = HashRing(replicas)
+        for node in nodes:
+            ring.add_node(node)
+        return ring
+
+    def _placement(self, ring):
+        return {device: ring.get_node(device) for device in DEVICES}
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing(10).get_node('device-1'))
+
+    def test_placement_is_deterministic(self):
+        first = self._placement(self._ring([0, 1, 2]))
+        self.assertEqual(self._placement(self._ring([2, 0, 1])), first)
+
+    def test_devices_spread_over_nodes(self):
+        placement = self._placement(self._ring([0, 1, 2, 3]))
+        counts = [list(placement.values()).count(node) for node in range(4)]
+        for count in counts:
+            self.assertGreater(count, len(DEVICES) / 4 * 0.6)
+
+    def test_adding_a_node_only_moves_devices_to_it(self):
+        ring = self._ring([0, 1, 2])
+        before = self._placement(ring)
+        ring.add_node(3)
+        after = self._placement(ring)
+        moved = [device for device in DEVICES if before[device] != after[device]]
+        self.assertTrue(moved)
+        self.assertTrue(all(after[device] == 3 for device in moved))
+        self.assertLess(len(moved), len(DEVICES) / 4 * 1.5)
+
+    def test_removing_a_node_only_moves_its_devices(self):
+        ring = self._ring([0, 1, 2, 3])
+        before = self._placement(ring)
+        ring.remove_node(1)
+        after = self._placement(ring)
+        for device in DEVICES:
+            if before[device] == 1:
+                self.assertIn(after[device], {0, 2, 3})
+            else:
+                self.assertEqual(after[device], before[device])
+
+    def test_add_and_remove_are_idempotent(self):
+        ring = self._ring([0, 1])
+        before = self._placement(ring)
+        ring.add_node(1)
+        ring.remove_node(5)
+        self.assertEqual(self._placement(ring), before)
+        ring.add_node(2)
+        ring.remove_node(2)
+        self.assertEqual(self._placement(ring), before)
+        self.assertEqual(ring.nodes, {0, 1})
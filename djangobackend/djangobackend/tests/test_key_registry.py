@@ -0,0 +1,73 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils.redis_manager import RedisManager, KEY_REGISTRY_COMPLETE
+
+
+class RecordingClient:
+    """Stands in for a Redis client or batch: records SADDs, serves sets and SCAN"""
+
+    def __init__(self, sets=None, keys=()):
+        self.sets = {key: set(members) for key, members in (sets or {}).items()}
+        self.keys = list(keys)
+        self.sadds = []
+        self.scans = 0
+
+    def sadd(self, key, *members):
+        self.sadds.append((key, members))
+        self.sets.setdefault(key, set()).update(members)
+
+    def smembers(self, key):
+        return set(self.sets.get(key, ()))
+
+    def scan_iter(self, match=None, count=None):
+        self.scans += 1
+        prefix = match.rstrip('*')
+        return iter([key for key in self.keys if key.startswith(prefix)])
+
+    def delete(self, key):
+        self.sets.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+
+class KeyRegistryTests(SimpleTestCase):
+    def setUp(self):
+        self.manager = RedisManager()
+
+    def test_register_keys_sends_each_key_once(self):
+        client = RecordingClient()
+        self.manager.register_keys(client, 'd1', 'device:d1:a', 'device:d1:b')
+        self.manager.register_keys(client, 'd1', 'device:d1:a', 'device:d1:c')
+        self.manager.register_keys(client, 'd1', 'device:d1:a')
+        self.assertEqual(client.sadds, [('device:d1:keys', ('device:d1:a', 'device:d1:b')),
+                                        ('device:d1:keys', ('device:d1:c',))])
+
+    @override_settings(KEY_REGISTRY_REFRESH_SECONDS=0)
+    def test_register_keys_resends_after_refresh(self):
+        client = RecordingClient()
+        self.manager.register_keys(client, 'd1', 'device:d1:a')
+        self.manager.register_keys(client, 'd1', 'device:d1:a')
+        self.assertEqual(len(client.sadds), 2)
+
+    def test_complete_registry_is_read_without_scan(self):
+        client = RecordingClient(sets={'device:d1:keys': {KEY_REGISTRY_COMPLETE, 'device:d1:monitoring:x:y',
+                                                          'device:d1:timeseries:x:y'}})
+        with mock.patch.object(self.manager, 'redis_client', client):
+            self.assertEqual(self.manager.get_device_keys('d1'),
+                             ['device:d1:monitoring:x:y', 'device:d1:timeseries:x:y'])
+            self.assertEqual(self.manager.get_device_keys('d1', 'monitoring:'), ['device:d1:monitoring:x:y'])
+        self.assertEqual(client.scans, 0)
+
+    def test_incomplete_registry_is_rebuilt_once(self):
+        client = RecordingClient(sets={'device:d1:keys': {'device:d1:monitoring:x:y'}},
+                                 keys=['device:d1:monitoring:x:y', 'device:d1:old:key', 'device:d1:keys',
+                                       'device:d2:monitoring:x:y'])
+        with mock.patch.object(self.manager, 'redis_client', client):
+            self.assertEqual(self.manager.get_device_keys('d1'), ['device:d1:monitoring:x:y', 'device:d1:old:key'])
+            self.assertIn(KEY_REGISTRY_COMPLETE, client.sets['device:d1:keys'])
+            self.assertEqual(self.manager.get_device_keys('d1'), ['device:d1:monitoring:x:y', 'device:d1:old:key'])
+        self.assertEqual(client.scans, 1)
@@ -0,0 +1,59 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils.background_poller import DeviceDataPoller
+
+
+@override_settings(POLL_CLASS_INTERVALS_MS={'fast': 1000, 'slow': 5000, 'config': 30000},
+                   POLL_PARAMETER_CLASSES={'operational-state': 'slow'})
+class PollClassTests(SimpleTestCase):
+    def setUp(self):
+        self.poller = DeviceDataPoller()
+        self.now = 100.0
+        patcher = mock.patch('djangobackend.utils.background_poller.time.monotonic', lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_poll_class(self):
+        self.assertEqual(DeviceDataPoller.get_poll_class('input-power'), 'fast')
+        self.assertEqual(DeviceDataPoller.get_poll_class('operational-state'), 'slow')
+        self.assertEqual(DeviceDataPoller.get_poll_class('target-gain', config=True), 'config')
+
+    def test_select_params(self):
+        params = ['input-power', 'operational-state', 'output-power']
+        self.assertEqual(DeviceDataPoller._select_params(params, None), params)
+        self.assertEqual(DeviceDataPoller._select_params(params, {'fast'}), ['input-power', 'output-power'])
+        self.assertEqual(DeviceDataPoller._select_params(params, {'slow'}), ['operational-state'])
+        self.assertEqual(DeviceDataPoller._select_params(['target-gain'], {'fast'}, config=True), [])
+        self.assertEqual(DeviceDataPoller._select_params(['target-gain'], {'config'}, config=True), ['target-gain'])
+
+    def test_every_class_due_on_first_poll(self):
+        self.assertEqual(self.poller._take_due_classes('d1'), {'fast', 'slow', 'config'})
+        self.assertEqual(self.poller._take_due_classes('d1'), set())
+        self.assertEqual(self.poller._get_next_deadline('d1', self.now), 101.0)
+
+    def test_classes_come_due_at_their_intervals(self):
+        self.poller._take_due_classes('d1')
+        due = []
+        for _ in range(10):
+            self.now += 1
+            due.append(self.poller._take_due_classes('d1'))
+        self.assertEqual(sum('fast' in classes for classes in due), 10)
+        self.assertEqual([i for i, classes in enumerate(due) if 'slow' in classes], [4, 9])
+        self.assertFalse(any('config' in classes for classes in due))
+
+    def test_deadlines_do_not_drift(self):
+        self.poller._take_due_classes('d1')
+        # Polled late: the next deadline stays on the original grid
+        self.now = 101.4
+        self.assertEqual(self.poller._take_due_classes('d1'), {'fast'})
+        self.assertEqual(self.poller._get_next_deadline('d1', self.now), 102.0)
+
+    def test_fallen_behind_restarts_from_now(self):
+        self.poller._take_due_classes('d1')
+        self.now = 110.5
+        self.poller._take_due_classes('d1')
+        self.assertEqual(self.poller._get_next_deadline('d1', self.now), 111.5)
+
+    def test_devices_are_independent(self):
+        self.poller._take_due_classes('d1')
+        self.assertEqual(self.poller._take_due_classes('d2'), {'fast', 'slow', 'config'})
@@ -0,0 +1,104 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils import poller_cluster
+from djangobackend.utils.poller_cluster import (DEVICES_KEY, LEASE_KEY_PREFIX, NODES_KEY, PollerCluster,
+                                                _RELEASE_LEASE_SCRIPT, _RENEW_LEASE_SCRIPT)
+from djangobackend.tests.fake_redis import FakeRedis
+
+TTL_MS = 10_000
+DEVICES = ['d1', 'd2', 'd3', 'd4']
+
+
+def renew_lease(client, keys, args):
+    if client.get(keys[0]) == args[0]:
+        return client.pexpire(keys[0], args[1])
+    return 0
+
+
+def release_lease(client, keys, args):
+    if client.get(keys[0]) == args[0]:
+        return client.delete(keys[0])
+    return 0
+
+
+@override_settings(POLLER_LEASE_TTL_MS=TTL_MS)
+class PollerClusterTests(SimpleTestCase):
+    def setUp(self):
+        self.client = FakeRedis(scripts={_RENEW_LEASE_SCRIPT: renew_lease, _RELEASE_LEASE_SCRIPT: release_lease})
+        self.client.sadd(DEVICES_KEY, *DEVICES)
+        patcher = mock.patch.object(poller_cluster, 'device_poller')
+        self.device_poller = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _node(self, node_id):
+        with override_settings(POLLER_NODE_ID=node_id):
+            node = PollerCluster(manager=mock.Mock(redis_client=self.client))
+        # Driven by the test instead of the heartbeat thread
+        node.running = True
+        return node
+
+    def _lease_owner(self, device_id):
+        return self.client.get(LEASE_KEY_PREFIX + device_id)
+
+    def test_single_node_claims_every_device(self):
+        node = self._node('a')
+        node._heartbeat()
+        self.assertEqual(node.owned, set(DEVICES))
+        self.assertEqual({self._lease_owner(device_id) for device_id in DEVICES}, {'a'})
+        self.assertEqual(self.client.pttl(LEASE_KEY_PREFIX + 'd1'), TTL_MS)
+        self.assertEqual(sorted(call.args[0] for call in self.device_poller.start_polling.call_args_list), DEVICES)
+
+    def test_new_node_gets_a_fair_share(self):
+        first, second = self._node('a'), self._node('b')
+        first._heartbeat()
+        second._heartbeat()
+        # Everything is leased; the first node hands devices over once it sees the second
+        self.assertEqual(second.owned, set())
+        first._heartbeat()
+        second._heartbeat()
+        self.assertEqual((len(first.owned), len(second.owned)), (2, 2))
+        self.assertEqual(first.owned | second.owned, set(DEVICES))
+        for device_id in second.owned:
+            self.assertEqual(self._lease_owner(device_id), 'b')
+
+    def test_devices_of_a_dead_node_are_reclaimed(self):
+        dead, survivor = self._node('a'), self._node('b')
+        dead._heartbeat()
+        self.client.advance(TTL_MS + 1)
+        survivor._heartbeat()
+        self.assertEqual(survivor.owned, set(DEVICES))
+        self.assertEqual(self.client.smembers(NODES_KEY), {'b'})
+
+        # The paused node finds its leases gone and stops polling
+        with self.assertLogs(poller_cluster.logger, 'WARNING'):
+            dead._heartbeat()
+        self.assertEqual(dead.owned, set())
+        self.assertEqual(dead._stats['lost'], len(DEVICES))
+        self.assertEqual(sorted(call.args[0] for call in self.device_poller.stop_polling.call_args_list), DEVICES)
+        self.assertEqual({self._lease_owner(device_id) for device_id in DEVICES}, {'b'})
+
+    def test_device_removed_from_the_fleet_is_released(self):
+        owner, other = self._node('a'), self._node('b')
+        owner._heartbeat()
+        other.stop_polling('d1')
+        owner._heartbeat()
+        self.assertNotIn('d1', owner.owned)
+        self.assertIsNone(self._lease_owner('d1'))
+        self.device_poller.stop_polling.assert_any_call('d1')
+
+    def test_release_keeps_the_lease_of_another_node(self):
+        node = self._node('a')
+        self.client.set(LEASE_KEY_PREFIX + 'd1', 'b', px=TTL_MS)
+        node.owned.add('d1')
+        node._release('d1')
+        self.assertEqual(self._lease_owner('d1'), 'b')
+
+    def test_stop_releases_leases_and_leaves(self):
+        node = self._node('a')
+        node._heartbeat()
+        node.stop()
+        self.assertFalse(node.running)
+        self.assertEqual(node.owned, set())
+        self.assertEqual([self._lease_owner(device_id) for device_id in DEVICES], [None] * len(DEVICES))
+        self.assertEqual(self.client.smembers(NODES_KEY), set())
+        self.assertEqual(node.get_assignments()['unassigned'], DEVICES)
@@ -0,0 +1,96 @@
+import threading
+from unittest import mock
+from django.test import SimpleTestCase
+from ncclient.transport.errors import TransportError
+from djangobackend.utils import device_connection_manager
+from djangobackend.utils.device_connection_manager import DeviceSessionPool, device_session
+
+CREDENTIALS = {'ip': '10.0.0.1', 'port': 830, 'username': 'admin', 'password': 'secret'}
+
+
+class FakeSession:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def close_session(self):
+        self.closed = True
+        self.connected = False
+
+
+class DeviceSessionPoolTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(device_connection_manager, '_create_new_session',
+                                    side_effect=lambda device_credentials: FakeSession())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = DeviceSessionPool(CREDENTIALS, size=2)
+
+    def test_checked_in_session_is_reused(self):
+        session = self.pool.checkout(timeout=1)
+        self.pool.checkin(session)
+        self.assertIs(self.pool.checkout(timeout=1), session)
+        metrics = self.pool.get_metrics()
+        self.assertEqual((metrics['created'], metrics['checkouts'], metrics['in_use']), (1, 2, 1))
+
+    def test_opens_up_to_size_then_times_out(self):
+        first = self.pool.checkout(timeout=1)
+        second = self.pool.checkout(timeout=1)
+        self.assertIsNot(first, second)
+        with self.assertRaises(TimeoutError):
+            self.pool.checkout(timeout=0.05)
+        self.assertEqual(self.pool.get_metrics()['timeouts'], 1)
+
+    def test_waiting_checkout_gets_the_session_checked_in(self):
+        held = [self.pool.checkout(timeout=1), self.pool.checkout(timeout=1)]
+        got = []
+        waiter = threading.Thread(target=lambda: got.append(self.pool.checkout(timeout=5)))
+        waiter.start()
+        self.pool.checkin(held[0])
+        waiter.join(5)
+        self.assertEqual(got, [held[0]])
+
+    def test_discarded_and_broken_sessions_are_closed(self):
+        session = self.pool.checkout(timeout=1)
+        self.pool.checkin(session, discard=True)
+        self.assertTrue(session.closed)
+        broken = self.pool.checkout(timeout=1)
+        self.assertIsNot(broken, session)
+        self.pool.checkin(broken)
+        # Dropped on the next checkout when its connection went away
+        broken.connected = False
+        fresh = self.pool.checkout(timeout=1)
+        self.assertIsNot(fresh, broken)
+        self.assertTrue(broken.closed)
+        metrics = self.pool.get_metrics()
+        self.assertEqual((metrics['open'], metrics['discarded']), (1, 2))
+
+    def test_failed_connect_frees_the_slot(self):
+        with mock.patch.object(device_connection_manager, '_create_new_session', side_effect=OSError('refused')):
+            with self.assertRaises(OSError), self.assertLogs(device_connection_manager.logger, 'WARNING'):
+                self.pool.checkout(timeout=1, retries=1, retry_delay=0)
+        self.assertEqual(self.pool.get_metrics()['open'], 0)
+
+    def test_closed_pool_hands_out_nothing(self):
+        idle = self.pool.checkout(timeout=1)
+        in_use = self.pool.checkout(timeout=1)
+        self.pool.checkin(idle)
+        self.pool.close_all()
+        self.assertTrue(idle.closed)
+        with self.assertRaises(RuntimeError):
+            self.pool.checkout(timeout=1)
+        # Closed when it comes back instead of going idle
+        self.pool.checkin(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(self.pool.get_metrics()['open'], 0)
+
+    def test_device_session_discards_on_transport_error(self):
+        with mock.patch.dict(device_connection_manager._pools, clear=True):
+            with self.assertRaises(TransportError):
+                with device_session(CREDENTIALS) as session:
+                    raise TransportError('channel closed')
+            self.assertTrue(session.closed)
+            with device_session(CREDENTIALS) as reused:
+                pass
+            with device_session(CREDENTIALS) as again:
+                self.assertIs(again, reused)
@@ -0,0 +1,177 @@
+from unittest import mock
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils.timeseries_backends import (ChunkedTimeseriesBackend, RedisTimeSeriesBackend,
+                                                     ZSetTimeseriesBackend, migrate_timeseries,
+                                                     migrate_timeseries_key)
+from djangobackend.tests.fake_redis import FakeRedis
+
+KEY = 'device:d1:timeseries:edfa-booster:input-power'
+T0 = 1_700_000_000_000
+
+
+def sample(value):
+    return {"value": value, "timestamp_local": "local"}
+
+
+def values(samples):
+    return [(ts, entry['value']) for ts, entry in samples]
+
+
+class BackendTestCase(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(ChunkedTimeseriesBackend, '_make_binary_client',
+                                    staticmethod(lambda client: client.binary()))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = FakeRedis()
+
+    def _write(self, backend, key, samples):
+        pipeline = self.client.pipeline(transaction=False)
+        for score_ms, data in samples:
+            backend.append(pipeline, key, score_ms, data)
+        pipeline.execute()
+
+    def _trim(self, backend, key, cutoff_ms):
+        pipeline = self.client.pipeline(transaction=False)
+        counters = backend.trim(pipeline, key, cutoff_ms)
+        return sum(count(reply or 0) for count, reply in zip(counters, pipeline.execute()))
+
+
+class ZSetBackendTests(BackendTestCase):
+    def test_range_latest_and_trim(self):
+        backend = ZSetTimeseriesBackend(self.client)
+        self._write(backend, KEY, [(T0 + i * 1000, sample(float(i))) for i in range(5)])
+        self.assertEqual(values(backend.range(KEY, T0 + 1000, T0 + 3000)), [
+            (T0 + 1000, 1.0), (T0 + 2000, 2.0), (T0 + 3000, 3.0)])
+        self.assertEqual([entry['value'] for entry in backend.latest(KEY, 2)], [4.0, 3.0])
+        self.assertEqual(backend.points(KEY, T0 + 4000), [(T0 + 4000, 4.0)])
+        self.assertEqual(self._trim(backend, KEY, T0 + 1000), 2)
+        self.assertEqual(len(backend.range(KEY)), 3)
+        self.assertTrue(backend.owns(KEY))
+
+
+class RedisTimeSeriesBackendTests(BackendTestCase):
+    def test_numeric_series_are_native_and_strings_fall_back(self):
+        backend = RedisTimeSeriesBackend(self.client)
+        state_key = 'device:d1:timeseries:edfa-booster:state'
+        self._write(backend, KEY, [(T0, sample(1.5)), (T0, sample(2.5)), (T0 + 1000, sample(3)),
+                                   (T0 + 2000, sample('n/a'))])
+        self._write(backend, state_key, [(T0, sample('up'))])
+
+        self.assertEqual(self.client.type(KEY), 'TSDB-TYPE')
+        self.assertEqual(self.client.type(state_key), 'zset')
+        # A re-polled timestamp overwrites the point; strings are dropped from a native series
+        self.assertEqual(values(backend.range(KEY)), [(T0, 2.5), (T0 + 1000, 3.0)])
+        self.assertEqual([entry['value'] for entry in backend.latest(KEY, 1)], [3.0])
+        self.assertEqual(values(backend.range(state_key)), [(T0, 'up')])
+        self.assertEqual(self._trim(backend, KEY, T0), 1)
+        self.assertEqual(backend.points(KEY), [(T0 + 1000, 3.0)])
+
+    def test_layout_is_looked_up_once_per_key(self):
+        backend = RedisTimeSeriesBackend(self.client)
+        self._write(backend, KEY, [(T0, sample(1.0))])
+        with mock.patch.object(self.client, 'type', wraps=self.client.type) as key_type:
+            reader = RedisTimeSeriesBackend(self.client)
+            for _ in range(3):
+                reader.range(KEY)
+                reader.latest(KEY, 1)
+        self.assertEqual(key_type.call_count, 1)
+
+    def test_missing_key_and_key_created_as_sorted_set_later(self):
+        backend = RedisTimeSeriesBackend(self.client)
+        self.assertEqual(backend.range(KEY), [])
+        # Another process writes the key as a sorted set after it was looked up as missing
+        self._write(ZSetTimeseriesBackend(self.client), KEY, [(T0, sample('up'))])
+        self.assertEqual(values(backend.range(KEY)), [(T0, 'up')])
+        self.assertEqual(self._trim(backend, KEY, T0), 1)
+
+
+@override_settings(TIMESERIES_CHUNK_SECONDS=60)
+class ChunkedBackendTests(BackendTestCase):
+    def test_heads_and_sealed_chunks_read_back(self):
+        backend = ChunkedTimeseriesBackend(self.client)
+        self._write(backend, KEY, [(T0 + i * 1000, sample(float(i))) for i in range(3)])
+        self.assertEqual(backend.seal(KEY), 3)
+        self._write(backend, KEY, [(T0 + i * 1000, sample(float(i))) for i in range(3, 5)])
+
+        self.assertEqual(values(backend.range(KEY)), [(T0 + i * 1000, float(i)) for i in range(5)])
+        self.assertEqual(backend.points(KEY, T0 + 2000, T0 + 3000), [(T0 + 2000, 2.0), (T0 + 3000, 3.0)])
+        self.assertEqual([entry['value'] for entry in backend.latest(KEY, 3)], [4.0, 3.0, 2.0])
+        self.assertTrue(backend.owns(KEY))
+
+    def test_labels_keep_their_state(self):
+        backend = ChunkedTimeseriesBackend(self.client)
+        key = 'device:d1:timeseries:edfa-booster:grouped'
+        self._write(backend, key, [
+            (T0, {"values": {"1": {"input-power": 1.0, "state": "up"}}}),
+            (T0 + 1000, {"values": {"1": {"input-power": 2.0, "state": "up"}}}),
+            (T0 + 2000, {"values": {"1": {"input-power": 3.0, "state": "down"}}}),
+        ])
+        self.assertEqual([entry['values']['1'] for _, entry in backend.range(key)], [
+            {"input-power": 1.0, "state": "up"},
+            {"input-power": 2.0, "state": "up"},
+            {"input-power": 3.0, "state": "down"},
+        ])
+        # One label entry per change
+        self.assertEqual(len(self.client.zrangebyscore(f"{key}:labels", '-inf', '+inf')), 2)
+
+    def test_trim_counts_points_of_removed_chunks(self):
+        backend = ChunkedTimeseriesBackend(self.client)
+        self._write(backend, KEY, [(T0 + i * 1000, sample(float(i))) for i in range(3)])
+        backend.seal(KEY)
+        self._write(backend, KEY, [(T0 + 10_000, sample(10.0))])
+        backend.seal(KEY)
+        # Whole chunks only: the first ends before the cutoff, the second after it
+        self.assertEqual(self._trim(backend, KEY, T0 + 5000), 3)
+        self.assertEqual(values(backend.range(KEY)), [(T0 + 10_000, 10.0)])
+
+
+@override_settings(TIMESERIES_CHUNK_SECONDS=60)
+class MigrationTests(BackendTestCase):
+    def setUp(self):
+        super().setUp()
+        self.samples = [(T0 + i * 1000, sample(float(i))) for i in range(4)]
+        self._write(ZSetTimeseriesBackend(self.client), KEY, self.samples)
+
+    def test_migrate_to_chunked(self):
+        target = ChunkedTimeseriesBackend(self.client)
+        self.assertEqual(migrate_timeseries_key(self.client, KEY, target), 4)
+        self.assertEqual(self.client.type(KEY), 'none')
+        self.assertTrue(target.owns(KEY))
+        self.assertEqual(values(target.range(KEY)), values(self.samples))
+        self.assertEqual(list(self.client.scan_iter(match='*:migrating*')), [])
+        # Already in the target layout
+        self.assertEqual(migrate_timeseries_key(self.client, KEY, target), 0)
+
+    def test_migrate_to_redistimeseries(self):
+        target = RedisTimeSeriesBackend(self.client)
+        self.assertEqual(migrate_timeseries_key(self.client, KEY, target), 4)
+        self.assertEqual(self.client.type(KEY), 'TSDB-TYPE')
+        self.assertEqual(values(target.range(KEY)), values(self.samples))
+
+    def test_dry_run_and_unstorable_samples(self):
+        state_key = 'device:d1:timeseries:edfa-booster:state'
+        self._write(ZSetTimeseriesBackend(self.client), state_key, [(T0, sample('up'))])
+        target = RedisTimeSeriesBackend(self.client)
+        self.assertEqual(migrate_timeseries_key(self.client, KEY, target, dry_run=True), 4)
+        self.assertEqual(self.client.type(KEY), 'zset')
+        # String samples have no native series
+        self.assertEqual(migrate_timeseries_key(self.client, state_key, target), 0)
+        self.assertEqual(self.client.type(state_key), 'zset')
+
+    def test_failed_write_keeps_the_original(self):
+        target = ChunkedTimeseriesBackend(self.client)
+        with mock.patch.object(target, 'write_samples', side_effect=RuntimeError('write failed')):
+            with self.assertRaises(RuntimeError):
+                migrate_timeseries_key(self.client, KEY, target)
+        self.assertEqual(values(ZSetTimeseriesBackend(self.client).range(KEY)), values(self.samples))
+
+    def test_migrate_every_key(self):
+        target = ChunkedTimeseriesBackend(self.client)
+        other = 'device:d2:timeseries:edfa-booster:input-power'
+        self._write(ZSetTimeseriesBackend(self.client), other, self.samples[:2])
+        stats = migrate_timeseries(self.client, target)
+        self.assertEqual((stats['keys_scanned'], stats['keys_migrated'], stats['samples_migrated']), (2, 2, 6))
+        # The storage keys of a migrated series count as one key
+        stats = migrate_timeseries(self.client, target)
+        self.assertEqual((stats['keys_scanned'], stats['keys_migrated']), (2, 0))
@@ -0,0 +1,139 @@
+from contextlib import contextmanager
+from unittest import mock
+import redis
+from django.test import SimpleTestCase, override_settings
+from djangobackend.utils.timeseries_rollups import TimeseriesRollups
+
+DAY_MS = 24 * 60 * 60 * 1000
+NOW_MS = 1_700_000_000_000
+TIERS = [
+    {'name': '1s', 'resolution_seconds': 1, 'retention_seconds': 24 * 60 * 60},
+    {'name': '1m', 'resolution_seconds': 60, 'retention_seconds': 30 * 24 * 60 * 60},
+    {'name': '1h', 'resolution_seconds': 60 * 60, 'retention_seconds': 365 * 24 * 60 * 60},
+]
+
+
+class MemoryTimeseries:
+    """Backend stub keeping {key: {score_ms: value}}"""
+
+    def __init__(self):
+        self.keys = {}
+
+    def append(self, client, key, score_ms, sample):
+        client.append((key, score_ms, sample['value']))
+
+    def points(self, key, start_ms, end_ms):
+        return sorted((ts, value) for ts, value in self.keys.get(key, {}).items()
+                      if start_ms <= ts and (end_ms is None or ts <= end_ms))
+
+
+class StubManager:
+    db_number = 0
+
+    def __init__(self):
+        self.timeseries = MemoryTimeseries()
+        self.retention = mock.Mock(get_retention_seconds=lambda component: 7 * 24 * 60 * 60)
+        self.fail = False
+
+    @contextmanager
+    def write_batch(self):
+        batch = []
+        yield batch
+        if self.fail:
+            raise redis.ConnectionError("connection lost")
+        for key, score_ms, value in batch:
+            self.timeseries.keys.setdefault(key, {})[score_ms] = value
+
+    def register_keys(self, client, device_id, *keys):
+        pass
+
+
+@override_settings(TIMESERIES_ROLLUPS_ENABLED=True, TIMESERIES_ROLLUP_TIERS=TIERS,
+                   TIMESERIES_ROLLUP_GRACE_SECONDS=2)
+class TimeseriesRollupsTests(SimpleTestCase):
+    def setUp(self):
+        self.manager = StubManager()
+        self.rollups = TimeseriesRollups(self.manager)
+        for patcher in (mock.patch.object(TimeseriesRollups, '_ensure_started'),
+                        mock.patch('djangobackend.utils.timeseries_rollups.time.time', lambda: NOW_MS / 1000)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _minute_avgs(self, start_ms, end_ms=None):
+        tier = TIERS[1]
+        return self.rollups.aggregate('d1', 'edfa-booster', 'input-power', tier, start_ms, end_ms, 60_000, ('avg', 'count'))
+
+    def test_select_tier(self):
+        hour_ago = NOW_MS - 60 * 60 * 1000
+        # Coarsest tier fitting in a bucket that reaches back far enough
+        self.assertEqual(self.rollups.select_tier('edfa-booster', hour_ago, 5 * 60 * 1000)['name'], '1m')
+        self.assertEqual(self.rollups.select_tier('edfa-booster', hour_ago, 10_000)['name'], '1s')
+        self.assertEqual(self.rollups.select_tier('edfa-booster', NOW_MS - 40 * DAY_MS, 2 * 60 * 60 * 1000)['name'], '1h')
+        # Nothing fits into the bucket
+        self.assertIsNone(self.rollups.select_tier('edfa-booster', hour_ago, 500))
+        # Past every retention and the raw history: the longest fitting one wins
+        self.assertEqual(self.rollups.select_tier('edfa-booster', NOW_MS - 10 * DAY_MS, 10_000)['name'], '1s')
+        self.assertEqual(self.rollups.select_tier('edfa-booster', NOW_MS - 2 * 365 * DAY_MS, DAY_MS)['name'], '1h')
+
+    def test_select_tier_prefers_raw_history_within_its_retention(self):
+        with override_settings(TIMESERIES_ROLLUP_TIERS=[dict(TIERS[2], retention_seconds=24 * 60 * 60)]):
+            # The tier misses the start but the raw samples (7 days) reach it
+            self.assertIsNone(self.rollups.select_tier('edfa-booster', NOW_MS - 3 * DAY_MS, DAY_MS))
+            self.assertEqual(self.rollups.select_tier('edfa-booster', NOW_MS - 10 * DAY_MS, DAY_MS)['name'], '1h')
+
+    def test_select_tier_disabled(self):
+        with override_settings(TIMESERIES_ROLLUPS_ENABLED=False):
+            self.assertIsNone(self.rollups.select_tier('edfa-booster', NOW_MS - DAY_MS, DAY_MS))
+
+    def test_aggregate_merges_unwritten_buckets(self):
+        minute = NOW_MS - NOW_MS % 60_000 - 120_000
+        for offset, value in ((0, 1.0), (10_000, 3.0), (60_000, 5.0)):
+            self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute + offset, value)
+        # The later samples closed the first minute and two 1s buckets; the second minute is still open
+        self.assertEqual(self.rollups.flush(), 3)
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute + 70_000, 7.0)
+
+        self.assertEqual(self._minute_avgs(minute), [
+            (minute, {'avg': 2.0, 'count': 2.0}),
+            (minute + 60_000, {'avg': 6.0, 'count': 2.0}),
+        ])
+
+    def test_written_bucket_is_not_counted_twice(self):
+        minute = NOW_MS - NOW_MS % 60_000 - 120_000
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute, 4.0)
+        self.rollups.flush(force=True)
+        # Reads race with a flush: the bucket may still look unwritten
+        open_buckets = self.rollups._open[('d1', 'edfa-booster', 'input-power')]
+        self.rollups._flushing = [('d1', 'edfa-booster', 'input-power', tier, open_buckets[tier['name']])
+                                  for tier in TIERS]
+        self.assertEqual(self._minute_avgs(minute), [(minute, {'avg': 4.0, 'count': 1.0})])
+
+    def test_late_sample_of_written_bucket_is_dropped(self):
+        minute = NOW_MS - NOW_MS % 60_000 - 120_000
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute, 4.0)
+        self.rollups.flush(force=True)
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute + 1_000, 8.0)
+        self.assertEqual(self.rollups.get_stats()['late_samples'], 2)
+        self.assertEqual(self._minute_avgs(minute), [(minute, {'avg': 4.0, 'count': 1.0})])
+
+    def test_failed_flush_keeps_buckets(self):
+        minute = NOW_MS - NOW_MS % 60_000 - 120_000
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute, 4.0)
+        self.manager.fail = True
+        with self.assertRaises(redis.ConnectionError):
+            self.rollups.flush(force=True)
+        self.assertEqual(self.rollups.get_stats()['pending_buckets'], 3)
+        # Still answered from memory, then written by the next flush
+        self.assertEqual(self._minute_avgs(minute), [(minute, {'avg': 4.0, 'count': 1.0})])
+        self.manager.fail = False
+        self.assertEqual(self.rollups.flush(), 3)
+        self.assertEqual(self.rollups.get_stats()['pending_buckets'], 0)
+        self.assertEqual(self._minute_avgs(minute), [(minute, {'avg': 4.0, 'count': 1.0})])
+
+    def test_forget_device(self):
+        minute = NOW_MS - NOW_MS % 60_000 - 120_000
+        self.rollups.note_sample('d1', 'edfa-booster', 'input-power', minute, 4.0)
+        self.rollups.note_sample('d2', 'edfa-booster', 'input-power', minute, 4.0)
+        self.rollups.forget_device('d1')
+        self.assertEqual(self._minute_avgs(minute), [])
+        self.assertEqual(self.rollups.flush(force=True), 3)
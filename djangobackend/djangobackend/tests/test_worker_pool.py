@@ -0,0 +1,80 @@
+import threading
+from django.test import SimpleTestCase
+from djangobackend.utils.worker_pool import WorkerPool, WorkerPoolFull
+
+
+class WorkerPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+
+    def _pool(self, size=1, queue_size=1):
+        pool = WorkerPool('test-pool', size, queue_size)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def _occupy(self, pool):
+        """Submit a task that holds a worker until self.release is set; returns once it runs"""
+        started = threading.Event()
+
+        def hold():
+            started.set()
+            self.release.wait(5)
+
+        future = pool.submit(hold)
+        self.assertTrue(started.wait(5))
+        return future
+
+    def test_results_and_exceptions(self):
+        pool = self._pool(size=2, queue_size=4)
+        self.assertEqual(pool.submit(int, "ff", base=16).result(5), 255)
+        with self.assertRaises(ZeroDivisionError):
+            pool.submit(lambda: 1 / 0).result(5)
+        metrics = pool.get_metrics()
+        self.assertEqual((metrics['submitted'], metrics['completed'], metrics['failed']), (2, 1, 1))
+
+    def test_threads_are_reused(self):
+        pool = self._pool(size=2, queue_size=8)
+        names = {pool.submit(lambda: threading.current_thread().name).result(5) for _ in range(20)}
+        self.assertTrue(names <= {'test-pool-0', 'test-pool-1'})
+        self.assertEqual(pool.get_metrics()['threads'], 2)
+
+    def test_full_queue_rejects_without_blocking(self):
+        pool = self._pool(size=1, queue_size=1)
+        running = self._occupy(pool)
+        queued = pool.submit(lambda: 'queued')
+        with self.assertRaises(WorkerPoolFull):
+            pool.submit(lambda: 'rejected', block=False)
+        with self.assertRaises(WorkerPoolFull):
+            pool.submit(lambda: 'rejected', timeout=0.05)
+        self.assertEqual(pool.get_metrics()['rejected'], 2)
+        self.release.set()
+        running.result(5)
+        self.assertEqual(queued.result(5), 'queued')
+
+    def test_full_queue_blocks_until_space(self):
+        pool = self._pool(size=1, queue_size=1)
+        self._occupy(pool)
+        pool.submit(lambda: None)
+        threading.Timer(0.05, self.release.set).start()
+        self.assertEqual(pool.submit(lambda: 'after wait').result(5), 'after wait')
+
+    def test_cancelled_task_is_skipped(self):
+        pool = self._pool(size=1, queue_size=2)
+        self._occupy(pool)
+        calls = []
+        cancelled = pool.submit(calls.append, 'cancelled')
+        self.assertTrue(cancelled.cancel())
+        self.release.set()
+        pool.submit(calls.append, 'ran').result(5)
+        self.assertEqual(calls, ['ran'])
+
+    def test_shutdown_finishes_queued_tasks(self):
+        pool = self._pool(size=1, queue_size=4)
+        self._occupy(pool)
+        futures = [pool.submit(lambda i=i: i) for i in range(3)]
+        self.release.set()
+        pool.shutdown()
+        self.assertEqual([future.result(0) for future in futures], [0, 1, 2])
+        with self.assertRaises(RuntimeError):
+            pool.submit(lambda: None)
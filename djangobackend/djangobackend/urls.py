@@ -11,10 +11,14 @@ urlpatterns = [
          views.device_schemas, name='device schemas'),
     path('api/device_schema_dependencies',
          views.device_schema_dependencies, name='device schema dependencies'),
+    path('api/device_schema_ambiguities',
+         views.device_schema_ambiguities, name='device schema ambiguities'),
     path('api/device_cleanup',
          views.device_cleanup, name='device cleanup'),
     path('api/redis/monitoring',
          views.redis_monitoring_data, name='redis monitoring data'),
+    path('api/redis/monitoring/batch',
+         views.redis_monitoring_batch, name='redis monitoring batch'),
     path('api/redis/timeseries',
          views.redis_timeseries_data, name='redis timeseries data'),
     path('api/redis/running_config',
@@ -28,6 +32,16 @@ urlpatterns = [
    
     path('api/devices',
          views.device_management, name='device management'),
+    path('api/redis/write_stats',
+         views.redis_write_stats, name='redis write stats'),
+    path('api/redis/retention_stats',
+         views.redis_retention_stats, name='redis retention stats'),
+    path('api/netconf/session_pools',
+         views.netconf_session_pools, name='netconf session pools'),
+    path('api/poller/schedule',
+         views.poller_schedule_metrics, name='poller schedule metrics'),
+    path('api/poller/assignments',
+         views.poller_cluster_assignments, name='poller cluster assignments'),
     path('api/redis/keys',
          views.get_redis_keys, name='get redis keys'),
 ]
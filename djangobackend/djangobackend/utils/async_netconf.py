@@ -0,0 +1,152 @@
+import asyncio
+import re
+import logging
+from django.conf import settings
+
+try:
+    import asyncssh
+except ImportError:  # optional, see POLLER_ENGINE
+    asyncssh = None
+
+logger = logging.getLogger(__name__)
+
+NETCONF_NS = 'urn:ietf:params:xml:ns:netconf:base:1.0'
+NETCONF_BASE_10 = 'urn:ietf:params:netconf:base:1.0'
+NETCONF_BASE_11 = 'urn:ietf:params:netconf:base:1.1'
+# End of message marker of NETCONF 1.0 framing
+_EOM = b']]>]]>'
+_CHUNK_HEADER = re.compile(rb'\n#(\d+)\n')
+
+
+class AsyncNetconfSession:
+    """
+    Minimal NETCONF client over asyncssh: hello exchange, 1.0 (end of
+    message) or 1.1 (chunked) framing, and one RPC at a time.
+    """
+
+    def __init__(self, connection, reader, writer):
+        self._connection = connection
+        self._reader = reader
+        self._writer = writer
+        self._buffer = b''
+        self._chunked = False
+        self._message_id = 0
+        self.connected = True
+
+    @classmethod
+    async def connect(cls, device_credentials, timeout=15):
+        if asyncssh is None:
+            raise RuntimeError("asyncssh is not installed")
+        connection = await asyncio.wait_for(asyncssh.connect(
+            device_credentials["ip"],
+            port=int(device_credentials["port"]),
+            username=device_credentials["username"],
+            password=device_credentials["password"],
+            known_hosts=None,
+        ), timeout)
+        try:
+            writer, reader, _ = await connection.open_session(subsystem='netconf', encoding=None)
+            session = cls(connection, reader, writer)
+            await asyncio.wait_for(session._exchange_hello(), timeout)
+        except Exception:
+            connection.close()
+            raise
+        return session
+
+    async def _exchange_hello(self):
+        self._writer.write((
+            f'<?xml version="1.0" encoding="UTF-8"?><hello xmlns="{NETCONF_NS}"><capabilities>'
+            f'<capability>{NETCONF_BASE_10}</capability><capability>{NETCONF_BASE_11}</capability>'
+            f'</capabilities></hello>'
+        ).encode('utf-8') + _EOM)
+        server_hello = await self._read_eom()
+        # Both sides announced 1.1: every later message is chunked
+        self._chunked = NETCONF_BASE_11 in server_hello
+
+    async def _fill(self):
+        data = await self._reader.read(65536)
+        if not data:
+            self.connected = False
+            raise ConnectionError("NETCONF session closed by device")
+        self._buffer += data
+
+    async def _read_eom(self):
+        while _EOM not in self._buffer:
+            await self._fill()
+        message, self._buffer = self._buffer.split(_EOM, 1)
+        return message.decode('utf-8')
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            if self._buffer.startswith(b'\n##\n'):
+                self._buffer = self._buffer[4:]
+                return b''.join(parts).decode('utf-8')
+            match = _CHUNK_HEADER.match(self._buffer)
+            if match is None:
+                # A header is at most 13 octets (\n#4294967295\n)
+                if len(self._buffer) >= 13:
+                    raise ValueError("Malformed NETCONF chunk header")
+                await self._fill()
+                continue
+            end = match.end() + int(match.group(1))
+            while len(self._buffer) < end:
+                await self._fill()
+            parts.append(self._buffer[match.end():end])
+            self._buffer = self._buffer[end:]
+
+    async def rpc(self, operation):
+        """Send one <rpc> wrapping operation and return the <rpc-reply> XML"""
+        self._message_id += 1
+        message = f'<rpc message-id="{self._message_id}" xmlns="{NETCONF_NS}">{operation}</rpc>'.encode('utf-8')
+        if self._chunked:
+            self._writer.write(b'\n#%d\n' % len(message) + message + b'\n##\n')
+            return await self._read_chunked()
+        self._writer.write(message + _EOM)
+        return await self._read_eom()
+
+    async def get(self, netconf_filter):
+        """<get> with a subtree filter as built by generate_ncclient_filter_payload"""
+        return await self.rpc(f'<get>{netconf_filter}</get>')
+
+    def close(self):
+        self.connected = False
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+
+
+class AsyncDeviceSessions:
+    """
+    Up to POLLER_ASYNC_DEVICE_CONCURRENCY NETCONF sessions to one device;
+    an RPC waits for a free one, so this also caps concurrent RPCs per device.
+    """
+
+    def __init__(self, device_credentials):
+        self.device_credentials = dict(device_credentials)
+        self.size = max(1, settings.POLLER_ASYNC_DEVICE_CONCURRENCY)
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._idle = []
+
+    async def get(self, netconf_filter):
+        async with self._semaphore:
+            session = None
+            while self._idle and session is None:
+                candidate = self._idle.pop()
+                if candidate.connected:
+                    session = candidate
+            if session is None:
+                session = await AsyncNetconfSession.connect(self.device_credentials)
+            try:
+                reply = await asyncio.wait_for(session.get(netconf_filter), settings.NETCONF_SESSION_CHECKOUT_TIMEOUT)
+            except BaseException:
+                # The reply may still arrive later and would desync the framing
+                session.close()
+                raise
+            self._idle.append(session)
+            return reply
+
+    def close(self):
+        while self._idle:
+            self._idle.pop().close()
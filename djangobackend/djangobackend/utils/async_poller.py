@@ -0,0 +1,320 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+import logging
+import redis.asyncio as aioredis
+from django.conf import settings
+from .redis_manager import RedisWriteBatch, monitoring_redis, operational_config_redis
+from .get_data import get_data, get_data_bulk, parse_data_reply, parse_bulk_data_reply
+from .generate_ncclient_filter_payload import (generate_ncclient_filter_payload,
+                                               generate_ncclient_bulk_filter_payload)
+from .common import validate_device_credentials, get_device_credentials_by_id
+from .device_storage import device_registry
+from .async_netconf import AsyncDeviceSessions, asyncssh
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncPollingEngine:
+    """
+    Polling backend of DeviceDataPoller (POLLER_ENGINE = 'asyncio') running
+    every device as a task of one event loop in a dedicated thread.
+
+    Each device task sleeps until its next poll class deadline, sends the
+    due RPCs concurrently (at most POLLER_ASYNC_DEVICE_CONCURRENCY per device
+    and POLLER_ASYNC_MAX_CONCURRENCY overall) and flushes its writes with
+    redis.asyncio. Scheduling, parsing and storing are shared with the
+    threaded poller. NETCONF goes through asyncssh when it is installed;
+    otherwise the blocking ncclient calls run on POLLER_ASYNC_BLOCKING_THREADS
+    threads. Credential lookups, filter building, reply parsing and storing
+    run on the loop's default executor so they never stall other devices.
+    """
+
+    def __init__(self, poller):
+        self.poller = poller
+        self._loop = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        # Owned by the loop thread
+        self._tasks = {}
+        self._sessions = {}
+        # device_id -> semaphore of its POLLER_ASYNC_DEVICE_CONCURRENCY RPC slots
+        self._device_slots = {}
+        # Devices whose poll is running right now
+        self._polling = set()
+        self._draining = False
+        self._redis = {}
+        self._semaphore = None
+        self._blocking_executor = None
+
+    def start(self):
+        """Start the event loop thread if it is not running"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._draining = False
+            self._ready.clear()
+            self._thread = threading.Thread(target=self._run, name='poller-asyncio', daemon=True)
+            self._thread.start()
+        self._ready.wait()
+        device_registry.subscribe(self._on_device_event)
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(settings.POLLER_ASYNC_MAX_CONCURRENCY)
+        self._redis = {
+            manager.db_number: aioredis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=manager.db_number,
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5,
+            )
+            for manager in (monitoring_redis, operational_config_redis)
+        }
+        if asyncssh is None:
+            logger.warning("asyncssh is not installed (see requirements.txt), the asyncio poller runs NETCONF RPCs on threads")
+            self._blocking_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=settings.POLLER_ASYNC_BLOCKING_THREADS, thread_name_prefix='poller-netconf')
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._close())
+            self._loop.close()
+
+    async def _close(self):
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for sessions in self._sessions.values():
+            sessions.close()
+        self._sessions.clear()
+        self._device_slots.clear()
+        for client in self._redis.values():
+            await client.close()
+        if self._blocking_executor is not None:
+            self._blocking_executor.shutdown(wait=False)
+            self._blocking_executor = None
+        await self._loop.shutdown_default_executor()
+
+    def stop(self, timeout=10):
+        """Cancel every device task and stop the loop thread"""
+        with self._lock:
+            thread, loop = self._thread, self._loop
+            self._thread = None
+        if thread is None:
+            return
+        device_registry.unsubscribe(self._on_device_event)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+
+    def drain(self, timeout=None):
+        """
+        Let the polls in flight finish writing, then stop the loop thread.
+        Returns False if polls were still running after timeout seconds and
+        had to be cancelled.
+        """
+        with self._lock:
+            thread, loop = self._thread, self._loop
+        if thread is None:
+            return True
+        try:
+            drained = asyncio.run_coroutine_threadsafe(self._drain(timeout), loop).result()
+        except Exception as e:
+            logger.error(f"Error draining the asyncio poller: {e}")
+            drained = False
+        self.stop()
+        return drained
+
+    async def _drain(self, timeout):
+        self._draining = True
+        polling = []
+        for device_id, task in self._tasks.items():
+            if device_id in self._polling:
+                polling.append(task)
+            else:
+                # Only sleeping until its next deadline
+                task.cancel()
+        pending = ()
+        if polling:
+            _, pending = await asyncio.wait(polling, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} asyncio polls still running after {timeout}s")
+        return not pending
+
+    def add_device(self, device_id):
+        self.start()
+        self._loop.call_soon_threadsafe(self._start_device, device_id)
+
+    def remove_device(self, device_id):
+        loop = self._loop
+        if loop is not None and self._thread is not None:
+            loop.call_soon_threadsafe(self._stop_device, device_id)
+
+    def _on_device_event(self, event, device_id):
+        if event == 'updated':
+            # Sessions logged in with the old credentials
+            loop = self._loop
+            if loop is not None and self._thread is not None:
+                loop.call_soon_threadsafe(self._close_sessions, device_id)
+
+    def _close_sessions(self, device_id):
+        sessions = self._sessions.pop(device_id, None)
+        if sessions is not None:
+            sessions.close()
+
+    def _start_device(self, device_id):
+        if device_id not in self._tasks:
+            self._tasks[device_id] = self._loop.create_task(self._device_loop(device_id))
+
+    def _stop_device(self, device_id):
+        task = self._tasks.pop(device_id, None)
+        if task is not None:
+            task.cancel()
+        self._close_sessions(device_id)
+        self._device_slots.pop(device_id, None)
+
+    async def _device_loop(self, device_id):
+        deadline = time.monotonic()
+        while not self._draining:
+            started = time.monotonic()
+            self._polling.add(device_id)
+            try:
+                poll_classes = self.poller._take_due_classes(device_id)
+                if poll_classes:
+                    await self._poll_device(device_id, poll_classes)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error polling device {device_id}: {e}")
+            finally:
+                self._polling.discard(device_id)
+            finished = time.monotonic()
+            next_deadline = self.poller._get_next_deadline(device_id, finished)
+            self.poller._record_engine_poll(device_id, deadline, started, finished, next_deadline < finished)
+            deadline = max(next_deadline, finished)
+            await asyncio.sleep(deadline - finished)
+
+    @staticmethod
+    async def _offload(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def _poll_device(self, device_id, poll_classes):
+        device_credentials = await self._offload(get_device_credentials_by_id, device_id)
+        if not device_credentials:
+            logger.warning(f"No credentials found for device {device_id}")
+            return
+        if not validate_device_credentials(device_credentials):
+            logger.warning(f"Invalid credentials for device {device_id}")
+            return
+
+        # Store calls only queue commands; the batches are sent below without blocking the loop
+        monitoring_batch = RedisWriteBatch(monitoring_redis)
+        operational_batch = RedisWriteBatch(operational_config_redis)
+        results = await asyncio.gather(
+            self._poll_edfa(device_id, device_credentials, 'booster', poll_classes,
+                            monitoring_batch, operational_batch),
+            self._poll_edfa(device_id, device_credentials, 'preamplifier', poll_classes,
+                            monitoring_batch, operational_batch),
+            self._poll_optical_ports(device_id, device_credentials, poll_classes,
+                                     monitoring_batch, operational_batch),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in device {device_id} subtask: {result}")
+
+        await asyncio.gather(
+            monitoring_batch.flush_async(self._redis[monitoring_redis.db_number]),
+            operational_batch.flush_async(self._redis[operational_config_redis.db_number]),
+        )
+
+    async def _rpc(self, device_id, fetch):
+        """
+        Await fetch() within the per-device (POLLER_ASYNC_DEVICE_CONCURRENCY)
+        and overall (POLLER_ASYNC_MAX_CONCURRENCY) limits, whichever way the
+        RPC is sent
+        """
+        slots = self._device_slots.get(device_id)
+        if slots is None:
+            slots = self._device_slots[device_id] = asyncio.Semaphore(
+                max(1, settings.POLLER_ASYNC_DEVICE_CONCURRENCY))
+        async with slots, self._semaphore:
+            return await fetch()
+
+    async def _get(self, device_id, device_credentials, netconf_filter):
+        sessions = self._sessions.get(device_id)
+        if sessions is None or sessions.device_credentials != dict(device_credentials):
+            if sessions is not None:
+                sessions.close()
+            sessions = self._sessions[device_id] = AsyncDeviceSessions(device_credentials)
+        return await self._rpc(device_id, lambda: sessions.get(netconf_filter))
+
+    async def _get_blocking(self, device_id, fn, *args):
+        """Run a blocking ncclient call on the NETCONF threads, within the same limits"""
+        loop = asyncio.get_running_loop()
+        return await self._rpc(device_id, lambda: loop.run_in_executor(self._blocking_executor, fn, *args))
+
+    async def _poll_edfa(self, device_id, device_credentials, edfa_type, poll_classes,
+                         monitoring_batch, operational_batch):
+        from .data import EDFA_MONITORING_PARAMS, EDFA_OPERATIONAL_CONFIG_PARAMS
+
+        monitoring_params = self.poller._select_params(EDFA_MONITORING_PARAMS[edfa_type], poll_classes)
+        config_params = self.poller._select_params(EDFA_OPERATIONAL_CONFIG_PARAMS[edfa_type], poll_classes, config=True)
+        if not monitoring_params and not config_params:
+            return
+        params = monitoring_params + config_params
+        query = self.poller.get_edfa_query(edfa_type)
+
+        if self._blocking_executor is not None:
+            data = await self._get_blocking(device_id, get_data, device_credentials, 'edfa', params, query, device_id)
+        else:
+            netconf_filter = await self._offload(generate_ncclient_filter_payload, 'edfa', params, query, device_id)
+            reply = await self._get(device_id, device_credentials, netconf_filter)
+            data = await self._offload(parse_data_reply, reply, params)
+
+        await self._offload(self.poller._store_edfa_data, device_id, edfa_type, data, monitoring_params,
+                            config_params, monitoring_batch, operational_batch)
+
+    async def _poll_optical_ports(self, device_id, device_credentials, poll_classes,
+                                  monitoring_batch, operational_batch):
+        from .data import OPTICAL_PORT_MONITORING_PARAMS, OPTICAL_PORT_OPERATIONAL_CONFIG_PARAMS
+
+        monitoring_params = self.poller._select_params(OPTICAL_PORT_MONITORING_PARAMS, poll_classes)
+        config_params = self.poller._select_params(OPTICAL_PORT_OPERATIONAL_CONFIG_PARAMS, poll_classes, config=True)
+        if not monitoring_params and not config_params:
+            return
+        params = monitoring_params + config_params
+        port_dns = self.poller.get_optical_port_dns()
+        dns = list(port_dns.values())
+
+        if self._blocking_executor is not None:
+            bulk_data = await self._get_blocking(device_id, get_data_bulk, device_credentials, "optical-port",
+                                                 params, "physical-port", dns, device_id)
+        else:
+            netconf_filter = await self._offload(
+                generate_ncclient_bulk_filter_payload, "optical-port", params, "physical-port", dns, device_id)
+            reply = await self._get(device_id, device_credentials, netconf_filter)
+            bulk_data = await self._offload(parse_bulk_data_reply, reply, params, "physical-port", dns)
+
+        await self._offload(self.poller._store_optical_ports_data, device_id, bulk_data, port_dns,
+                            monitoring_params, config_params, monitoring_batch, operational_batch)
+
+    def get_metrics(self):
+        """Get the number of device tasks and how NETCONF RPCs are sent"""
+        return {
+            "running": self._thread is not None,
+            "devices": len(self._tasks),
+            "netconf": "asyncssh" if asyncssh is not None else "threads",
+            "device_concurrency": settings.POLLER_ASYNC_DEVICE_CONCURRENCY,
+            "max_concurrency": settings.POLLER_ASYNC_MAX_CONCURRENCY,
+        }
@@ -126,18 +126,27 @@ def get_xpath(root, element_name):
     return None
 
 
-def make_xml_from_xpath(x_path, output_root=None):
+def make_xml_from_xpath(x_path, output_root=None, elements_by_tag=None):
     elements = x_path.strip('/').split('/')
 
     # generates the XML element by passing the string
     root = etree.Element(elements[0]) if output_root is None else output_root
+
+    # Callers building one tree from many xpaths pass the same dict each time
+    # so already created elements are found without searching the tree
+    if elements_by_tag is None:
+        elements_by_tag = {}
+        for elem in root.iterdescendants():
+            elements_by_tag.setdefault(elem.tag, elem)
+
     parent = root
     for element in elements[1:]:
-        if root.find(".//" + element) is None:
+        found_element = elements_by_tag.get(element)
+        if found_element is None:
             child = etree.SubElement(parent, element)
+            elements_by_tag[element] = child
             parent = child
         else:
-            found_element = root.find(".//" + element)
             parent = found_element
 
     return root
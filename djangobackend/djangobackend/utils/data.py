@@ -66,6 +66,84 @@ OPTICAL_PORT_PARAMS = {
     'OpticalLosHysteresis': 'optical-los-hysteresis',
 }
 
+# Parameters polled for each entity. Monitoring params are stored in the
+# monitoring Redis DB, operational config params in the operational config DB;
+# both are fetched with the same RPC.
+EDFA_MONITORING_PARAMS = {
+    'booster': [
+        EDFA_PARAMS['InputPower'],
+        EDFA_PARAMS['OutputPower'],
+        EDFA_PARAMS['MeasuredGain'],
+        EDFA_PARAMS['BackReflectionPower'],
+        EDFA_PARAMS['OpticalReturnLoss'],
+        EDFA_PARAMS['AlsDisabledSecondsRemaining'],
+        EDFA_PARAMS['EntityDescription'],
+        EDFA_PARAMS['OperationalState'],
+    ],
+    'preamplifier': [
+        EDFA_PARAMS['InputPower'],
+        EDFA_PARAMS['OutputPower'],
+        EDFA_PARAMS['MeasuredGain'],
+        EDFA_PARAMS['EntityDescription'],
+        EDFA_PARAMS['OperationalState'],
+    ],
+}
+
+EDFA_OPERATIONAL_CONFIG_PARAMS = {
+    'booster': [
+        EDFA_PARAMS['TargetGain'],
+        EDFA_PARAMS['TargetPower'],
+        EDFA_PARAMS['ControlMode'],
+        EDFA_PARAMS['CustomName'],
+        EDFA_PARAMS['MaintenanceState'],
+        EDFA_PARAMS['GainSwitchMode'],
+        EDFA_PARAMS['TargetGainTilt'],
+        EDFA_PARAMS['LosShutdown'],
+        EDFA_PARAMS['OpticalLooThreshold'],
+        EDFA_PARAMS['OpticalLooHysteresis'],
+        EDFA_PARAMS['InputOverloadThreshold'],
+        EDFA_PARAMS['InputOverloadHysteresis'],
+        EDFA_PARAMS['InputLowDegradeThreshold'],
+        EDFA_PARAMS['InputLowDegradeHysteresis'],
+        EDFA_PARAMS['OpticalLosThreshold'],
+        EDFA_PARAMS['OpticalLosHysteresis'],
+        EDFA_PARAMS['OrlThresholdWarningThreshold'],
+        EDFA_PARAMS['OrlThresholdWarningHysteresis'],
+        EDFA_PARAMS['ForceApr'],
+    ],
+    'preamplifier': [
+        EDFA_PARAMS['TargetGain'],
+        EDFA_PARAMS['TargetPower'],
+        EDFA_PARAMS['ControlMode'],
+        EDFA_PARAMS['CustomName'],
+        EDFA_PARAMS['MaintenanceState'],
+        EDFA_PARAMS['GainSwitchMode'],
+        EDFA_PARAMS['TargetGainTilt'],
+        EDFA_PARAMS['LosShutdown'],
+        EDFA_PARAMS['OpticalLooThreshold'],
+        EDFA_PARAMS['OpticalLooHysteresis'],
+        EDFA_PARAMS['InputOverloadThreshold'],
+        EDFA_PARAMS['InputOverloadHysteresis'],
+        EDFA_PARAMS['ForceApr'],
+    ],
+}
+
+OPTICAL_PORT_MONITORING_PARAMS = [
+    OPTICAL_PORT_PARAMS['InputPower'],
+    OPTICAL_PORT_PARAMS['OutputPower'],
+    OPTICAL_PORT_PARAMS['EntityDescription'],
+    OPTICAL_PORT_PARAMS['OperationalState'],
+]
+
+OPTICAL_PORT_OPERATIONAL_CONFIG_PARAMS = [
+    OPTICAL_PORT_PARAMS['CustomName'],
+    OPTICAL_PORT_PARAMS['MaintenanceState'],
+    OPTICAL_PORT_PARAMS['InputLowDegradeThreshold'],
+    OPTICAL_PORT_PARAMS['InputLowDegradeHysteresis'],
+    OPTICAL_PORT_PARAMS['OpticalLosThreshold'],
+    OPTICAL_PORT_PARAMS['OpticalLosHysteresis'],
+]
+
 # Port Numbers
 MUX_OPTICAL_PORT_NUMBERS = [
     '4101', '4102', '4103', '4104', '4105', '4106', '4107', '4108', '4109', '4110',
@@ -77,6 +155,12 @@ DEMUX_OPTICAL_PORT_NUMBERS = [
     '5211', '5212', '5213', '5214', '5215', '5216', '5217', '5218', '5219', '5220',
 ]
 
+
+def get_optical_port_dn(port_number):
+    """Build the 'dn' key of an optical port"""
+    return f'ne=1;chassis=1;card=1;port={port_number}'
+
+
 def ensure_base_directories_exist():
     """Ensure all base directories exist"""
     os.makedirs(YANG_MODULES_DIR, exist_ok=True)
@@ -0,0 +1,118 @@
+import threading
+import time
+from django.conf import settings
+from .redis_manager import RedisManager
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class DeadbandFilter:
+    """
+    Last written value per leaf, used by the poller to skip writes of values
+    that did not change.
+
+    A numeric value counts as changed when it moved more than the deadband
+    of its parameter (MONITORING_DEADBANDS) away from the value last written,
+    anything else when it differs at all. Every leaf is written again after
+    MONITORING_HEARTBEAT_SECONDS even if it did not change, so stable values
+    still show up in the time series and their timestamps stay fresh.
+
+    Checks take the client the value is written through; the value counts
+    as written once that RedisWriteBatch flushed, so a failed flush leaves
+    the leaf due and the value is written again on the next cycle.
+    """
+
+    def __init__(self):
+        # (device_id, component, parameter) -> (value last written, monotonic time written)
+        self._last = {}
+        # (device_id, component) -> leaves of the snapshot last written as a whole
+        self._groups = {}
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "written": 0, "skipped": 0}
+
+    @staticmethod
+    def get_deadband(parameter):
+        """Deadband of a parameter; grouped leaves like '4101/input-power' use the parameter name"""
+        return settings.MONITORING_DEADBANDS.get(parameter.rsplit('/', 1)[-1], 0)
+
+    def _is_due(self, leaf, value, now):
+        # Caller holds self._lock
+        last = self._last.get(leaf)
+        if last is None:
+            return True
+        last_value, written_at = last
+        if now - written_at >= settings.MONITORING_HEARTBEAT_SECONDS:
+            return True
+        new_number, last_number = _to_float(value), _to_float(last_value)
+        if new_number is not None and last_number is not None:
+            return abs(new_number - last_number) > self.get_deadband(leaf[2])
+        return value != last_value
+
+    def should_write(self, device_id, component, parameter, value, client=None):
+        """
+        True if the value changed or its heartbeat is due; it is remembered
+        as written once client (batch or direct client) wrote it
+        """
+        leaf = (device_id, component, parameter)
+        now = time.monotonic()
+        with self._lock:
+            self._stats["checked"] += 1
+            if not self._is_due(leaf, value, now):
+                self._stats["skipped"] += 1
+                return False
+            self._stats["written"] += 1
+        RedisManager.after_write(client, lambda: self._remember(leaf, value, now))
+        return True
+
+    def _remember(self, leaf, value, now):
+        with self._lock:
+            self._last[leaf] = (value, now)
+
+    def should_write_group(self, device_id, component, values, client=None):
+        """
+        Same for a snapshot written as a whole, e.g. all ports of a grouped
+        component: values maps parameter -> value. If any leaf is due or the
+        set of leaves changed, all of them are remembered as written.
+        """
+        now = time.monotonic()
+        group = (device_id, component)
+        leaves = {(device_id, component, parameter): value for parameter, value in values.items()}
+        with self._lock:
+            self._stats["checked"] += 1
+            previous = self._groups.get(group)
+            if previous == frozenset(leaves) and not any(self._is_due(leaf, value, now)
+                                                         for leaf, value in leaves.items()):
+                self._stats["skipped"] += 1
+                return False
+            self._stats["written"] += 1
+        RedisManager.after_write(client, lambda: self._remember_group(group, leaves, now))
+        return True
+
+    def _remember_group(self, group, leaves, now):
+        with self._lock:
+            for leaf in (self._groups.get(group) or frozenset()) - frozenset(leaves):
+                self._last.pop(leaf, None)
+            self._groups[group] = frozenset(leaves)
+            for leaf, value in leaves.items():
+                self._last[leaf] = (value, now)
+
+    def forget_device(self, device_id):
+        """Drop the cached values of a device so its next values are written"""
+        with self._lock:
+            for leaf in [leaf for leaf in self._last if leaf[0] == device_id]:
+                del self._last[leaf]
+            for group in [group for group in self._groups if group[0] == device_id]:
+                del self._groups[group]
+
+    def get_stats(self):
+        """Get checked/written/skipped counters and the number of cached leaves"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["leaves"] = len(self._last)
+        stats["skip_ratio"] = stats["skipped"] / stats["checked"] if stats["checked"] else 0.0
+        return stats
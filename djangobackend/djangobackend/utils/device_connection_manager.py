@@ -1,13 +1,18 @@
+from contextlib import contextmanager
 from ncclient import manager
+from ncclient.transport.errors import TransportError
+from django.conf import settings
+from .device_storage import device_registry
 import threading
 import time
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Cache of active NETCONF sessions
-_sessions = {}
-_lock = threading.Lock()
+# Session pools keyed by (ip, port, username). The registry lock only guards
+# the dict itself; each pool has its own lock so devices never wait on each other.
+_pools = {}
+_pools_lock = threading.Lock()
 
 
 def _create_new_session(device_credentials, timeout=15):
@@ -25,41 +30,253 @@ def _create_new_session(device_credentials, timeout=15):
     )
 
 
-def get_device_connection(device_credentials, retries=2, retry_delay=0.25):
+def _is_session_healthy(session):
+    try:
+        return bool(getattr(session, 'connected', False))
+    except Exception:
+        return False
+
+
+def _close_session_quietly(session):
+    try:
+        session.close_session()
+    except Exception:
+        pass
+
+
+class DeviceSessionPool:
     """
-    Return an active NETCONF session.
-    If existing session is broken, auto-reconnect. Retries on connect failures.
+    Bounded pool of NETCONF sessions to one device.
+
+    Sessions are health-checked on checkout and opened lazily up to `size`;
+    callers beyond that wait until a session is checked back in. After
+    close_all() the pool hands out no sessions and closes those checked in.
     """
-    key = (device_credentials["ip"], device_credentials["port"], device_credentials["username"])
 
-    with _lock:
-        if key in _sessions:
-            session = _sessions[key]
-            try:
-                if getattr(session, 'connected', False):
-                    return session
-            except Exception:
-                pass
+    def __init__(self, device_credentials, size):
+        self.device_credentials = dict(device_credentials)
+        self.size = max(1, int(size))
+        self._idle = []
+        self._open = 0
+        self._in_use = 0
+        self._closed = False
+        self._condition = threading.Condition()
 
-            # close and remove stale session
-            try:
-                session.close_session()
-            except Exception:
-                pass
-            del _sessions[key]
+        # Metrics
+        self.checkouts = 0
+        self.timeouts = 0
+        self.created = 0
+        self.discarded = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.total_hold_time = 0.0
+        self.max_hold_time = 0.0
+
+    def _record_checkout(self, wait_time):
+        # Caller holds self._condition
+        self._in_use += 1
+        self.checkouts += 1
+        self.total_wait_time += wait_time
+        self.max_wait_time = max(self.max_wait_time, wait_time)
+
+    def _raise_if_closed(self):
+        # Caller holds self._condition
+        if self._closed:
+            raise RuntimeError(f"NETCONF session pool of {self.device_credentials['ip']} is closed")
+
+    def checkout(self, timeout=None, retries=2, retry_delay=0.25):
+        """
+        Borrow a healthy session, opening a new one if the pool is not full.
+        Raises TimeoutError if none becomes available within `timeout` seconds,
+        RuntimeError once the pool is closed.
+        """
+        timeout = settings.NETCONF_SESSION_CHECKOUT_TIMEOUT if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
 
+        with self._condition:
+            while True:
+                self._raise_if_closed()
+                while self._idle:
+                    session = self._idle.pop()
+                    if _is_session_healthy(session):
+                        self._record_checkout(time.monotonic() - started)
+                        return session
+                    # close and drop stale session
+                    _close_session_quietly(session)
+                    self._open -= 1
+                    self.discarded += 1
+
+                if self._open < self.size:
+                    # Reserve a slot, connect outside the lock
+                    self._open += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise TimeoutError(
+                        f"No NETCONF session to {self.device_credentials['ip']} available within {timeout}s")
+                self._condition.wait(remaining)
+
+        wait_time = time.monotonic() - started
+        try:
+            session = self._connect(retries, retry_delay)
+        except Exception:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        with self._condition:
+            self.created += 1
+            if self._closed:
+                # Closed while connecting
+                _close_session_quietly(session)
+                self._open -= 1
+                self._raise_if_closed()
+            self._record_checkout(wait_time)
+        return session
+
+    def checkin(self, session, discard=False, hold_time=0.0):
+        """Return a borrowed session; broken or discarded sessions are closed."""
+        with self._condition:
+            self._in_use -= 1
+            self.total_hold_time += hold_time
+            self.max_hold_time = max(self.max_hold_time, hold_time)
+            if discard or self._closed or not _is_session_healthy(session):
+                _close_session_quietly(session)
+                self._open -= 1
+                self.discarded += 1
+            else:
+                self._idle.append(session)
+            self._condition.notify()
+
+    def _connect(self, retries, retry_delay):
+        """Open a new session, retrying on connect failures."""
+        ip = self.device_credentials['ip']
+        port = self.device_credentials['port']
         last_exc = None
         for attempt in range(1, retries + 1):
             try:
-                session = _create_new_session(device_credentials)
-                _sessions[key] = session
-                logger.debug(f"Opened NETCONF session to {device_credentials['ip']}:{device_credentials['port']}")
+                session = _create_new_session(self.device_credentials)
+                logger.debug(f"Opened NETCONF session to {ip}:{port}")
                 return session
             except Exception as e:
                 last_exc = e
-                logger.warning(f"NETCONF connect attempt {attempt} failed for {device_credentials['ip']}: {e}")
+                logger.warning(f"NETCONF connect attempt {attempt} failed for {ip}: {e}")
                 time.sleep(retry_delay)
 
         # If we reach here, all retries failed
-        logger.error(f"Failed to create NETCONF session to {device_credentials['ip']} after {retries} attempts: {last_exc}")
+        logger.error(f"Failed to create NETCONF session to {ip} after {retries} attempts: {last_exc}")
         raise last_exc
+
+    def close_all(self):
+        """Close the pool: idle sessions now, sessions in use when checked in."""
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                _close_session_quietly(self._idle.pop())
+                self._open -= 1
+            # Waiting checkouts fail instead of waiting for their timeout
+            self._condition.notify_all()
+
+    def get_metrics(self):
+        with self._condition:
+            return {
+                "size": self.size,
+                "open": self._open,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "utilization": self._in_use / self.size,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "created": self.created,
+                "discarded": self.discarded,
+                "avg_wait_ms": (self.total_wait_time / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_wait_ms": self.max_wait_time * 1000,
+                "avg_hold_ms": (self.total_hold_time / self.checkouts * 1000) if self.checkouts else 0.0,
+                "max_hold_ms": self.max_hold_time * 1000,
+            }
+
+
+def get_session_pool(device_credentials):
+    """Return the session pool of a device, creating it on first use."""
+    key = _pool_key(device_credentials)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = DeviceSessionPool(device_credentials, settings.NETCONF_SESSION_POOL_SIZE)
+            _pools[key] = pool
+        return pool
+
+
+def _pool_key(device_credentials):
+    return (device_credentials["ip"], device_credentials["port"], device_credentials["username"])
+
+
+def close_stale_session_pools():
+    """
+    Close the pools whose credentials no stored device has any more, e.g.
+    after a device was removed or its password changed; later leases open
+    new pools.
+    """
+    stored = {}
+    for credentials in device_registry.get_all().values():
+        stored.setdefault(_pool_key(credentials), []).append(credentials.get("password"))
+    with _pools_lock:
+        stale = [key for key, pool in _pools.items()
+                 if pool.device_credentials.get("password") not in stored.get(key, [])]
+        pools = [_pools.pop(key) for key in stale]
+    for pool in pools:
+        pool.close_all()
+    if pools:
+        logger.info(f"Closed {len(pools)} NETCONF session pools with outdated credentials")
+
+
+def _on_device_event(event, device_id):
+    if event in ('updated', 'removed'):
+        close_stale_session_pools()
+
+
+device_registry.subscribe(_on_device_event)
+
+
+def close_all_session_pools():
+    """Close every session pool, e.g. when the poller shuts down; later leases open new pools."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+@contextmanager
+def device_session(device_credentials, timeout=None, purpose="rpc"):
+    """
+    Lease a pooled NETCONF session for the duration of a `with` block.
+
+    The session is returned to the pool when the block exits, never closed
+    by the caller. If the block fails with a transport error the session is
+    dropped instead, so the next lease gets a fresh connection.
+    """
+    pool = get_session_pool(device_credentials)
+    session = pool.checkout(timeout)
+    leased_at = time.monotonic()
+    discard = False
+    try:
+        yield session
+    except TransportError:
+        discard = True
+        raise
+    finally:
+        hold_time = time.monotonic() - leased_at
+        pool.checkin(session, discard=discard, hold_time=hold_time)
+        logger.debug(f"Released {purpose} lease on {device_credentials['ip']} after {hold_time*1000:.1f} ms")
+
+
+def get_session_pool_metrics():
+    """Return wait time, lease hold time and utilization metrics of every session pool."""
+    with _pools_lock:
+        pools = dict(_pools)
+    return {f"{ip}:{port}": pool.get_metrics() for (ip, port, _), pool in pools.items()}
@@ -1,5 +1,7 @@
 import json
 import os
+import tempfile
+import threading
 from django.conf import settings
 import logging
 
@@ -14,74 +16,185 @@ def ensure_device_storage_exists():
         with open(DEVICE_STORAGE_FILE, 'w') as f:
             json.dump({}, f)
 
+
+def _normalize_credentials(credentials):
+    credentials = dict(credentials)
+    # Convert port to int if it's a string
+    if isinstance(credentials.get('port'), str):
+        credentials['port'] = int(credentials['port'])
+    return credentials
+
+
+class DeviceRegistry:
+    """
+    In-memory copy of the device storage file: device_id -> credentials.
+
+    Lookups only stat the file and reload it when its mtime, size or inode
+    changed, e.g. after another process wrote it. Writes update the copy and
+    replace the file atomically (temp file + os.replace), so readers never
+    see a half-written file. Subscribers get ('added', device_id),
+    ('updated', device_id) (credentials changed) and ('removed', device_id)
+    events for changes made here or found on reload.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._devices = {}
+        self._file_stat = None
+        self._lock = threading.RLock()
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """Call callback(event, device_id) when a device is added, updated or removed"""
+        with self._lock:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _notify(self, previous, current):
+        events = [('added', device_id) for device_id in current.keys() - previous.keys()]
+        events += [('updated', device_id) for device_id in current.keys() & previous.keys()
+                   if current[device_id] != previous[device_id]]
+        events += [('removed', device_id) for device_id in previous.keys() - current.keys()]
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for event, device_id in events:
+            for callback in subscribers:
+                try:
+                    callback(event, device_id)
+                except Exception as e:
+                    logger.error(f"Device registry subscriber failed on {event} {device_id}: {e}")
+
+    @staticmethod
+    def _stat_key(stat):
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _refresh(self):
+        """Reload the file if it changed since it was last read or written"""
+        with self._lock:
+            if not os.path.exists(self.path):
+                with open(self.path, 'w') as f:
+                    json.dump({}, f)
+            stat_key = self._stat_key(os.stat(self.path))
+            if stat_key == self._file_stat:
+                return
+            with open(self.path, 'r') as f:
+                devices_data = {device_id: _normalize_credentials(credentials)
+                                for device_id, credentials in json.load(f).items()}
+            previous, self._devices = self._devices, devices_data
+            first_load = self._file_stat is None
+            self._file_stat = stat_key
+        if not first_load:
+            self._notify(previous, devices_data)
+
+    def _write(self, devices):
+        # Caller holds self._lock
+        directory = os.path.dirname(self.path) or '.'
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.device_storage.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(devices, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        self._devices = devices
+        self._file_stat = self._stat_key(os.stat(self.path))
+
+    def get_all(self):
+        """device_id -> copy of its credentials"""
+        self._refresh()
+        with self._lock:
+            return {device_id: dict(credentials) for device_id, credentials in self._devices.items()}
+
+    def get(self, device_id):
+        """Copy of a device's credentials, None if unknown"""
+        self._refresh()
+        with self._lock:
+            credentials = self._devices.get(device_id)
+            return dict(credentials) if credentials is not None else None
+
+    def get_ids(self):
+        self._refresh()
+        with self._lock:
+            return list(self._devices)
+
+    def save_many(self, devices):
+        """Add or update several devices (device_id -> credentials) with one file write"""
+        self._refresh()
+        with self._lock:
+            previous = self._devices
+            updated = dict(previous)
+            for device_id, credentials in devices.items():
+                updated[device_id] = _normalize_credentials(credentials)
+            self._write(updated)
+        self._notify(previous, updated)
+
+    def delete(self, device_id):
+        """Remove a device; False if it is not stored"""
+        self._refresh()
+        with self._lock:
+            previous = self._devices
+            if device_id not in previous:
+                return False
+            updated = {dev_id: credentials for dev_id, credentials in previous.items() if dev_id != device_id}
+            self._write(updated)
+        self._notify(previous, updated)
+        return True
+
+
+# Global registry of the device storage file
+device_registry = DeviceRegistry(DEVICE_STORAGE_FILE)
+
+def _to_device(device_id, credentials):
+    return {
+        'id': device_id,
+        'name': f"Device-{device_id[:8]}",  # Use first 8 chars of UUID as name
+        'credentials': credentials,
+        'dataRefreshInterval': 2  # Default to 2 seconds
+    }
+
 def get_all_devices():
     """Get all devices from storage"""
     try:
-        ensure_device_storage_exists()
-        with open(DEVICE_STORAGE_FILE, 'r') as f:
-            devices_data = json.load(f)
-            
-        # Convert the format to match expected structure
-        devices = {}
-        for device_id, credentials in devices_data.items():
-            # Convert port to int if it's a string
-            if isinstance(credentials.get('port'), str):
-                credentials['port'] = int(credentials['port'])
-            
-            devices[device_id] = {
-                'id': device_id,
-                'name': f"Device-{device_id[:8]}",  # Use first 8 chars of UUID as name
-                'credentials': credentials,
-                'dataRefreshInterval': 2  # Default to 2 seconds
-            }
-        return devices
+        return {device_id: _to_device(device_id, credentials)
+                for device_id, credentials in device_registry.get_all().items()}
     except Exception as e:
         logger.error(f"Failed to read device storage: {e}")
         return {}
 
 def get_device_by_id(device_id):
     """Get device by ID"""
-    devices = get_all_devices()
-    return devices.get(device_id)
+    credentials = get_device_credentials(device_id)
+    if credentials is None:
+        return None
+    return _to_device(device_id, credentials)
 
 def save_device(device_id, device_data):
     """Save device to storage"""
+    return save_devices({device_id: device_data})
+
+def save_devices(devices):
+    """Save several devices (device_id -> device data) to storage with one write"""
     try:
-        ensure_device_storage_exists()
-        devices = get_all_devices()
-        devices[device_id] = device_data
-        
-        # Convert back to the simple format for storage
-        storage_data = {}
-        for dev_id, dev_data in devices.items():
-            storage_data[dev_id] = dev_data.get('credentials', {})
-        
-        with open(DEVICE_STORAGE_FILE, 'w') as f:
-            json.dump(storage_data, f, indent=2)
-        
-        logger.info(f"Saved device {device_id}")
+        device_registry.save_many({device_id: device_data.get('credentials', {})
+                                   for device_id, device_data in devices.items()})
+        logger.info(f"Saved devices {', '.join(devices)}")
         return True
     except Exception as e:
-        logger.error(f"Failed to save device {device_id}: {e}")
+        logger.error(f"Failed to save devices {', '.join(devices)}: {e}")
         return False
 
 def delete_device(device_id):
     """Delete device from storage"""
     try:
-        ensure_device_storage_exists()
-        devices = get_all_devices()
-        
-        if device_id in devices:
-            del devices[device_id]
-            
-            # Convert back to the simple format for storage
-            storage_data = {}
-            for dev_id, dev_data in devices.items():
-                storage_data[dev_id] = dev_data.get('credentials', {})
-            
-            with open(DEVICE_STORAGE_FILE, 'w') as f:
-                json.dump(storage_data, f, indent=2)
-            
+        if device_registry.delete(device_id):
             logger.info(f"Deleted device {device_id}")
             return True
         else:
@@ -93,12 +206,16 @@ def delete_device(device_id):
 
 def get_device_credentials(device_id):
     """Get device credentials by ID"""
-    device = get_device_by_id(device_id)
-    if device:
-        return device.get('credentials')
-    return None
+    try:
+        return device_registry.get(device_id)
+    except Exception as e:
+        logger.error(f"Failed to read device storage: {e}")
+        return None
 
 def get_all_device_ids():
     """Get all device IDs from storage"""
-    devices = get_all_devices()
-    return list(devices.keys()) 
\ No newline at end of file
+    try:
+        return device_registry.get_ids()
+    except Exception as e:
+        logger.error(f"Failed to read device storage: {e}")
+        return []
@@ -0,0 +1,100 @@
+import re
+
+AGGREGATORS = ('min', 'max', 'avg', 'sum', 'count', 'first', 'last')
+# Default set returned per bucket by bucketed time series queries
+DEFAULT_BUCKET_AGGREGATORS = ('min', 'max', 'avg', 'last', 'count')
+
+_STEP_UNITS_MS = {'ms': 1, 's': 1000, 'm': 60 * 1000, 'h': 60 * 60 * 1000, 'd': 24 * 60 * 60 * 1000}
+
+
+def aggregate_values(values, aggregator):
+    """Reduce the values of one bucket (in time order) with aggregator"""
+    if aggregator == 'min':
+        return min(values)
+    if aggregator == 'max':
+        return max(values)
+    if aggregator == 'sum':
+        return sum(values)
+    if aggregator == 'count':
+        return len(values)
+    if aggregator == 'first':
+        return values[0]
+    if aggregator == 'last':
+        return values[-1]
+    if aggregator == 'avg':
+        return sum(values) / len(values)
+    raise ValueError(f"Unknown aggregator '{aggregator}'")
+
+
+def aggregate_points(points, bucket_ms, aggregators):
+    """
+    Group [(timestamp_ms, value)] into epoch aligned buckets of bucket_ms
+
+    Returns:
+        list: [(bucket_start_ms, {aggregator: value})] in time order
+    """
+    buckets = {}
+    for ts, value in sorted(points):
+        buckets.setdefault(int(ts) - int(ts) % bucket_ms, []).append(value)
+    return [
+        (bucket, {aggregator: aggregate_values(values, aggregator) for aggregator in aggregators})
+        for bucket, values in sorted(buckets.items())
+    ]
+
+
+def lttb(points, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of [(timestamp_ms, value)]
+
+    Keeps the first and last point and, from each of threshold - 2 equal
+    buckets in between, the point spanning the largest triangle with the
+    previously kept point and the average of the next bucket. Peaks survive,
+    unlike with averaging.
+    """
+    points = sorted(points)
+    if threshold >= len(points) or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    every = (len(points) - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, len(points))
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        ax, ay = points[a]
+        best_area = -1
+        best = start
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (points[j][1] - ay) - (ax - points[j][0]) * (avg_y - ay))
+            if area > best_area:
+                best_area = area
+                best = j
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def parse_step_ms(step):
+    """Parse a bucket width such as 500, '500ms', '10s', '5m' or '1h' into milliseconds"""
+    if isinstance(step, (int, float)):
+        return int(step)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*(ms|s|m|h|d)?\s*', str(step))
+    if not match:
+        raise ValueError(f"Invalid step '{step}'")
+    value, unit = match.groups()
+    return int(float(value) * _STEP_UNITS_MS[unit or 'ms'])
+
+
+def parse_epoch_ms(value):
+    """Parse epoch seconds or milliseconds into milliseconds"""
+    number = float(value)
+    # Anything below 1e12 cannot be a millisecond timestamp after 2001
+    return int(number * 1000) if number < 1e12 else int(number)
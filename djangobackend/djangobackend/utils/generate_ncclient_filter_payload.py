@@ -1,59 +1,135 @@
-import os
+import threading
+from copy import deepcopy
 
 from lxml import etree
 
-from ..settings import BASE_DIR
-from .common import (add_request_parameters, clean_xml_from_namespaces,
-                     get_namespace_attribute_dictionary, get_xml_tree,
-                     get_xpath, make_xml_from_xpath, make_xml_with_namespaces,
-                     print_xml_tree)
-from .component_to_yang_module_map import YANG_MODULES
-from .data import sample_rpc_reply, ensure_device_directories_exist
+from .common import (add_request_parameters, get_xml_tree,
+                     make_xml_from_xpath, make_xml_with_namespaces)
+from .data import ensure_device_directories_exist
+from .yang_skeleton_index import get_skeleton_index
 
+# Compiled filters keyed by (device_id, component, parameters, query).
+# Each entry remembers the skeleton file and mtime it was compiled from so
+# a regenerated skeleton is picked up without an explicit invalidation.
+_filter_cache = {}
+_filter_cache_lock = threading.Lock()
 
-def generate_ncclient_filter_payload(component, target_parameters, query, device_id=None):
-    # Ensure device directories exist
-    ensure_device_directories_exist(device_id)
-    
-    # Try device-specific XML skeleton first, then fall back to components_xml
-    if device_id:
-        from .data import get_device_xml_skeletons_dir
-        device_xml_dir = get_device_xml_skeletons_dir(device_id)
-        xml_file_path = os.path.join(device_xml_dir, f"{YANG_MODULES[component]}.xml")
-        
-        # If device-specific file doesn't exist, fall back to components_xml
-        if not os.path.exists(xml_file_path):
-            xml_file_path = os.path.join(
-                BASE_DIR, 'data', 'components_xml', f"{YANG_MODULES[component]}.xml")
-    else:
-        # Use components_xml as default
-        xml_file_path = os.path.join(
-            BASE_DIR, 'data', 'components_xml', f"{YANG_MODULES[component]}.xml")
-
-    # Check if the XML file exists
-    if not os.path.exists(xml_file_path):
-        raise FileNotFoundError(f"XML skeleton file not found: {xml_file_path}. Please generate schemas for this component first.")
-
-    parser = etree.XMLParser(remove_blank_text=True)
-    root = etree.parse(xml_file_path, parser)
-    clean_xml_from_namespaces(root)
-    # reduce_xml_namespaces(root)
-
-    namespaces_dict = get_namespace_attribute_dictionary(root)
 
+def _freeze_query(query):
+    """Turn a {tag: {key: value}} query into a hashable cache key part"""
+    if not query:
+        return ()
+    return tuple(sorted(
+        (tag, tuple(sorted((key, str(value)) for key, value in params.items())))
+        for tag, params in query.items()
+    ))
+
+
+def invalidate_filter_cache(device_id=None):
+    """
+    Drop compiled filters after skeletons are rewritten
+
+    Args:
+        device_id (str, optional): Only drop filters of this device. When
+            omitted every cached filter is dropped.
+    """
+    with _filter_cache_lock:
+        if device_id is None:
+            _filter_cache.clear()
+            return
+        for key in [k for k in _filter_cache if k[0] == device_id]:
+            del _filter_cache[key]
+
+
+def _get_cached_filter(cache_key, index):
+    with _filter_cache_lock:
+        cached = _filter_cache.get(cache_key)
+    if cached and cached[0] == index.xml_file_path and cached[1] == index.mtime:
+        return cached[2]
+    return None
+
+
+def _store_cached_filter(cache_key, index, netconf_filter):
+    with _filter_cache_lock:
+        _filter_cache[cache_key] = (index.xml_file_path, index.mtime, netconf_filter)
+
+
+def _build_filter_root(index, target_parameters):
     output_root = None
+    elements_by_tag = {}
     for target_parameter in target_parameters:
         # The XPath for the parameter for which we want to generate xml filter
-        target_x_path = get_xpath(root, target_parameter)
+        target_x_path = index.get_xpath(target_parameter)
 
         # The returned xml is clean without any attribute
-        output_root = make_xml_from_xpath(target_x_path, output_root)
+        output_root = make_xml_from_xpath(target_x_path, output_root, elements_by_tag)
+
+    make_xml_with_namespaces(output_root, index.namespaces)
+    return output_root, elements_by_tag
+
+
+def generate_ncclient_filter_payload(component, target_parameters, query, device_id=None):
+    # Ensure device directories exist
+    ensure_device_directories_exist(device_id)
+
+    index = get_skeleton_index(component, device_id)
+
+    cache_key = (device_id, component, tuple(target_parameters), _freeze_query(query))
+    netconf_filter = _get_cached_filter(cache_key, index)
+    if netconf_filter is not None:
+        return netconf_filter
 
-    make_xml_with_namespaces(output_root, namespaces_dict)
+    output_root, _ = _build_filter_root(index, target_parameters)
 
     # Add any values to tags that are sent from client
     add_request_parameters(output_root, query)
 
     output_root.tag = "filter"
 
-    return get_xml_tree(output_root)
+    netconf_filter = get_xml_tree(output_root)
+    _store_cached_filter(cache_key, index, netconf_filter)
+
+    return netconf_filter
+
+
+def generate_ncclient_bulk_filter_payload(component, target_parameters, list_name, dns, device_id=None):
+    """
+    Build one subtree filter selecting the same parameters of many list entries
+
+    Args:
+        component (str): Component name from YANG_MODULES
+        target_parameters (list): Parameters to fetch for every entry
+        list_name (str): YANG list holding the entries (e.g. 'physical-port')
+        dns (list): 'dn' keys of the entries to select
+        device_id (str, optional): Device whose skeleton should be used
+    """
+    # Ensure device directories exist
+    ensure_device_directories_exist(device_id)
+
+    index = get_skeleton_index(component, device_id)
+
+    cache_key = (device_id, component, tuple(target_parameters), ('bulk', list_name, tuple(dns)))
+    netconf_filter = _get_cached_filter(cache_key, index)
+    if netconf_filter is not None:
+        return netconf_filter
+
+    output_root, elements_by_tag = _build_filter_root(index, target_parameters)
+
+    # Repeat the list entry once per dn, each with its own key selection
+    list_entry = elements_by_tag.get(list_name)
+    if list_entry is None:
+        raise ValueError(f"List {list_name} is not on the path of the requested parameters")
+    list_parent = list_entry.getparent()
+    list_parent.remove(list_entry)
+    for dn in dns:
+        entry = deepcopy(list_entry)
+        dn_tag = etree.SubElement(entry, 'dn')
+        dn_tag.text = dn
+        list_parent.append(entry)
+
+    output_root.tag = "filter"
+
+    netconf_filter = get_xml_tree(output_root)
+    _store_cached_filter(cache_key, index, netconf_filter)
+
+    return netconf_filter
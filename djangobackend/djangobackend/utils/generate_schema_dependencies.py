@@ -3,6 +3,8 @@ import os
 # from .ncclient_manager import ncclient_manager
 from .data import get_device_yang_modules_dir, get_device_xml_skeletons_dir
 from .yang_to_xml_skeleton import yang_to_xml_skeleton
+from .generate_ncclient_filter_payload import invalidate_filter_cache
+from .yang_skeleton_index import invalidate_skeleton_index
 
 
 def generate_schema_dependencies(schemas, device_id=None):
@@ -17,3 +19,7 @@ def generate_schema_dependencies(schemas, device_id=None):
             xml_skeletons_dir, schema["dependency_name"] + ".xml")
         yang_to_xml_skeleton(
             YANG_FILE_PATH, XML_SKELETON_FILE_PATH, schema['dependencies'], device_id=device_id)
+
+    # Skeletons were rewritten, indexes and compiled filters are stale
+    invalidate_skeleton_index(device_id)
+    invalidate_filter_cache(device_id)
@@ -6,8 +6,9 @@ from .common import (
     clean_xml_from_namespaces,
     validate_device_credentials,
 )
-from .generate_ncclient_filter_payload import generate_ncclient_filter_payload
-from .device_connection_manager import get_device_connection
+from .generate_ncclient_filter_payload import (generate_ncclient_filter_payload,
+                                               generate_ncclient_bulk_filter_payload)
+from .device_connection_manager import device_session
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,6 +24,73 @@ def get_target_params_dict(target_parameters):
     return {parameter: None for parameter in target_parameters}
 
 
+def get_reply_timestamp(response_root):
+    """
+    Extract a device-provided timestamp from a cleaned reply, falling back
+    to server time in UTC ISO format.
+    """
+    # Try to extract a device-provided timestamp from common element names
+    ts = None
+    for candidate in ("timestamp", "time", "event-time", "time-stamp", "last-changed", "last-updated"):
+        el = response_root.find(f".//{candidate}")
+        if el is not None and el.text:
+            ts = el.text.strip()
+            break
+
+    # If timestamp looks numeric (epoch seconds or ms), convert to int
+    if ts is not None:
+        try:
+            if ts.isdigit():
+                # numeric string
+                return int(ts)
+            return ts
+        except Exception:
+            return ts
+
+    # fallback to server time in UTC ISO
+    return datetime.now(timezone.utc).isoformat()
+
+
+def parse_data_reply(rpc_reply_xml, target_parameters):
+    """Extract parameter -> value, plus timestamp, from a <get> reply"""
+    result = get_target_params_dict(target_parameters)
+    response_root = etree.fromstring(rpc_reply_xml.encode("utf-8"))
+    clean_xml_from_namespaces(response_root)
+
+    # Extract requested parameters
+    for parameter in target_parameters:
+        element = response_root.find(f".//{parameter}")
+        result[parameter] = element.text if element is not None else None
+
+    result["timestamp"] = get_reply_timestamp(response_root)
+    return result
+
+
+def parse_bulk_data_reply(rpc_reply_xml, target_parameters, list_name, dns):
+    """Split a bulk <get> reply into dn -> (parameter -> value, plus timestamp)"""
+    results = {dn: get_target_params_dict(target_parameters) for dn in dns}
+    response_root = etree.fromstring(rpc_reply_xml.encode("utf-8"))
+    clean_xml_from_namespaces(response_root)
+
+    timestamp = get_reply_timestamp(response_root)
+
+    # Demultiplex the reply by each entry's dn
+    for entry in response_root.iter(list_name):
+        dn_element = entry.find("dn")
+        if dn_element is None or dn_element.text is None:
+            continue
+        result = results.get(dn_element.text.strip())
+        if result is None:
+            continue
+        for parameter in target_parameters:
+            element = entry.find(f".//{parameter}")
+            result[parameter] = element.text if element is not None else None
+
+    for result in results.values():
+        result["timestamp"] = timestamp
+    return results
+
+
 def get_data(device_credentials, component, target_parameter, query, device_id=None):
     """
     Poll NETCONF device for given parameters using XML skeletons.
@@ -33,7 +101,6 @@ def get_data(device_credentials, component, target_parameter, query, device_id=N
 
     # Normalize parameters
     target_parameters = get_parameters_array(target_parameter)
-    result = get_target_params_dict(target_parameters)
 
     # We'll set timestamp after polling: prefer device-provided timestamp when available.
 
@@ -42,49 +109,54 @@ def get_data(device_credentials, component, target_parameter, query, device_id=N
         component, target_parameters, query, device_id
     )
 
-    # Get or create NETCONF session
-    session = get_device_connection(device_credentials)
-
     try:
-        t0 = time.time()
-        rpc_reply = session.get(filter=netconf_filter)
-        t1 = time.time()
+        # Borrow a pooled NETCONF session only for the RPC itself
+        with device_session(device_credentials) as session:
+            t0 = time.time()
+            rpc_reply = session.get(filter=netconf_filter)
+            t1 = time.time()
         rpc_reply_xml = rpc_reply.xml
         logger.debug(f"NETCONF fetch for {device_id} took {(t1-t0)*1000:.1f} ms")
 
-        response_root = etree.fromstring(rpc_reply_xml.encode("utf-8"))
-        clean_xml_from_namespaces(response_root)
-
-        # Extract requested parameters
-        for parameter in target_parameters:
-            element = response_root.find(f".//{parameter}")
-            result[parameter] = element.text if element is not None else None
-
-        # Try to extract a device-provided timestamp from common element names
-        ts = None
-        for candidate in ("timestamp", "time", "event-time", "time-stamp", "last-changed", "last-updated"):
-            el = response_root.find(f".//{candidate}")
-            if el is not None and el.text:
-                ts = el.text.strip()
-                break
-
-        # If timestamp looks numeric (epoch seconds or ms), convert to int
-        if ts is not None:
-            try:
-                if ts.isdigit():
-                    # numeric string
-                    num = int(ts)
-                    result["timestamp"] = num
-                else:
-                    result["timestamp"] = ts
-            except Exception:
-                result["timestamp"] = ts
-        else:
-            # fallback to server time in UTC ISO
-            result["timestamp"] = datetime.now(timezone.utc).isoformat()
+        result = parse_data_reply(rpc_reply_xml, target_parameters)
 
     except Exception as e:
         logger.exception("NETCONF get failed")
         raise Exception(f"Failed to retrieve data: {str(e)}")
 
     return result
+
+
+def get_data_bulk(device_credentials, component, target_parameter, list_name, dns, device_id=None):
+    """
+    Poll the same parameters of many list entries (e.g. optical ports) with a
+    single NETCONF <get> and split the reply by 'dn'.
+    Returns dict of dn -> (dict of parameter -> value, plus timestamp).
+    """
+    if not validate_device_credentials(device_credentials):
+        raise ValueError("Invalid device credentials")
+
+    # Normalize parameters
+    target_parameters = get_parameters_array(target_parameter)
+
+    # Build one NETCONF filter covering every requested entry
+    netconf_filter = generate_ncclient_bulk_filter_payload(
+        component, target_parameters, list_name, dns, device_id
+    )
+
+    try:
+        # Borrow a pooled NETCONF session only for the RPC itself
+        with device_session(device_credentials) as session:
+            t0 = time.time()
+            rpc_reply = session.get(filter=netconf_filter)
+            t1 = time.time()
+        rpc_reply_xml = rpc_reply.xml
+        logger.debug(f"NETCONF bulk fetch of {len(dns)} {list_name} entries for {device_id} took {(t1-t0)*1000:.1f} ms")
+
+        results = parse_bulk_data_reply(rpc_reply_xml, target_parameters, list_name, dns)
+
+    except Exception as e:
+        logger.exception("NETCONF bulk get failed")
+        raise Exception(f"Failed to retrieve data: {str(e)}")
+
+    return results
@@ -0,0 +1,186 @@
+import struct
+
+# Chunk header: point count, first timestamp (ms), first value (IEEE 754 bits)
+_HEADER = struct.Struct('>IqQ')
+_FLOAT = struct.Struct('>d')
+_UINT64 = struct.Struct('>Q')
+# Raw uncompressed record: timestamp (ms), value
+RAW_RECORD = struct.Struct('>qd')
+
+_MASK64 = (1 << 64) - 1
+
+
+def _float_to_bits(value):
+    return _UINT64.unpack(_FLOAT.pack(value))[0]
+
+
+def _bits_to_float(bits):
+    return _FLOAT.unpack(_UINT64.pack(bits))[0]
+
+
+class BitWriter:
+    def __init__(self):
+        self._buffer = bytearray()
+        self._acc = 0
+        self._count = 0
+
+    def write(self, value, nbits):
+        self._acc = (self._acc << nbits) | (value & ((1 << nbits) - 1))
+        self._count += nbits
+        while self._count >= 8:
+            self._count -= 8
+            self._buffer.append((self._acc >> self._count) & 0xFF)
+        self._acc &= (1 << self._count) - 1
+
+    def getvalue(self):
+        data = bytes(self._buffer)
+        if self._count:
+            data += bytes([(self._acc << (8 - self._count)) & 0xFF])
+        return data
+
+
+class BitReader:
+    def __init__(self, data):
+        self._bits = bin(int.from_bytes(data, 'big'))[2:].zfill(len(data) * 8) if data else ''
+        self._pos = 0
+
+    def read(self, nbits):
+        if nbits == 0:
+            return 0
+        end = self._pos + nbits
+        if end > len(self._bits):
+            raise ValueError("Truncated chunk")
+        value = int(self._bits[self._pos:end], 2)
+        self._pos = end
+        return value
+
+    def read_bit(self):
+        return self.read(1)
+
+
+# Delta-of-delta buckets: (prefix bits, prefix length, payload bits)
+_DOD_BUCKETS = (
+    (0b10, 2, 7),
+    (0b110, 3, 9),
+    (0b1110, 4, 12),
+)
+
+
+def _write_dod(writer, dod):
+    if dod == 0:
+        writer.write(0, 1)
+        return
+    for prefix, prefix_len, nbits in _DOD_BUCKETS:
+        low = -(1 << (nbits - 1)) + 1
+        high = 1 << (nbits - 1)
+        if low <= dod <= high:
+            writer.write(prefix, prefix_len)
+            writer.write(dod - low, nbits)
+            return
+    writer.write(0b1111, 4)
+    writer.write(dod & _MASK64, 64)
+
+
+def _read_dod(reader):
+    if reader.read_bit() == 0:
+        return 0
+    if reader.read_bit() == 0:
+        return reader.read(7) - 63
+    if reader.read_bit() == 0:
+        return reader.read(9) - 255
+    if reader.read_bit() == 0:
+        return reader.read(12) - 2047
+    value = reader.read(64)
+    return value - (1 << 64) if value >> 63 else value
+
+
+def encode_chunk(points):
+    """
+    Compress [(timestamp_ms, float)] sorted by time: timestamps as
+    delta-of-delta, values XORed with the previous value (Gorilla encoding).
+    """
+    if not points:
+        return b''
+    first_ts, first_value = points[0]
+    writer = BitWriter()
+
+    prev_ts = first_ts
+    prev_delta = 0
+    prev_bits = _float_to_bits(first_value)
+    prev_leading = prev_trailing = None
+
+    for ts, value in points[1:]:
+        delta = ts - prev_ts
+        _write_dod(writer, delta - prev_delta)
+        prev_ts, prev_delta = ts, delta
+
+        bits = _float_to_bits(value)
+        xor = bits ^ prev_bits
+        prev_bits = bits
+        if xor == 0:
+            writer.write(0, 1)
+            continue
+        leading = min(64 - xor.bit_length(), 31)
+        trailing = (xor & -xor).bit_length() - 1
+        if prev_leading is not None and leading >= prev_leading and trailing >= prev_trailing:
+            # Meaningful bits fit in the previous window
+            writer.write(0b10, 2)
+            writer.write(xor >> prev_trailing, 64 - prev_leading - prev_trailing)
+        else:
+            meaningful = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, 5)
+            # 64 meaningful bits do not fit in 6 bits and are stored as 0
+            writer.write(meaningful & 0x3F, 6)
+            writer.write(xor >> trailing, meaningful)
+            prev_leading, prev_trailing = leading, trailing
+
+    return _HEADER.pack(len(points), first_ts, _float_to_bits(first_value)) + writer.getvalue()
+
+
+def chunk_point_count(data):
+    """Number of points in a chunk without decoding it"""
+    return _HEADER.unpack_from(data)[0] if data else 0
+
+
+def decode_chunk(data):
+    """Decompress a chunk made by encode_chunk() into [(timestamp_ms, float)]"""
+    if not data:
+        return []
+    count, first_ts, first_bits = _HEADER.unpack_from(data)
+    reader = BitReader(data[_HEADER.size:])
+    points = [(first_ts, _bits_to_float(first_bits))]
+
+    prev_ts = first_ts
+    prev_delta = 0
+    prev_bits = first_bits
+    prev_leading = prev_trailing = 0
+
+    for _ in range(count - 1):
+        prev_delta += _read_dod(reader)
+        prev_ts += prev_delta
+
+        if reader.read_bit() == 1:
+            if reader.read_bit() == 1:
+                prev_leading = reader.read(5)
+                meaningful = reader.read(6) or 64
+                prev_trailing = 64 - prev_leading - meaningful
+            else:
+                meaningful = 64 - prev_leading - prev_trailing
+            prev_bits ^= reader.read(meaningful) << prev_trailing
+        points.append((prev_ts, _bits_to_float(prev_bits)))
+
+    return points
+
+
+def pack_raw_points(points):
+    """Serialize [(timestamp_ms, float)] as fixed size raw records"""
+    return b''.join(RAW_RECORD.pack(int(ts), float(value)) for ts, value in points)
+
+
+def unpack_raw_points(data):
+    """Parse raw records written by pack_raw_points(), ignoring a torn trailing record"""
+    if not data:
+        return []
+    usable = len(data) - len(data) % RAW_RECORD.size
+    return list(RAW_RECORD.iter_unpack(data[:usable]))
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+import redis.asyncio as aioredis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_PATH = '/api/redis/stream'
+
+
+def _split_query_values(query, name):
+    return [item for value in query.get(name, []) for item in value.split(',') if item]
+
+
+def _cors_headers(scope):
+    """Allow origins of CORS_ALLOWED_ORIGINS; the stream bypasses Django's middleware"""
+    origin = dict(scope.get('headers') or []).get(b'origin', b'').decode('latin-1')
+    if origin and origin in settings.CORS_ALLOWED_ORIGINS:
+        return [(b'access-control-allow-origin', origin.encode('latin-1'))]
+    return []
+
+
+async def _send_error(send, scope, status, message):
+    body = json.dumps({"error": {"message": message}}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json')] + _cors_headers(scope),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def monitoring_stream_app(scope, receive, send):
+    """
+    ASGI app streaming changed values of devices as server-sent events
+
+    GET /api/redis/stream?deviceId=a,b[&component=booster,...]
+
+    Subscribes to the device:{id}:changes channels RedisManager.publish_change()
+    writes to and sends every message as a `change` event:
+    {"deviceId", "kind", "component", "parameter", "value", "timestamp_local"}.
+    Grouped port snapshots publish one message per changed port with the
+    port number as parameter and its values as value.
+    """
+    if scope['method'] != 'GET':
+        await _send_error(send, scope, 405, "Method not allowed")
+        return
+    query = parse_qs(scope.get('query_string', b'').decode())
+    device_ids = _split_query_values(query, 'deviceId')
+    components = set(_split_query_values(query, 'component'))
+    if not device_ids:
+        await _send_error(send, scope, 400, "Missing required parameter: deviceId")
+        return
+
+    client = aioredis.Redis(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        db=settings.REDIS_DB_MONITORING,
+        decode_responses=True,
+        socket_connect_timeout=5,
+    )
+    pubsub = client.pubsub()
+    try:
+        await pubsub.subscribe(*[f"device:{device_id}:changes" for device_id in device_ids])
+    except Exception as e:
+        logger.error(f"Failed to subscribe to device changes: {e}")
+        await client.close()
+        await _send_error(send, scope, 503, f"Failed to subscribe to device changes: {str(e)}")
+        return
+
+    disconnected = asyncio.Event()
+
+    async def watch_disconnect():
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                return
+
+    watcher = asyncio.create_task(watch_disconnect())
+    loop = asyncio.get_running_loop()
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                # Stop nginx from buffering the stream
+                (b'x-accel-buffering', b'no'),
+            ] + _cors_headers(scope),
+        })
+        await send({'type': 'http.response.body', 'body': b': connected\n\n', 'more_body': True})
+        last_sent = loop.time()
+
+        while not disconnected.is_set():
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message is not None and message['type'] == 'message':
+                try:
+                    change = json.loads(message['data'])
+                except ValueError:
+                    continue
+                if components and change.get('component') not in components:
+                    continue
+                payload = json.dumps(change, separators=(',', ':'))
+                await send({'type': 'http.response.body',
+                            'body': f"event: change\ndata: {payload}\n\n".encode(), 'more_body': True})
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= settings.MONITORING_STREAM_KEEPALIVE_SECONDS:
+                await send({'type': 'http.response.body', 'body': b': keepalive\n\n', 'more_body': True})
+                last_sent = loop.time()
+    except OSError:
+        # Client went away while an event was being sent
+        pass
+    except Exception as e:
+        logger.error(f"Monitoring stream failed: {e}")
+    finally:
+        watcher.cancel()
+        try:
+            await pubsub.unsubscribe()
+            await pubsub.close()
+            await client.close()
+        except Exception as e:
+            logger.debug(f"Failed to close monitoring stream subscription: {e}")
@@ -0,0 +1,274 @@
+import json
+import math
+import os
+import socket
+import threading
+import time
+import uuid
+import logging
+from django.conf import settings
+from .redis_manager import monitoring_redis
+from .background_poller import device_poller
+from .sharded_poller import HashRing
+
+logger = logging.getLogger(__name__)
+
+# Devices the fleet polls, live nodes, node heartbeats and device leases
+DEVICES_KEY = 'poller:devices'
+NODES_KEY = 'poller:nodes'
+NODE_KEY_PREFIX = 'poller:node:'
+LEASE_KEY_PREFIX = 'poller:lease:'
+
+# Extend or delete a lease only while this node still holds it
+_RENEW_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class PollerCluster:
+    """
+    Poller for POLLER_MODE = 'cluster': any number of nodes (Django
+    processes, on one host or several sharing Redis and device storage)
+    split the devices of the fleet through expiring Redis leases.
+
+    Every POLLER_LEASE_RENEW_SECONDS a node refreshes its heartbeat, renews
+    its leases and claims unleased devices (SET NX PX) up to its fair share
+    of the fleet, preferring the devices the hash ring of live nodes gives
+    it; above its share it releases devices so new nodes get work. Devices
+    of a node that dies are claimed by the others once its leases expire
+    (POLLER_LEASE_TTL_MS). Claimed devices are polled by the local
+    device_poller.
+    """
+
+    def __init__(self, manager=monitoring_redis):
+        self.manager = manager
+        self.node_id = settings.POLLER_NODE_ID or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.running = False
+        self._draining = False
+        self.owned = set()
+        self._started_at = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._renew_lease = manager.redis_client.register_script(_RENEW_LEASE_SCRIPT)
+        self._release_lease = manager.redis_client.register_script(_RELEASE_LEASE_SCRIPT)
+        self._stats = {"heartbeats": 0, "claimed": 0, "released": 0, "lost": 0, "errors": 0}
+
+    @property
+    def client(self):
+        return self.manager.redis_client
+
+    @property
+    def devices_to_poll(self):
+        """Devices of the fleet, whichever node polls them"""
+        return self.client.smembers(DEVICES_KEY)
+
+    def start(self):
+        """Join the cluster and start the heartbeat thread if not running"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self._draining = False
+            self._started_at = time.time()
+            self._wake.clear()
+            self._thread = threading.Thread(target=self._heartbeat_loop, name='poller-cluster', daemon=True)
+            self._thread.start()
+        logger.info(f"Poller node {self.node_id} joined the cluster")
+
+    def start_polling(self, device_id):
+        """Add a device to the fleet; some node claims it on its next heartbeat"""
+        added = self.client.sadd(DEVICES_KEY, device_id)
+        if not self.running:
+            self.start()
+        # Views call this on every request; only a device new to the fleet
+        # is worth an early heartbeat
+        if added:
+            self._wake.set()
+
+    def stop_polling(self, device_id):
+        """Remove a device from the fleet; its owner releases it"""
+        self.client.srem(DEVICES_KEY, device_id)
+        with self._lock:
+            if device_id in self.owned:
+                self._release(device_id)
+
+    def start_polling_all_devices(self):
+        """Add all devices in storage to the fleet and join the cluster"""
+        from .device_storage import get_all_device_ids
+
+        try:
+            device_ids = get_all_device_ids()
+            if device_ids:
+                self.client.sadd(DEVICES_KEY, *device_ids)
+            self.start()
+            logger.info(f"Added {len(device_ids)} devices to the poller cluster")
+        except Exception as e:
+            logger.error(f"Error starting polling for all devices: {e}")
+
+    def _heartbeat_loop(self):
+        while self.running:
+            try:
+                with self._lock:
+                    if self.running:
+                        self._heartbeat()
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Poller cluster heartbeat of {self.node_id} failed: {e}")
+            self._wake.wait(settings.POLLER_LEASE_RENEW_SECONDS)
+            self._wake.clear()
+
+    def _heartbeat(self):
+        # Caller holds self._lock
+        ttl_ms = settings.POLLER_LEASE_TTL_MS
+        self._stats["heartbeats"] += 1
+        self.client.set(NODE_KEY_PREFIX + self.node_id, json.dumps({
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "started": self._started_at,
+            "devices": len(self.owned),
+        }), px=ttl_ms)
+        self.client.sadd(NODES_KEY, self.node_id)
+
+        # Stop polling devices whose lease expired, e.g. after a long pause of this node
+        owned = sorted(self.owned)
+        pipeline = self.client.pipeline(transaction=False)
+        for device_id in owned:
+            self._renew_lease(keys=[LEASE_KEY_PREFIX + device_id], args=[self.node_id, ttl_ms], client=pipeline)
+        for device_id, renewed in zip(owned, pipeline.execute()):
+            if not renewed:
+                self.owned.discard(device_id)
+                device_poller.stop_polling(device_id)
+                self._stats["lost"] += 1
+                logger.warning(f"Poller node {self.node_id} lost the lease of device {device_id}")
+        if self._draining:
+            return
+
+        devices = self.client.smembers(DEVICES_KEY)
+        nodes = self.get_live_nodes()
+        nodes.add(self.node_id)
+        ring = HashRing()
+        for node_id in nodes:
+            ring.add_node(node_id)
+        fair_share = math.ceil(len(devices) / len(nodes))
+
+        # Devices removed from the fleet, then the least preferred devices above the share
+        for device_id in self.owned - devices:
+            self._release(device_id)
+        extra = len(self.owned) - fair_share
+        if extra > 0:
+            for device_id in sorted(self.owned, key=lambda d: ring.get_node(d) == self.node_id)[:extra]:
+                self._release(device_id)
+
+        candidates = sorted(devices - self.owned)
+        pipeline = self.client.pipeline(transaction=False)
+        for device_id in candidates:
+            pipeline.exists(LEASE_KEY_PREFIX + device_id)
+        unleased = [device_id for device_id, leased in zip(candidates, pipeline.execute()) if not leased]
+        unleased.sort(key=lambda d: ring.get_node(d) != self.node_id)
+        for device_id in unleased:
+            if len(self.owned) >= fair_share:
+                break
+            if self.client.set(LEASE_KEY_PREFIX + device_id, self.node_id, nx=True, px=ttl_ms):
+                self.owned.add(device_id)
+                device_poller.start_polling(device_id)
+                self._stats["claimed"] += 1
+
+    def _release(self, device_id):
+        # Caller holds self._lock. Stop polling before another node can claim the device.
+        self.owned.discard(device_id)
+        device_poller.stop_polling(device_id)
+        self._release_lease(keys=[LEASE_KEY_PREFIX + device_id], args=[self.node_id])
+        self._stats["released"] += 1
+
+    def get_live_nodes(self):
+        """Ids of the nodes with a current heartbeat; drops the others from the node set"""
+        node_ids = sorted(self.client.smembers(NODES_KEY))
+        pipeline = self.client.pipeline(transaction=False)
+        for node_id in node_ids:
+            pipeline.exists(NODE_KEY_PREFIX + node_id)
+        live = {node_id for node_id, alive in zip(node_ids, pipeline.execute()) if alive}
+        dead = set(node_ids) - live
+        if dead:
+            self.client.srem(NODES_KEY, *dead)
+        return live
+
+    def stop(self, timeout=10):
+        """Release every lease, stop polling and leave the cluster"""
+        with self._lock:
+            if not self.running:
+                return
+            self.running = False
+            self._wake.set()
+            for device_id in list(self.owned):
+                self._release(device_id)
+            self.client.delete(NODE_KEY_PREFIX + self.node_id)
+            self.client.srem(NODES_KEY, self.node_id)
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        logger.info(f"Poller node {self.node_id} left the cluster")
+
+    def drain(self, timeout=None):
+        """
+        Finish the polls in flight while still holding the leases, then
+        release them and leave the cluster
+        """
+        # Heartbeats keep renewing the leases but claim nothing new meanwhile
+        self._draining = True
+        drained = device_poller.drain(timeout)
+        self.stop()
+        return drained
+
+    def get_assignments(self):
+        """Nodes of the fleet with the devices each one holds, and devices nobody holds"""
+        devices = sorted(self.client.smembers(DEVICES_KEY))
+        nodes = {}
+        for node_id in sorted(self.get_live_nodes()):
+            info = self.client.get(NODE_KEY_PREFIX + node_id)
+            nodes[node_id] = json.loads(info) if info else {}
+            nodes[node_id]["leases"] = []
+        pipeline = self.client.pipeline(transaction=False)
+        for device_id in devices:
+            pipeline.get(LEASE_KEY_PREFIX + device_id)
+            pipeline.pttl(LEASE_KEY_PREFIX + device_id)
+        results = pipeline.execute()
+        assignments = {}
+        unassigned = []
+        for i, device_id in enumerate(devices):
+            owner, ttl_ms = results[2 * i], results[2 * i + 1]
+            if owner is None:
+                unassigned.append(device_id)
+                continue
+            assignments[device_id] = {"node": owner, "lease_ttl_ms": ttl_ms}
+            if owner in nodes:
+                nodes[owner]["leases"].append(device_id)
+        return {
+            "node": self.node_id,
+            "nodes": nodes,
+            "devices": assignments,
+            "unassigned": unassigned,
+        }
+
+    def get_schedule_metrics(self):
+        """Schedule metrics of the local poller plus this node's lease counters"""
+        metrics = device_poller.get_schedule_metrics()
+        with self._lock:
+            metrics["mode"] = "cluster"
+            metrics["node"] = self.node_id
+            metrics["leases"] = len(self.owned)
+            metrics["cluster"] = dict(self._stats)
+        return metrics
+
+
+# Global cluster node, used when POLLER_MODE = 'cluster'
+poller_cluster = PollerCluster()
@@ -0,0 +1,137 @@
+import json
+import threading
+import time
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from .device_storage import get_all_device_ids, device_registry
+from .background_poller import follow_device_registry, follow_device_cleanups
+
+logger = logging.getLogger(__name__)
+
+
+class PollerDaemon:
+    """
+    Runs a poller (see get_active_poller) as the main job of its process,
+    for `manage.py run_poller`.
+
+    The device list is reloaded from storage every POLLER_DEVICE_RELOAD_SECONDS
+    and on reload(); devices cleaned up through the web app are forgotten
+    (see follow_device_cleanups). drain() stops polling after the polls in
+    flight finished. GET /health and /metrics on the health address report the
+    state and the poller's schedule metrics as JSON.
+    """
+
+    def __init__(self, poller, reload_seconds=None, drain_seconds=None):
+        self.poller = poller
+        self.reload_seconds = settings.POLLER_DEVICE_RELOAD_SECONDS if reload_seconds is None else reload_seconds
+        self.drain_seconds = settings.POLLER_DRAIN_SECONDS if drain_seconds is None else drain_seconds
+        self.state = 'starting'
+        self.started_at = None
+        self.last_reload = None
+        self._wake = threading.Event()
+        self._reload_requested = False
+        self._drain_requested = False
+        self._server = None
+
+    def reload(self):
+        """Ask the main loop to reload the device list; safe in signal handlers"""
+        self._reload_requested = True
+        self._wake.set()
+
+    def drain(self):
+        """Ask the main loop to drain and exit; safe in signal handlers"""
+        self._drain_requested = True
+        self._wake.set()
+
+    def reload_devices(self):
+        """Start polling devices added to storage and stop polling removed ones"""
+        device_ids = set(get_all_device_ids())
+        polled = set(self.poller.devices_to_poll)
+        added = device_ids - polled
+        # In cluster mode devices_to_poll is the fleet shared by every node;
+        # devices missing from this node's storage may have been added by
+        # another node, so only deletions made here (stop_polling) remove any
+        removed = set() if settings.POLLER_MODE == 'cluster' else polled - device_ids
+        for device_id in added:
+            self.poller.start_polling(device_id)
+        for device_id in removed:
+            self.poller.stop_polling(device_id)
+        self.last_reload = time.time()
+        if added or removed:
+            logger.info(f"Reloaded devices: {len(added)} added, {len(removed)} removed")
+
+    def serve_health(self, host, port):
+        """Serve /health and /metrics from a background thread"""
+        daemon = self
+
+        class HealthHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/health':
+                    status = 200 if daemon.state == 'running' else 503
+                    body = daemon.get_health()
+                elif self.path == '/metrics':
+                    status = 200
+                    body = daemon.poller.get_schedule_metrics()
+                else:
+                    status = 404
+                    body = {"error": {"message": f"Unknown path {self.path}"}}
+                payload = json.dumps(body, default=str).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(f"Health endpoint: {format % args}")
+
+        self._server = ThreadingHTTPServer((host, port), HealthHandler)
+        threading.Thread(target=self._server.serve_forever, name='poller-health', daemon=True).start()
+        logger.info(f"Poller health endpoint listening on http://{host}:{port}/health")
+
+    def get_health(self):
+        """State, uptime and number of polled devices"""
+        return {
+            "status": self.state,
+            "uptime_s": time.time() - self.started_at if self.started_at else 0,
+            "devices": len(self.poller.devices_to_poll),
+            "last_reload": self.last_reload,
+        }
+
+    def run(self):
+        """Poll until drain() is called; returns False if polls were cut off"""
+        self.started_at = time.time()
+        self.reload_devices()
+        # Devices saved or deleted through the registry are picked up at once;
+        # the periodic reload covers edits no lookup noticed yet
+        subscription = follow_device_registry(self.poller)
+        # Data deleted through the web app's device cleanup
+        cleanup_listener = follow_device_cleanups()
+        self.state = 'running'
+        next_reload = time.monotonic() + self.reload_seconds if self.reload_seconds else None
+        while not self._drain_requested:
+            # Bounded wait, so signal handlers get to run promptly
+            self._wake.wait(min(1.0, max(0, next_reload - time.monotonic())) if next_reload else 1.0)
+            self._wake.clear()
+            if self._drain_requested:
+                break
+            if self._reload_requested or (next_reload and time.monotonic() >= next_reload):
+                self._reload_requested = False
+                try:
+                    self.reload_devices()
+                except Exception as e:
+                    logger.error(f"Error reloading devices: {e}")
+                if self.reload_seconds:
+                    next_reload = time.monotonic() + self.reload_seconds
+
+        device_registry.unsubscribe(subscription)
+        cleanup_listener.stop()
+        self.state = 'draining'
+        logger.info(f"Draining poller, waiting up to {self.drain_seconds}s for polls in flight")
+        drained = self.poller.drain(self.drain_seconds)
+        self.state = 'stopped'
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        return drained
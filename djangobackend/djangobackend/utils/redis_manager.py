@@ -1,14 +1,108 @@
 import json
 import re
+import threading
 import redis
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 from django.conf import settings
 import logging
 import time  # Added missing import
+from .timeseries_retention import TimeseriesRetention
+from .timeseries_rollups import TimeseriesRollups
+from .timeseries_backends import get_timeseries_backend, format_local_timestamp
+from .downsampling import DEFAULT_BUCKET_AGGREGATORS, lttb
 
 logger = logging.getLogger(__name__)
 
+# Member marking a key registry as verified complete by a SCAN
+KEY_REGISTRY_COMPLETE = "__complete__"
+
+
+class RedisWriteBatch:
+    """
+    Collects write commands from many store_* calls and sends them to Redis
+    in one pipeline on flush. The poll tasks of a device may share a batch
+    from several threads.
+    """
+
+    # Write commands issued by the store paths and time series backends
+    COMMANDS = frozenset({
+        'append', 'delete', 'execute_command', 'hset', 'publish', 'sadd',
+        'set', 'srem', 'zadd', 'zrem', 'zremrangebyscore',
+    })
+
+    def __init__(self, manager, transaction=False):
+        self.manager = manager
+        self.transaction = transaction
+        self._commands = []
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def after_flush(self, callback):
+        """Call callback() once the commands queued so far reached Redis; dropped if the flush fails"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def _run_callbacks(self, callbacks):
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"Redis write batch callback failed: {e}")
+
+    def __getattr__(self, command):
+        # Record the redis-py write command instead of sending it. Reads would
+        # get no reply, so anything not listed is an error.
+        if command not in self.COMMANDS:
+            raise AttributeError(f"{type(self).__name__} does not queue {command!r}")
+
+        def queue(*args, **kwargs):
+            with self._lock:
+                self._commands.append((command, args, kwargs))
+        return queue
+
+    def __len__(self):
+        with self._lock:
+            return len(self._commands)
+
+    def flush(self):
+        """Send all queued commands in one pipeline (MULTI block if transactional)"""
+        with self._lock:
+            commands, self._commands = self._commands, []
+            callbacks, self._callbacks = self._callbacks, []
+        if not commands:
+            self._run_callbacks(callbacks)
+            return []
+
+        started = time.monotonic()
+        pipeline = self.manager.redis_client.pipeline(transaction=self.transaction)
+        for command, args, kwargs in commands:
+            getattr(pipeline, command)(*args, **kwargs)
+        results = pipeline.execute()
+        self.manager._record_batch_flush(len(commands), time.monotonic() - started)
+        self._run_callbacks(callbacks)
+        return results
+
+    async def flush_async(self, client):
+        """Same as flush() through a redis.asyncio client of the manager's DB"""
+        with self._lock:
+            commands, self._commands = self._commands, []
+            callbacks, self._callbacks = self._callbacks, []
+        if not commands:
+            self._run_callbacks(callbacks)
+            return []
+
+        started = time.monotonic()
+        async with client.pipeline(transaction=self.transaction) as pipeline:
+            for command, args, kwargs in commands:
+                getattr(pipeline, command)(*args, **kwargs)
+            results = await pipeline.execute()
+        self.manager._record_batch_flush(len(commands), time.monotonic() - started)
+        self._run_callbacks(callbacks)
+        return results
+
+
 class RedisManager:
     def __init__(self, db_number=0):
         self.db_number = db_number
@@ -20,11 +114,73 @@ class RedisManager:
             socket_connect_timeout=5,
             socket_timeout=5
         )
+        self._batch_stats_lock = threading.Lock()
+        self._batch_stats = {
+            "flushes": 0,
+            "commands": 0,
+            "last_flush_size": 0,
+            "max_flush_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+        # Layout of the time series history, see timeseries_backends
+        self.timeseries = get_timeseries_backend(settings.REDIS_TIMESERIES_BACKEND, self.redis_client)
+        self.retention = TimeseriesRetention(self)
+        self.rollups = TimeseriesRollups(self)
+        # key -> monotonic time it was last added to its device's key registry
+        self._registered_keys = {}
+        self._registered_keys_lock = threading.Lock()
+        # (device_id, kind, component, parameter) -> value last published on the change channel
+        self._published_values = {}
+        self._published_values_lock = threading.Lock()
+
+    @contextmanager
+    def write_batch(self, transaction=False):
+        """
+        Collect writes made with `batch=` inside the block and flush them in
+        one round trip when it exits.
+        """
+        batch = RedisWriteBatch(self, transaction)
+        try:
+            yield batch
+        finally:
+            try:
+                batch.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush Redis write batch: {e}")
+
+    def _record_batch_flush(self, size, elapsed):
+        elapsed_ms = elapsed * 1000
+        with self._batch_stats_lock:
+            stats = self._batch_stats
+            stats["flushes"] += 1
+            stats["commands"] += size
+            stats["last_flush_size"] = size
+            stats["max_flush_size"] = max(stats["max_flush_size"], size)
+            stats["last_flush_ms"] = elapsed_ms
+            stats["max_flush_ms"] = max(stats["max_flush_ms"], elapsed_ms)
+            stats["total_flush_ms"] += elapsed_ms
+
+    def get_write_batch_stats(self):
+        """Get flush size and latency counters of write batches"""
+        with self._batch_stats_lock:
+            stats = dict(self._batch_stats)
+        stats["avg_flush_size"] = stats["commands"] / stats["flushes"] if stats["flushes"] else 0
+        stats["avg_flush_ms"] = stats["total_flush_ms"] / stats["flushes"] if stats["flushes"] else 0.0
+        return stats
 
     def _get_monitoring_key(self, device_id, component, parameter):
         """Generate monitoring data key"""
         return f"device:{device_id}:monitoring:{component}:{parameter}"
 
+    def _get_snapshot_key(self, device_id, component):
+        """Generate key of the hash holding every parameter of a component"""
+        return f"device:{device_id}:snapshot:{component}"
+
+    def _uses_snapshot_hashes(self):
+        return settings.REDIS_MONITORING_LAYOUT == 'hash'
+
     def _get_running_config_key(self, device_id, component, parameter):
         """Generate running configuration key"""
         return f"device:{device_id}:running:{component}:{parameter}"
@@ -36,6 +192,105 @@ class RedisManager:
     def _get_timeseries_key(self, device_id, component, parameter):
         """Generate time series data key"""
         return f"device:{device_id}:timeseries:{component}:{parameter}"
+
+    def _get_key_registry_key(self, device_id):
+        """Generate key of the set listing every key of a device"""
+        return f"device:{device_id}:keys"
+
+    def _get_changes_channel(self, device_id):
+        """Generate pub/sub channel announcing changed values of a device"""
+        return f"device:{device_id}:changes"
+
+    @staticmethod
+    def after_write(client, callback):
+        """
+        Call callback() once the writes made through client reached Redis:
+        after the flush for a RedisWriteBatch, at once for a direct client.
+        """
+        if isinstance(client, RedisWriteBatch):
+            client.after_flush(callback)
+        else:
+            callback()
+
+    def publish_change(self, client, device_id, kind, component, parameter, value, timestamp_local):
+        """
+        Publish a value on the device's change channel (queued on client)
+        unless it equals the value this process published last for the same
+        parameter. Subscribers such as the monitoring stream only see changes.
+        The value counts as published only once the batch flushed, so a
+        failed flush publishes it again next time.
+
+        kind is 'monitoring', 'running' or 'operational'.
+        """
+        if not settings.MONITORING_CHANGE_NOTIFICATIONS:
+            return
+        series = (device_id, kind, component, parameter)
+        with self._published_values_lock:
+            if series in self._published_values and self._published_values[series] == value:
+                return
+        message = {
+            "deviceId": device_id,
+            "kind": kind,
+            "component": component,
+            "parameter": parameter,
+            "value": value,
+            "timestamp_local": timestamp_local,
+        }
+        client.publish(self._get_changes_channel(device_id), json.dumps(message, separators=(',', ':')))
+        self.after_write(client, lambda: self._remember_published(series, value))
+
+    def _remember_published(self, series, value):
+        with self._published_values_lock:
+            self._published_values[series] = value
+
+    def register_keys(self, client, device_id, *keys):
+        """
+        Add keys to the device's key registry (queued on client). Each key is
+        re-sent at most every KEY_REGISTRY_REFRESH_SECONDS so the registry
+        heals after another process cleaned the device up.
+        """
+        now = time.monotonic()
+        refresh = settings.KEY_REGISTRY_REFRESH_SECONDS
+        with self._registered_keys_lock:
+            missing = [key for key in keys if now - self._registered_keys.get(key, -refresh) >= refresh]
+            for key in missing:
+                self._registered_keys[key] = now
+        if missing:
+            client.sadd(self._get_key_registry_key(device_id), *missing)
+
+    def rebuild_key_registry(self, device_id):
+        """
+        Rebuild a device's key registry with SCAN (never blocks Redis like KEYS)
+
+        Returns:
+            list: Keys of the device
+        """
+        registry_key = self._get_key_registry_key(device_id)
+        keys = [key for key in self.redis_client.scan_iter(match=f"device:{device_id}:*", count=1000)
+                if key != registry_key]
+        pipeline = self.redis_client.pipeline(transaction=True)
+        pipeline.delete(registry_key)
+        pipeline.sadd(registry_key, KEY_REGISTRY_COMPLETE, *keys)
+        pipeline.execute()
+        return keys
+
+    def get_device_keys(self, device_id, prefix=None):
+        """
+        Get the keys of a device, optionally only those starting with
+        device:{id}:{prefix}. Reads the key registry; a registry that was
+        never verified complete (e.g. keys written before it existed) is
+        rebuilt once with SCAN first.
+        """
+        members = self.redis_client.smembers(self._get_key_registry_key(device_id))
+        if KEY_REGISTRY_COMPLETE in members:
+            members.discard(KEY_REGISTRY_COMPLETE)
+            keys = list(members)
+        else:
+            keys = self.rebuild_key_registry(device_id)
+        if prefix:
+            full_prefix = f"device:{device_id}:{prefix}"
+            keys = [key for key in keys if key.startswith(full_prefix)]
+        return sorted(keys)
     
 
     def _get_grouped_mux_ports_key(self, device_id):
@@ -89,8 +344,11 @@ class RedisManager:
 
         raise ValueError(f"Unsupported timestamp type: {type(timestamp)}")
 
-    def store_monitoring_data(self, device_id, component, parameter, value, timestamp=None):
-        """Store monitoring data in Redis and keep only the last 24 hours."""
+    def store_monitoring_data(self, device_id, component, parameter, value, timestamp=None, batch=None):
+        """Store monitoring data in Redis and append it to the component's time series.
+
+        When `batch` is given the writes are queued on it instead of being sent.
+        """
         # Determine score_ms (epoch ms) from provided timestamp or current time
         try:
             if timestamp is not None:
@@ -128,57 +386,42 @@ class RedisManager:
             "timestamp_local": iso_timestamp_local,
         }
 
-        key = self._get_monitoring_key(device_id, component, parameter)
+        client = batch if batch is not None else self.redis_client
         try:
             # compact JSON (no spaces) to reduce size
-            self.redis_client.set(key, json.dumps(data, separators=(',', ':')))
+            encoded = json.dumps(data, separators=(',', ':'))
+            if self._uses_snapshot_hashes():
+                key = self._get_snapshot_key(device_id, component)
+                client.hset(key, parameter, encoded)
+            else:
+                key = self._get_monitoring_key(device_id, component, parameter)
+                client.set(key, encoded)
             timeseries_key = self._get_timeseries_key(device_id, component, parameter)
-            # Use device timestamp (score_ms) as the timeseries score, but compute
-            # the retention cutoff from server time to avoid accidental mass-deletes
-            # when device clocks are skewed.
-            self.redis_client.zadd(timeseries_key, {json.dumps(data, separators=(',', ':')): score_ms})
-            now_ms = int(time.time() * 1000)
-            day_ago_ms = now_ms - (24 * 60 * 60 * 1000)
-            self.redis_client.zremrangebyscore(timeseries_key, 0, day_ago_ms)
+            # Use device timestamp (score_ms) as the timeseries score. Old
+            # samples are trimmed in the background by self.retention.
+            self.timeseries.append(client, timeseries_key, score_ms, data)
+            self.retention.note_write(timeseries_key, component)
+            self.register_keys(client, device_id, key, timeseries_key)
+            self.publish_change(client, device_id, 'monitoring', component, parameter,
+                                store_value, iso_timestamp_local)
+            if isinstance(store_value, float):
+                self.rollups.note_sample(device_id, component, parameter, score_ms, store_value)
             logger.debug(f"Stored monitoring data: {key} = {store_value}")
             return True
         except Exception as e:
             logger.error(f"Failed to store monitoring data: {e}")
             return False
-    def store_grouped_monitoring_data(self, device_id, component, grouped_data, expire_seconds=None):
+    def store_grouped_monitoring_data(self, device_id, component, grouped_data, expire_seconds=None, batch=None):
         """
         Store grouped monitoring data (e.g., all optical ports) under a single key,
         and keep a time series history as one ZSET per component.
 
         If component is 'optical-ports-mux' or 'optical-ports-demux', use dedicated
         grouped keys to avoid creating per-port keys.
-        """
-        # Determine score_ms: prefer provided per-port timestamps inside grouped_data
-        score_ms = None
-        # grouped_data is a dict of port -> {param: value, optional 'timestamp'}
-        for port_entry in grouped_data.values():
-            try:
-                ts = port_entry.get('timestamp')
-                if ts:
-                    # try parse numeric or ISO
-                    try:
-                        if isinstance(ts, (int, float)):
-                            candidate = int(ts if ts > 1e12 else int(float(ts) * 1000))
-                        elif isinstance(ts, str) and ts.isdigit():
-                            candidate = int(ts)
-                        else:
-                            candidate = self._parse_timestamp_to_epoch_ms(ts)
-                        if candidate:
-                            if score_ms is None or candidate > score_ms:
-                                score_ms = candidate
-                    except Exception:
-                        continue
-            except Exception:
-                continue
 
-        if score_ms is None:
-            # fallback to now
-            score_ms = int(time.time() * 1000)
+        When `batch` is given the writes are queued on it instead of being sent.
+        """
+        score_ms = self._grouped_score_ms(grouped_data)
 
         # compute local timestamp from epoch ms
         dt = datetime.fromtimestamp(score_ms / 1000, tz=timezone.utc).astimezone(ZoneInfo("Asia/Karachi"))
@@ -201,25 +444,89 @@ class RedisManager:
             ts_key = self._get_timeseries_key(device_id, component, "grouped")
 
         # Overwrite current snapshot
+        client = batch if batch is not None else self.redis_client
         try:
+            encoded = json.dumps(payload, separators=(',', ':'))
             if expire_seconds:
-                self.redis_client.set(current_key, json.dumps(payload, separators=(',', ':')), ex=int(expire_seconds))
+                client.set(current_key, encoded, ex=int(expire_seconds))
             else:
-                self.redis_client.set(current_key, json.dumps(payload, separators=(',', ':')))
-
-            # Append to time series (compact JSON) using score_ms determined above
-            self.redis_client.zadd(ts_key, {json.dumps(payload, separators=(',', ':')): int(score_ms)})
+                client.set(current_key, encoded)
 
-            # Remove old (>24h) using server time as cutoff to avoid deleting
-            # recent entries when device timestamps are skewed.
-            now_ms = int(time.time() * 1000)
-            day_ago_ms = now_ms - (24 * 60 * 60 * 1000)
-            self.redis_client.zremrangebyscore(ts_key, 0, day_ago_ms)
+            # Append to time series using score_ms determined above.
+            # Old samples are trimmed in the background by self.retention.
+            self.timeseries.append(client, ts_key, int(score_ms), payload)
+            self.retention.note_write(ts_key, component)
+            self.register_keys(client, device_id, current_key, ts_key)
+            # One message per changed port, e.g. parameter '4101' with that port's values
+            for port, port_entry in grouped_data.items():
+                values = {param: value for param, value in port_entry.items() if param != 'timestamp'}
+                self.publish_change(client, device_id, 'monitoring', component, str(port),
+                                    values, iso_timestamp_local)
+            self._note_grouped_rollups(device_id, component, grouped_data, score_ms)
             return True
         except Exception as e:
             logger.error(f"Failed to store grouped monitoring data: {e}")
             return False
 
+    def note_monitoring_sample(self, device_id, component, parameter, value, timestamp=None):
+        """Feed a polled sample that was not stored, e.g. inside the deadband, to the rollups"""
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return
+        try:
+            score_ms = self._parse_timestamp_to_epoch_ms(timestamp) if timestamp is not None else None
+        except Exception:
+            score_ms = None
+        if score_ms is None:
+            score_ms = int(time.time() * 1000)
+        self.rollups.note_sample(device_id, component, parameter, score_ms, number)
+
+    def note_grouped_monitoring_samples(self, device_id, component, grouped_data):
+        """Feed polled grouped samples that were not stored to the rollups"""
+        self._note_grouped_rollups(device_id, component, grouped_data, self._grouped_score_ms(grouped_data))
+
+    def _grouped_score_ms(self, grouped_data):
+        """Latest per-port timestamp of grouped data in epoch ms, or now"""
+        score_ms = None
+        # grouped_data is a dict of port -> {param: value, optional 'timestamp'}
+        for port_entry in grouped_data.values():
+            try:
+                ts = port_entry.get('timestamp')
+                if ts:
+                    # try parse numeric or ISO
+                    try:
+                        if isinstance(ts, (int, float)):
+                            candidate = int(ts if ts > 1e12 else int(float(ts) * 1000))
+                        elif isinstance(ts, str) and ts.isdigit():
+                            candidate = int(ts)
+                        else:
+                            candidate = self._parse_timestamp_to_epoch_ms(ts)
+                        if candidate:
+                            if score_ms is None or candidate > score_ms:
+                                score_ms = candidate
+                    except Exception:
+                        continue
+            except Exception:
+                continue
+
+        if score_ms is None:
+            # fallback to now
+            score_ms = int(time.time() * 1000)
+        return score_ms
+
+    def _note_grouped_rollups(self, device_id, component, grouped_data, score_ms):
+        # Rollups keep one series per port and parameter, e.g. parameter '3/input-power'
+        for port, port_entry in grouped_data.items():
+            for param, value in port_entry.items():
+                if param == 'timestamp':
+                    continue
+                try:
+                    number = float(value)
+                except (TypeError, ValueError):
+                    continue
+                self.rollups.note_sample(device_id, component, f"{port}/{param}", int(score_ms), number)
+
     def get_grouped_port_data(self, device_id, port_type):
         """Get grouped optical port data"""
         try:
@@ -260,9 +567,8 @@ class RedisManager:
                     'timestamp_local': payload.get('timestamp_local')
                 }
 
-            # Fallback: regular per-parameter key
-            key = self._get_monitoring_key(device_id, component, parameter)
-            data = self.redis_client.get(key)
+            # Fallback: regular per-parameter value
+            data = self._read_monitoring_values(device_id, component, [parameter])[0]
             if not data:
                 return None
             parsed = json.loads(data)
@@ -274,11 +580,33 @@ class RedisManager:
             logger.error(f"Failed to get monitoring data: {e}")
             return None
 
+    def _read_monitoring_values(self, device_id, component, parameters):
+        """
+        Raw JSON of each parameter, read from the configured layout first.
+        Parameters missing there are looked up in the other layout, so data
+        written before a layout switch stays readable until it is migrated.
+        """
+        snapshot_key = self._get_snapshot_key(device_id, component)
+        keys = [self._get_monitoring_key(device_id, component, param) for param in parameters]
+
+        def read_hash(params):
+            return self.redis_client.hmget(snapshot_key, params)
+
+        def read_keys(params):
+            return self.redis_client.mget([keys[parameters.index(param)] for param in params])
+
+        primary, secondary = (read_hash, read_keys) if self._uses_snapshot_hashes() else (read_keys, read_hash)
+        values = primary(parameters)
+        missing = [param for param, value in zip(parameters, values) if value is None]
+        if missing:
+            found = dict(zip(missing, secondary(missing)))
+            values = [value if value is not None else found[param] for param, value in zip(parameters, values)]
+        return values
+
     def get_monitoring_data_batch(self, device_id, component, parameters):
         """Get multiple monitoring data points"""
-        keys = [self._get_monitoring_key(device_id, component, param) for param in parameters]
         try:
-            data_list = self.redis_client.mget(keys)
+            data_list = self._read_monitoring_values(device_id, component, list(parameters))
             result = {}
             for i, param in enumerate(parameters):
                 result[param] = json.loads(data_list[i]) if data_list[i] else None
@@ -287,28 +615,229 @@ class RedisManager:
             logger.error(f"Failed to get monitoring data batch: {e}")
             return {param: None for param in parameters}
 
-    def get_timeseries_data(self, device_id, component, parameter, count=100):
-        """Get historical time series data"""
+    def get_monitoring_data_multi(self, selectors):
+        """
+        Resolve many (device_id, component, parameters) selectors in one
+        pipelined pass: an MGET or HMGET per selector in the configured
+        layout and one GET per grouped port snapshot. Values missing from the
+        configured layout are looked up in the other one in a second pass.
+
+        A selector of component 'optical-ports-mux'/'optical-ports-demux' with
+        parameter 'grouped' returns the per-port values of the snapshot;
+        components like 'optical-port-mux-4101' read their values from it.
+
+        Returns:
+            list: {"deviceId", "component", "values": {parameter: value},
+            "timestamp_local": newest timestamp} per selector, in order
+        """
+        use_hash = self._uses_snapshot_hashes()
+        pipeline = self.redis_client.pipeline(transaction=False)
+        # One entry per selector: (kind, device_id, component, parameters, reply index, port)
+        plan = []
+        grouped_replies = {}
+        for device_id, component, parameters in selectors:
+            parameters = list(parameters)
+            port_match = re.match(r'^optical-port-(mux|demux)-(\d+)$', component)
+            if component in ('optical-ports-mux', 'optical-ports-demux') and parameters == ['grouped']:
+                kind, port_type, port = 'grouped', component.replace('optical-ports-', ''), None
+            elif port_match:
+                kind, port_type, port = 'port', port_match.group(1), port_match.group(2)
+            else:
+                if use_hash:
+                    pipeline.hmget(self._get_snapshot_key(device_id, component), parameters)
+                else:
+                    pipeline.mget([self._get_monitoring_key(device_id, component, param) for param in parameters])
+                plan.append(('values', device_id, component, parameters, len(pipeline), None))
+                continue
+
+            if port_type == 'mux':
+                key = self._get_grouped_mux_ports_key(device_id)
+            else:
+                key = self._get_grouped_demux_ports_key(device_id)
+            # Port selectors of one device share a single snapshot read
+            if key not in grouped_replies:
+                pipeline.get(key)
+                grouped_replies[key] = len(pipeline)
+            plan.append((kind, device_id, component, parameters, grouped_replies[key], port))
+
+        replies = pipeline.execute() if len(pipeline) else []
+
+        # Second pass for values written before a layout switch
+        fallback = self.redis_client.pipeline(transaction=False)
+        fallback_entries = []
+        for kind, device_id, component, parameters, index, _ in plan:
+            if kind != 'values':
+                continue
+            missing = [param for param, value in zip(parameters, replies[index - 1]) if value is None]
+            if not missing:
+                continue
+            if use_hash:
+                fallback.mget([self._get_monitoring_key(device_id, component, param) for param in missing])
+            else:
+                fallback.hmget(self._get_snapshot_key(device_id, component), missing)
+            fallback_entries.append((index, parameters, missing))
+        if fallback_entries:
+            for (index, parameters, missing), found in zip(fallback_entries, fallback.execute()):
+                found = dict(zip(missing, found))
+                replies[index - 1] = [
+                    value if value is not None else found[param]
+                    for param, value in zip(parameters, replies[index - 1])
+                ]
+
+        snapshots = {}
+        result = []
+        for kind, device_id, component, parameters, index, port in plan:
+            entry = {"deviceId": device_id, "component": component, "values": {}, "timestamp_local": None}
+            if kind == 'values':
+                for param, raw in zip(parameters, replies[index - 1]):
+                    parsed = json.loads(raw) if raw else None
+                    if not parsed:
+                        entry["values"][param] = None
+                        continue
+                    entry["values"][param] = parsed.get('value')
+                    timestamp = parsed.get('timestamp_local') or parsed.get('timestamp')
+                    if timestamp and (entry["timestamp_local"] is None or timestamp > entry["timestamp_local"]):
+                        entry["timestamp_local"] = timestamp
+            else:
+                if index not in snapshots:
+                    raw = replies[index - 1]
+                    snapshots[index] = json.loads(raw) if raw else {}
+                payload = snapshots[index]
+                values = payload.get('values') or {}
+                entry["timestamp_local"] = payload.get('timestamp_local')
+                if kind == 'grouped':
+                    entry["values"] = values
+                else:
+                    port_values = values.get(str(port)) or {}
+                    entry["values"] = {param: port_values.get(param) for param in parameters}
+            result.append(entry)
+        return result
+
+    def migrate_monitoring_layout(self, layout, device_id=None):
+        """
+        Move current monitoring values between per-parameter keys ('keys')
+        and one hash per component ('hash'). Each component is moved in one
+        MULTI block. Grouped port snapshots are single keys in both layouts
+        and are left alone.
+
+        Returns:
+            dict: components and values moved
+        """
+        if layout not in ('keys', 'hash'):
+            raise ValueError(f"Unknown monitoring layout '{layout}'")
+        device_match = device_id or '*'
+        stats = {"components": 0, "values": 0}
+
+        if layout == 'hash':
+            # device:{id}:monitoring:{component}:{parameter} -> HSET device:{id}:snapshot:{component}
+            components = {}
+            for key in self.redis_client.scan_iter(match=f"device:{device_match}:monitoring:*", count=1000):
+                parts = key.split(':')
+                if len(parts) != 5 or parts[4] == 'grouped':
+                    continue
+                components.setdefault((parts[1], parts[3]), []).append((parts[4], key))
+            for (dev, component), entries in components.items():
+                values = self.redis_client.mget([key for _, key in entries])
+                mapping = {param: value for (param, _), value in zip(entries, values) if value is not None}
+                if not mapping:
+                    continue
+                snapshot_key = self._get_snapshot_key(dev, component)
+                pipeline = self.redis_client.pipeline(transaction=True)
+                pipeline.hset(snapshot_key, mapping=mapping)
+                pipeline.delete(*[key for _, key in entries])
+                pipeline.sadd(self._get_key_registry_key(dev), snapshot_key)
+                pipeline.execute()
+                stats["components"] += 1
+                stats["values"] += len(mapping)
+        else:
+            for snapshot_key in self.redis_client.scan_iter(match=f"device:{device_match}:snapshot:*", count=1000):
+                parts = snapshot_key.split(':')
+                if len(parts) != 4:
+                    continue
+                dev, component = parts[1], parts[3]
+                mapping = self.redis_client.hgetall(snapshot_key)
+                if not mapping:
+                    continue
+                keys = {self._get_monitoring_key(dev, component, param): value for param, value in mapping.items()}
+                pipeline = self.redis_client.pipeline(transaction=True)
+                pipeline.mset(keys)
+                pipeline.delete(snapshot_key)
+                pipeline.sadd(self._get_key_registry_key(dev), *keys)
+                pipeline.execute()
+                stats["components"] += 1
+                stats["values"] += len(mapping)
+        return stats
+
+    def get_timeseries_data(self, device_id, component, parameter, count=100, start_ms=None, end_ms=None,
+                            buckets=None, step_ms=None, agg=None):
+        """
+        Get historical time series data
+
+        Without a range or bucketing this returns the newest `count` samples,
+        newest first. With start_ms/end_ms (epoch ms) it returns the samples in
+        that range in time order, at most TIMESERIES_MAX_POINTS (the newest).
+
+        With `buckets` or `step_ms` the numeric values of the range are
+        aggregated per bucket into {"timestamp", "timestamp_local", <agg>...}
+        entries; `agg` picks one aggregator (min, max, avg, last, ...) instead
+        of min/max/avg/last/count. agg='lttb' instead keeps the `buckets` most
+        visually significant raw samples. A missing range ends now and starts
+        one retention period earlier. Bucketed queries are answered from the
+        cheapest rollup tier that covers the range (see TimeseriesRollups),
+        falling back to the raw samples.
+        """
         key = self._get_timeseries_key(device_id, component, parameter)
         try:
-            data = self.redis_client.zrevrange(key, 0, count - 1)
+            if start_ms is None and end_ms is None and not buckets and not step_ms and not agg:
+                return self.timeseries.latest(key, count)
+
+            max_points = settings.TIMESERIES_MAX_POINTS
+            if not buckets and not step_ms and not agg:
+                samples = self.timeseries.range(key, start_ms, end_ms)
+                return [sample for _, sample in samples[-max_points:]]
+
+            if end_ms is None:
+                end_ms = int(time.time() * 1000)
+            if start_ms is None:
+                start_ms = end_ms - self.retention.get_retention_seconds(component) * 1000
+            span_ms = max(1, end_ms - start_ms)
+            buckets = min(int(buckets or max_points), max_points)
+            # Never return more buckets than TIMESERIES_MAX_POINTS, whatever the step
+            bucket_ms = max(int(step_ms or 0), -(-span_ms // buckets), 1)
+
+            # Rollup tiers answer coarse or old ranges instead of the raw samples
+            tier = self.rollups.select_tier(component, start_ms, bucket_ms)
+
+            if agg == 'lttb':
+                points = []
+                if tier is not None:
+                    points = self.rollups.points(device_id, component, parameter, tier, start_ms, end_ms)
+                if not points:
+                    points = self.timeseries.points(key, start_ms, end_ms)
+                points = lttb(points, buckets)
+                return [
+                    {"value": value, "timestamp": ts, "timestamp_local": format_local_timestamp(ts)}
+                    for ts, value in points
+                ]
+
+            aggregators = (agg,) if agg else DEFAULT_BUCKET_AGGREGATORS
+            aggregated = []
+            if tier is not None:
+                aggregated = self.rollups.aggregate(device_id, component, parameter, tier,
+                                                    start_ms, end_ms, bucket_ms, aggregators)
+            if not aggregated:
+                aggregated = self.timeseries.aggregate(key, start_ms, end_ms, bucket_ms, aggregators)
             result = []
-            for item in data:
-                try:
-                    parsed = json.loads(item)
-                    # normalize timestamps if necessary
-                    if 'timestamp' in parsed and 'timestamp_local' not in parsed:
-                        parsed['timestamp_local'] = parsed.pop('timestamp')
-                    result.append(parsed)
-                except Exception:
-                    # skip malformed entries
-                    continue
+            for bucket, values in aggregated:
+                entry = {"timestamp": bucket, "timestamp_local": format_local_timestamp(bucket)}
+                entry.update(values)
+                result.append(entry)
             return result
         except Exception as e:
             logger.error(f"Failed to get timeseries data: {e}")
             return []
 
-    def store_running_config(self, device_id, component, parameter, value, user="admin", timestamp=None):
+    def store_running_config(self, device_id, component, parameter, value, user="admin", timestamp=None, batch=None):
         """Store running configuration set by user"""
         # Use provided timestamp if present
         if timestamp is not None:
@@ -333,8 +862,11 @@ class RedisManager:
         }
 
         key = self._get_running_config_key(device_id, component, parameter)
+        client = batch if batch is not None else self.redis_client
         try:
-            self.redis_client.set(key, json.dumps(data, separators=(',', ':')))
+            client.set(key, json.dumps(data, separators=(',', ':')))
+            self.register_keys(client, device_id, key)
+            self.publish_change(client, device_id, 'running', component, parameter, value, iso_timestamp_local)
             logger.debug(f"Stored running config: {key} = {value}")
             return True
         except Exception as e:
@@ -351,7 +883,7 @@ class RedisManager:
             logger.error(f"Failed to get running config: {e}")
             return None
 
-    def store_operational_config(self, device_id, component, parameter, value, timestamp=None):
+    def store_operational_config(self, device_id, component, parameter, value, timestamp=None, batch=None):
         """Store operational configuration from device"""
         if timestamp is not None:
             try:
@@ -374,8 +906,11 @@ class RedisManager:
         }
 
         key = self._get_operational_config_key(device_id, component, parameter)
+        client = batch if batch is not None else self.redis_client
         try:
-            self.redis_client.set(key, json.dumps(data, separators=(',', ':')))
+            client.set(key, json.dumps(data, separators=(',', ':')))
+            self.register_keys(client, device_id, key)
+            self.publish_change(client, device_id, 'operational', component, parameter, value, iso_timestamp_local)
             logger.debug(f"Stored operational config: {key} = {value}")
             return True
         except Exception as e:
@@ -395,30 +930,72 @@ class RedisManager:
     def cleanup_device_data(self, device_id):
         """Clean up all data for a specific device"""
         try:
-            pattern = f"device:{device_id}:*"
-            keys = self.redis_client.keys(pattern)
+            keys = self.get_device_keys(device_id)
+            # Time series may span several storage keys (e.g. chunked backend)
+            storage_keys = set(keys)
+            for key in keys:
+                if ':timeseries:' in key or ':rollup:' in key:
+                    storage_keys.update(self.timeseries.storage_keys(key))
+            storage_keys = sorted(storage_keys)
+            storage_keys.append(self._get_key_registry_key(device_id))
+
+            # UNLINK frees memory in the background; chunked so no single call is huge
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for i in range(0, len(storage_keys), 500):
+                pipeline.unlink(*storage_keys[i:i + 500])
+            pipeline.execute()
 
+            self.retention.forget_keys(storage_keys)
+            self.rollups.forget_device(device_id)
+            device_prefix = f"device:{device_id}:"
+            with self._registered_keys_lock:
+                for key in [key for key in self._registered_keys if key.startswith(device_prefix)]:
+                    del self._registered_keys[key]
+            with self._published_values_lock:
+                for series in [series for series in self._published_values if series[0] == device_id]:
+                    del self._published_values[series]
             if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Cleaned up {len(keys)} keys for device {device_id}")
+                logger.info(f"Cleaned up {len(storage_keys) - 1} keys for device {device_id}")
 
             return True
         except Exception as e:
             logger.error(f"Failed to cleanup device data: {e}")
             return False
 
+    def _get_current_monitoring_values(self, device_keys, device_id, component=None, limit=10):
+        """
+        Count the current monitoring values of a device (or one component) in
+        either layout and return up to `limit` of their raw JSON
+        """
+        monitoring_prefix = f"device:{device_id}:monitoring:{component + ':' if component else ''}"
+        snapshot_prefix = f"device:{device_id}:snapshot:"
+        keys = [key for key in device_keys if key.startswith(monitoring_prefix)]
+        snapshot_keys = [key for key in device_keys if key.startswith(snapshot_prefix)
+                         and (component is None or key == snapshot_prefix + component)]
+
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for snapshot_key in snapshot_keys:
+            pipeline.hlen(snapshot_key)
+        lengths = pipeline.execute() if snapshot_keys else []
+
+        count = len(keys) + sum(lengths)
+        values = self.redis_client.mget(keys[:limit]) if keys else []
+        for snapshot_key in snapshot_keys:
+            if len(values) >= limit:
+                break
+            values.extend(self.redis_client.hvals(snapshot_key)[:limit - len(values)])
+        return count, values
+
     def get_device_status(self, device_id):
         """Get overall device status and data freshness"""
         try:
-            monitoring_pattern = f"device:{device_id}:monitoring:*"
-            monitoring_keys = self.redis_client.keys(monitoring_pattern)
+            data_points, values = self._get_current_monitoring_values(self.get_device_keys(device_id), device_id)
 
-            if not monitoring_keys:
+            if not data_points:
                 return {"status": "no_data", "last_update": None}
 
             latest_timestamp = None
-            for key in monitoring_keys[:10]:
-                data = self.redis_client.get(key)
+            for data in values:
                 if data:
                     parsed_data = json.loads(data)
                     if parsed_data.get("timestamp"):
@@ -429,7 +1006,7 @@ class RedisManager:
                 return {
                     "status": "active",
                     "last_update": latest_timestamp,
-                    "data_points": len(monitoring_keys)
+                    "data_points": data_points
                 }
             else:
                 return {"status": "no_data", "last_update": None}
@@ -466,11 +1043,11 @@ class RedisManager:
             total_data_points = 0
             latest_timestamp = None
 
+            device_keys = self.get_device_keys(device_id)
             for component in components:
-                pattern = f"device:{device_id}:monitoring:{component}:*"
-                keys = self.redis_client.keys(pattern)
+                data_points, values = self._get_current_monitoring_values(device_keys, device_id, component, limit=5)
 
-                if keys:
+                if data_points:
                     component_name = component.replace("-", "_")
                     if "optical-port-mux" in component:
                         component_name = "optical_ports_mux"
@@ -478,11 +1055,10 @@ class RedisManager:
                         component_name = "optical_ports_demux"
 
                     summary["components"][component_name]["status"] = "active"
-                    summary["components"][component_name]["data_points"] = len(keys)
-                    total_data_points += len(keys)
+                    summary["components"][component_name]["data_points"] = data_points
+                    total_data_points += data_points
 
-                    for key in keys[:5]:
-                        data = self.redis_client.get(key)
+                    for data in values:
                         if data:
                             parsed_data = json.loads(data)
                             if parsed_data.get("timestamp"):
@@ -0,0 +1,356 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class HashRing:
+    """
+    Consistent hash ring mapping device ids to shards. Every node sits on
+    POLLER_HASH_RING_REPLICAS points, so adding or removing a node only moves
+    the devices of the ring segments it gains or loses.
+    """
+
+    def __init__(self, replicas=None):
+        self.replicas = replicas or settings.POLLER_HASH_RING_REPLICAS
+        self._points = []
+        self._owners = {}
+        self.nodes = set()
+
+    @staticmethod
+    def _hash(key):
+        return int(hashlib.md5(str(key).encode('utf-8')).hexdigest()[:16], 16)
+
+    def add_node(self, node):
+        if node in self.nodes:
+            return
+        self.nodes.add(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}:{i}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node):
+        if node not in self.nodes:
+            return
+        self.nodes.discard(node)
+        for i in range(self.replicas):
+            point = self._hash(f"{node}:{i}")
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.pop(bisect.bisect_left(self._points, point))
+
+    def get_node(self, key):
+        """Node owning key, None if the ring is empty"""
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, self._hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+def _shard_report(shard_id, poller):
+    from .redis_manager import monitoring_redis, operational_config_redis, running_config_redis
+
+    metrics = poller.get_schedule_metrics()
+    return {
+        "shard": shard_id,
+        "pid": os.getpid(),
+        "time": time.monotonic(),
+        "devices": len(poller.devices_to_poll),
+        "polls": metrics["polls"],
+        "missed_deadlines": metrics["missed_deadlines"],
+        "redis_commands": sum(manager.get_write_batch_stats()["commands"]
+                              for manager in (monitoring_redis, operational_config_redis, running_config_redis)),
+    }
+
+
+def _shard_main(shard_id, commands, reports, parent_pid):
+    """
+    Entry point of a shard process: a DeviceDataPoller of its own, driven by
+    ('add', device_id), ('remove', device_id) and ('stop',) commands.
+    """
+    # Keep apps.ready() of the child from starting a poller over all devices
+    os.environ.pop('RUN_MAIN', None)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djangobackend.settings')
+    import django
+    django.setup()
+    from .background_poller import device_poller, follow_device_cleanups
+
+    logger.info(f"Poller shard {shard_id} started (pid {os.getpid()})")
+    # The cached values of a cleaned up device live in this process
+    cleanup_listener = follow_device_cleanups()
+    last_report = 0
+    while os.getppid() == parent_pid:
+        try:
+            command = commands.get(timeout=1)
+        except queue.Empty:
+            command = None
+        if command is not None:
+            if command[0] == 'stop':
+                break
+            if command[0] == 'add':
+                device_poller.start_polling(command[1])
+            elif command[0] == 'remove':
+                device_poller.stop_polling(command[1])
+        now = time.monotonic()
+        if now - last_report >= settings.POLLER_SHARD_REPORT_SECONDS:
+            reports.put(_shard_report(shard_id, device_poller))
+            last_report = now
+
+    cleanup_listener.stop()
+    if not device_poller.drain(settings.POLLER_DRAIN_SECONDS):
+        logger.warning(f"Poller shard {shard_id} stopped with polls still running")
+    logger.info(f"Poller shard {shard_id} stopped")
+
+
+class ShardedPoller:
+    """
+    Poller for POLLER_MODE = 'sharded': spawns POLLER_SHARDS processes, each
+    running its own DeviceDataPoller over a consistent hash slice of the
+    devices, so parsing and Redis serialization use every core instead of
+    sharing the GIL of the web process.
+
+    A monitor thread collects the shards' periodic reports and watches for
+    crashes. The devices of a crashed shard move to the remaining shards at
+    once; the shard is respawned after POLLER_SHARD_RESTART_SECONDS and takes
+    its slice back. Same start_polling/stop_polling interface as
+    DeviceDataPoller.
+    """
+
+    def __init__(self):
+        self.running = False
+        self.devices_to_poll = set()
+        self.ring = HashRing()
+        self._context = multiprocessing.get_context('spawn')
+        self._lock = threading.RLock()
+        # shard_id -> {"process", "commands", "restarts", "report", "polls_per_second"}
+        self._shards = {}
+        # device_id -> shard currently told to poll it
+        self._assignment = {}
+        # shard_id -> monotonic time of its respawn after a crash
+        self._pending_restarts = {}
+        self._next_shard_id = 0
+        self._reports = None
+        self._monitor_thread = None
+
+    def start(self):
+        """Spawn the shard processes and the monitor thread if not running"""
+        with self._lock:
+            if self.running:
+                return
+            self.running = True
+            self._reports = self._context.Queue()
+            shard_count = settings.POLLER_SHARDS or os.cpu_count() or 1
+            for _ in range(shard_count):
+                self._add_shard()
+            self._monitor_thread = threading.Thread(target=self._monitor_loop, name='poller-shards', daemon=True)
+            self._monitor_thread.start()
+            logger.info(f"Started sharded poller with {shard_count} shards")
+
+    def _spawn(self, shard_id, restarts=0):
+        # Caller holds self._lock
+        commands = self._context.Queue()
+        process = self._context.Process(target=_shard_main, args=(shard_id, commands, self._reports, os.getpid()),
+                                        name=f'poller-shard-{shard_id}', daemon=True)
+        process.start()
+        self._shards[shard_id] = {
+            "process": process,
+            "commands": commands,
+            "restarts": restarts,
+            "report": None,
+            "polls_per_second": 0.0,
+        }
+        self.ring.add_node(shard_id)
+
+    def _add_shard(self):
+        # Caller holds self._lock
+        shard_id = self._next_shard_id
+        self._next_shard_id += 1
+        self._spawn(shard_id)
+        return shard_id
+
+    def add_shard(self):
+        """Spawn one more shard and move its slice of the devices to it"""
+        with self._lock:
+            if not self.running:
+                self.start()
+            shard_id = self._add_shard()
+            self._rebalance()
+            return shard_id
+
+    def remove_shard(self, shard_id, timeout=10):
+        """Move the devices of a shard to the others, then stop it"""
+        with self._lock:
+            self._pending_restarts.pop(shard_id, None)
+            shard = self._shards.get(shard_id)
+            if shard is None:
+                return False
+            self.ring.remove_node(shard_id)
+            self._rebalance()
+            del self._shards[shard_id]
+        shard["commands"].put(('stop',))
+        shard["process"].join(timeout)
+        if shard["process"].is_alive():
+            shard["process"].terminate()
+        logger.info(f"Removed poller shard {shard_id}")
+        return True
+
+    def _rebalance(self):
+        # Caller holds self._lock
+        desired = {device_id: self.ring.get_node(device_id) for device_id in self.devices_to_poll}
+        moves = [(device_id, shard_id, desired.get(device_id))
+                 for device_id, shard_id in self._assignment.items() if desired.get(device_id) != shard_id]
+        # Release devices before handing them to their new shard
+        for device_id, old_shard, _ in moves:
+            del self._assignment[device_id]
+            if old_shard in self._shards:
+                self._shards[old_shard]["commands"].put(('remove', device_id))
+        for device_id, shard_id in desired.items():
+            if shard_id is not None and device_id not in self._assignment:
+                self._assignment[device_id] = shard_id
+                self._shards[shard_id]["commands"].put(('add', device_id))
+
+    def start_polling(self, device_id):
+        """Start polling a device on the shard owning it"""
+        with self._lock:
+            self.start()
+            self.devices_to_poll.add(device_id)
+            self._rebalance()
+
+    def stop_polling(self, device_id):
+        """Stop polling a device"""
+        with self._lock:
+            self.devices_to_poll.discard(device_id)
+            self._rebalance()
+
+    def start_polling_all_devices(self):
+        """Start polling for all devices in storage"""
+        from .device_storage import get_all_device_ids
+
+        try:
+            device_ids = get_all_device_ids()
+            with self._lock:
+                self.start()
+                self.devices_to_poll.update(device_ids)
+                self._rebalance()
+            logger.info(f"Started polling for {len(device_ids)} devices")
+        except Exception as e:
+            logger.error(f"Error starting polling for all devices: {e}")
+
+    def _monitor_loop(self):
+        while self.running:
+            try:
+                report = self._reports.get(timeout=1)
+            except queue.Empty:
+                report = None
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if report is not None:
+                    self._record_report(report)
+                self._check_shards()
+
+    def _record_report(self, report):
+        # Caller holds self._lock
+        shard = self._shards.get(report["shard"])
+        if shard is None or report["pid"] != shard["process"].pid:
+            return
+        previous = shard["report"]
+        if previous is not None and report["time"] > previous["time"]:
+            shard["polls_per_second"] = (report["polls"] - previous["polls"]) / (report["time"] - previous["time"])
+        shard["report"] = report
+
+    def _check_shards(self):
+        # Caller holds self._lock
+        now = time.monotonic()
+        for shard_id, shard in list(self._shards.items()):
+            if shard_id in self._pending_restarts or shard["process"].is_alive():
+                continue
+            logger.error(f"Poller shard {shard_id} exited with code {shard['process'].exitcode}, "
+                         f"moving its devices to the other shards")
+            self.ring.remove_node(shard_id)
+            # Nothing to tell a dead shard, just forget what it polled
+            for device_id in [d for d, s in self._assignment.items() if s == shard_id]:
+                del self._assignment[device_id]
+            self._rebalance()
+            self._pending_restarts[shard_id] = now + settings.POLLER_SHARD_RESTART_SECONDS
+        for shard_id, restart_at in list(self._pending_restarts.items()):
+            if restart_at > now:
+                continue
+            del self._pending_restarts[shard_id]
+            self._spawn(shard_id, restarts=self._shards[shard_id]["restarts"] + 1)
+            self._rebalance()
+            logger.info(f"Restarted poller shard {shard_id}")
+
+    def stop(self, timeout=10):
+        """
+        Stop every shard process and the monitor thread. Shards finish their
+        polls in flight first; returns False if one had to be terminated.
+        """
+        with self._lock:
+            if not self.running:
+                return True
+            self.running = False
+            shards = list(self._shards.values())
+            self._shards.clear()
+            self._assignment.clear()
+            self._pending_restarts.clear()
+            self.ring = HashRing()
+        for shard in shards:
+            shard["commands"].put(('stop',))
+        stopped = True
+        deadline = time.monotonic() + timeout
+        for shard in shards:
+            shard["process"].join(max(0, deadline - time.monotonic()))
+            if shard["process"].is_alive():
+                shard["process"].terminate()
+                stopped = False
+        if self._monitor_thread is not None:
+            self._monitor_thread.join(timeout)
+            self._monitor_thread = None
+        return stopped
+
+    def drain(self, timeout=None):
+        """Stop the shards after they finished their polls in flight"""
+        # Shards wait POLLER_DRAIN_SECONDS themselves, leave them time to exit
+        return self.stop(timeout if timeout is not None else settings.POLLER_DRAIN_SECONDS + 5)
+
+    def get_schedule_metrics(self):
+        """Get devices, throughput, missed deadlines and restarts per shard"""
+        with self._lock:
+            shards = {}
+            for shard_id, shard in self._shards.items():
+                report = shard["report"] or {}
+                shards[shard_id] = {
+                    "pid": shard["process"].pid,
+                    "alive": shard["process"].is_alive(),
+                    "restarting": shard_id in self._pending_restarts,
+                    "restarts": shard["restarts"],
+                    "assigned_devices": sum(1 for s in self._assignment.values() if s == shard_id),
+                    "polling_devices": report.get("devices", 0),
+                    "polls": report.get("polls", 0),
+                    "polls_per_second": shard["polls_per_second"],
+                    "missed_deadlines": report.get("missed_deadlines", 0),
+                    "redis_commands": report.get("redis_commands", 0),
+                    "report_age_s": time.monotonic() - report["time"] if report else None,
+                }
+            return {
+                "running": self.running,
+                "mode": "sharded",
+                "scheduled": len(self.devices_to_poll),
+                "polls": sum(shard["polls"] for shard in shards.values()),
+                "polls_per_second": sum(shard["polls_per_second"] for shard in shards.values()),
+                "missed_deadlines": sum(shard["missed_deadlines"] for shard in shards.values()),
+                "shards": shards,
+            }
+
+
+# Global sharded poller, used when POLLER_MODE = 'sharded'
+sharded_poller = ShardedPoller()
@@ -0,0 +1,759 @@
+import json
+import struct
+import threading
+import time
+import logging
+import redis
+from django.conf import settings
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from .downsampling import AGGREGATORS, aggregate_points
+from .gorilla import RAW_RECORD, encode_chunk, decode_chunk, chunk_point_count, pack_raw_points, unpack_raw_points
+
+logger = logging.getLogger(__name__)
+
+LOCAL_TIMEZONE = ZoneInfo("Asia/Karachi")
+
+# Marks a key whose layout was not looked up yet
+_UNKNOWN = object()
+
+
+def format_local_timestamp(score_ms):
+    """Format epoch milliseconds as a local ISO timestamp with ms precision"""
+    dt = datetime.fromtimestamp(score_ms / 1000, tz=timezone.utc).astimezone(LOCAL_TIMEZONE)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]
+
+
+def _is_numeric(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _to_float(value):
+    """Float of a numeric value or numeric string, None otherwise"""
+    if isinstance(value, bool) or value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class TimeseriesBackend:
+    """
+    Storage layout of the monitoring history kept by a RedisManager.
+
+    Writes go through a client passed by the caller so they can be queued on
+    a RedisWriteBatch or pipeline; reads use the backend's own client.
+    Samples are the dicts RedisManager builds ({"value", "timestamp_local"}
+    or {"values", "timestamp_local"}) scored by epoch milliseconds.
+    """
+
+    name = None
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    def append(self, client, key, score_ms, data):
+        """Queue one sample on client"""
+        raise NotImplementedError
+
+    def latest(self, key, count):
+        """Get the newest `count` samples, newest first"""
+        raise NotImplementedError
+
+    def range(self, key, start_ms=None, end_ms=None):
+        """Get [(score_ms, sample)] between start_ms and end_ms (inclusive), oldest first"""
+        raise NotImplementedError
+
+    def points(self, key, start_ms=None, end_ms=None):
+        """Get [(score_ms, float)] of the numeric 'value' of a single parameter series"""
+        return [(score_ms, float(sample['value'])) for score_ms, sample in self.range(key, start_ms, end_ms)
+                if _is_numeric(sample.get('value'))]
+
+    def aggregate(self, key, start_ms, end_ms, bucket_ms, aggregators=('avg',)):
+        """Get [(bucket_start_ms, {aggregator: value})] of the numeric 'value' per bucket"""
+        return aggregate_points(self.points(key, start_ms, end_ms), bucket_ms, aggregators)
+
+    def trim(self, client, key, cutoff_ms):
+        """
+        Queue removal of samples scored at or before cutoff_ms on client
+
+        Returns:
+            list: One function per queued command, turning its reply into
+            the number of samples it removed
+        """
+        raise NotImplementedError
+
+    def delete(self, client, key):
+        """Queue removal of every sample of key on client"""
+        client.delete(key)
+
+    def forget(self, key):
+        """Drop anything cached about key after it was changed behind the backend's back"""
+
+    def can_store(self, samples):
+        """Whether write_samples() can hold all of [(score_ms, sample)]"""
+        return True
+
+    def write_samples(self, client, key, samples):
+        """Queue [(score_ms, sample)] on client for a key that is known to be empty"""
+        for score_ms, sample in samples:
+            self.append(client, key, score_ms, sample)
+
+    def owns(self, key):
+        """Whether key is already stored in this backend's layout"""
+        raise NotImplementedError
+
+    def storage_keys(self, key):
+        """Redis keys currently holding the samples of key"""
+        return [key] if self.redis_client.exists(key) else []
+
+    def series_key(self, raw_key):
+        """Series key a scanned Redis key belongs to, None for helper keys"""
+        return raw_key
+
+    def seal_due(self, force=False):
+        """Periodic maintenance run by the retention thread, returns work done"""
+        return 0
+
+
+class ZSetTimeseriesBackend(TimeseriesBackend):
+    """
+    Original layout: each sample is a compact JSON member of a sorted set
+    scored by epoch ms. Identical samples collapse into one member.
+    """
+
+    name = 'zset'
+
+    @staticmethod
+    def _decode(item):
+        parsed = json.loads(item)
+        # normalize timestamps if necessary
+        if 'timestamp' in parsed and 'timestamp_local' not in parsed:
+            parsed['timestamp_local'] = parsed.pop('timestamp')
+        return parsed
+
+    def append(self, client, key, score_ms, data):
+        client.zadd(key, {json.dumps(data, separators=(',', ':')): int(score_ms)})
+
+    def latest(self, key, count):
+        result = []
+        for item in self.redis_client.zrevrange(key, 0, count - 1):
+            try:
+                result.append(self._decode(item))
+            except Exception:
+                # skip malformed entries
+                continue
+        return result
+
+    def range(self, key, start_ms=None, end_ms=None):
+        low = '-inf' if start_ms is None else int(start_ms)
+        high = '+inf' if end_ms is None else int(end_ms)
+        result = []
+        for item, score in self.redis_client.zrangebyscore(key, low, high, withscores=True):
+            try:
+                result.append((int(score), self._decode(item)))
+            except Exception:
+                continue
+        return result
+
+    def trim(self, client, key, cutoff_ms):
+        client.zremrangebyscore(key, 0, int(cutoff_ms))
+        return [int]
+
+    def owns(self, key):
+        return self.redis_client.type(key) == 'zset'
+
+
+class RedisTimeSeriesBackend(TimeseriesBackend):
+    """
+    Numeric samples go to a RedisTimeSeries key (TS.ADD) so duplicates are
+    kept, each point costs a few bytes and range/aggregation run on the
+    server. Samples without a numeric 'value' (strings, grouped snapshots)
+    stay in the sorted set layout under the same key.
+
+    Requires the RedisTimeSeries module (redis-stack) on the server.
+    """
+
+    name = 'redistimeseries'
+
+    NATIVE_TYPE = 'TSDB-TYPE'
+
+    def __init__(self, redis_client):
+        super().__init__(redis_client)
+        self.fallback = ZSetTimeseriesBackend(redis_client)
+        # key -> True for a native series, False for a sorted set, None for a
+        # key missing when looked up; learned on write or via one TYPE per key
+        self._native_keys = {}
+        self._lock = threading.Lock()
+
+    def _is_native(self, key):
+        """
+        Whether key holds a native series, None if it did not exist when it
+        was looked up; the first write then picks its layout from the value
+        """
+        with self._lock:
+            native = self._native_keys.get(key, _UNKNOWN)
+        if native is _UNKNOWN:
+            key_type = self.redis_client.type(key)
+            native = None if key_type == 'none' else key_type == self.NATIVE_TYPE
+            with self._lock:
+                # A write made meanwhile knows better
+                native = self._native_keys.setdefault(key, native)
+        return native
+
+    def _read(self, key, native_read, fallback_read):
+        """
+        Read key as a native series unless it is known to be a sorted set.
+        A missing key reads as empty; a key another process created as a
+        sorted set since it was looked up is read from the fallback.
+        """
+        if self._is_native(key) is False:
+            return fallback_read()
+        try:
+            return native_read()
+        except redis.ResponseError as e:
+            if str(e).startswith('WRONGTYPE'):
+                self._remember(key, False)
+                return fallback_read()
+            if 'does not exist' in str(e):
+                return []
+            raise
+
+    def _remember(self, key, native):
+        with self._lock:
+            self._native_keys[key] = native
+
+    def append(self, client, key, score_ms, data):
+        value = data.get('value')
+        native = self._is_native(key)
+        if native is False or (native is None and not _is_numeric(value)):
+            # String parameters and grouped snapshots keep the sorted set layout
+            self.fallback.append(client, key, score_ms, data)
+            self._remember(key, False)
+            return
+        if not _is_numeric(value):
+            logger.debug(f"Dropping non numeric sample for native series {key}: {value}")
+            return
+        # ON_DUPLICATE LAST: a re-polled device timestamp overwrites instead of failing
+        client.execute_command('TS.ADD', key, int(score_ms), float(value), 'ON_DUPLICATE', 'LAST')
+        self._remember(key, True)
+
+    def can_store(self, samples):
+        return all(_is_numeric(sample.get('value')) for _, sample in samples)
+
+    def write_samples(self, client, key, samples):
+        for score_ms, sample in samples:
+            client.execute_command('TS.ADD', key, int(score_ms), float(sample['value']), 'ON_DUPLICATE', 'LAST')
+        self._remember(key, True)
+
+    def _to_samples(self, points):
+        return [
+            (int(ts), {"value": float(value), "timestamp_local": format_local_timestamp(int(ts))})
+            for ts, value in points
+        ]
+
+    def latest(self, key, count):
+        def native_read():
+            points = self.redis_client.execute_command('TS.REVRANGE', key, '-', '+', 'COUNT', int(count))
+            return [sample for _, sample in self._to_samples(points)]
+        return self._read(key, native_read, lambda: self.fallback.latest(key, count))
+
+    def range(self, key, start_ms=None, end_ms=None):
+        low = '-' if start_ms is None else int(start_ms)
+        high = '+' if end_ms is None else int(end_ms)
+        return self._read(key, lambda: self._to_samples(self.redis_client.execute_command('TS.RANGE', key, low, high)),
+                          lambda: self.fallback.range(key, start_ms, end_ms))
+
+    def points(self, key, start_ms=None, end_ms=None):
+        low = '-' if start_ms is None else int(start_ms)
+        high = '+' if end_ms is None else int(end_ms)
+        return self._read(key, lambda: [(int(ts), float(value)) for ts, value in
+                                        self.redis_client.execute_command('TS.RANGE', key, low, high)],
+                          lambda: self.fallback.points(key, start_ms, end_ms))
+
+    def aggregate(self, key, start_ms, end_ms, bucket_ms, aggregators=('avg',)):
+        for aggregator in aggregators:
+            if aggregator not in AGGREGATORS:
+                raise ValueError(f"Unknown aggregator '{aggregator}'")
+        low = '-' if start_ms is None else int(start_ms)
+        high = '+' if end_ms is None else int(end_ms)
+
+        def native_read():
+            # One server side aggregation per aggregator, sent in one round trip
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for aggregator in aggregators:
+                pipeline.execute_command('TS.RANGE', key, low, high, 'AGGREGATION', aggregator, int(bucket_ms))
+            buckets = {}
+            for aggregator, points in zip(aggregators, pipeline.execute()):
+                for ts, value in points:
+                    buckets.setdefault(int(ts), {})[aggregator] = float(value)
+            return sorted(buckets.items())
+        return self._read(key, native_read,
+                          lambda: self.fallback.aggregate(key, start_ms, end_ms, bucket_ms, aggregators))
+
+    def trim(self, client, key, cutoff_ms):
+        native = self._is_native(key)
+        if native:
+            client.execute_command('TS.DEL', key, 0, int(cutoff_ms))
+            return [int]
+        if native is False:
+            return self.fallback.trim(client, key, cutoff_ms)
+        return []
+
+    def delete(self, client, key):
+        client.delete(key)
+        self.forget(key)
+
+    def forget(self, key):
+        with self._lock:
+            self._native_keys.pop(key, None)
+
+    def owns(self, key):
+        return self.redis_client.type(key) == self.NATIVE_TYPE
+
+
+class ChunkedTimeseriesBackend(TimeseriesBackend):
+    """
+    Gorilla compressed chunks in plain Redis strings.
+
+    Each numeric field of a sample (the 'value' of a parameter, or every
+    port/parameter pair of a grouped snapshot) is its own series:
+
+        {key}:v:{field}:head     raw 16 byte records, APPENDed on write
+        {key}:v:{field}:sealing  head being compressed
+        {key}:v:{field}:chunks   ZSET of sealed chunks scored by their last timestamp
+
+    Heads are sealed into one chunk every TIMESERIES_CHUNK_SECONDS by the
+    retention thread. Reads only decode chunks overlapping the requested
+    range. Non numeric values (states, descriptions) are kept as a change log
+    in the {key}:labels ZSET and {key}:fields lists the numeric fields.
+    Values come back as floats and per-port timestamps of grouped samples
+    are not kept.
+    """
+
+    name = 'chunked'
+
+    FIELDS_SUFFIX = ':fields'
+    LABELS_SUFFIX = ':labels'
+    FIELD_INFIX = ':v:'
+    # Chunk members start with their first and last timestamp so the
+    # overlap check needs no decoding
+    CHUNK_PREFIX = struct.Struct('>qq')
+
+    def __init__(self, redis_client):
+        super().__init__(redis_client)
+        self.binary_client = self._make_binary_client(redis_client)
+        self._lock = threading.Lock()
+        # key -> set of numeric fields written by this process
+        self._fields = {}
+        # key -> monotonic time of the first append since the last seal
+        self._open_heads = {}
+        # (key, field) -> last label value written by this process
+        self._labels = {}
+
+    @staticmethod
+    def _make_binary_client(redis_client):
+        # Same server and DB, but replies stay bytes for the binary chunks
+        pool = redis_client.connection_pool
+        kwargs = dict(pool.connection_kwargs)
+        kwargs['decode_responses'] = False
+        binary_pool = pool.__class__(connection_class=pool.connection_class, **kwargs)
+        return redis.Redis(connection_pool=binary_pool)
+
+    def _field_key(self, key, field, part):
+        return f"{key}{self.FIELD_INFIX}{field}:{part}"
+
+    @staticmethod
+    def _flatten(data):
+        """[(field, value)] of a sample dict"""
+        if 'values' in data:
+            fields = []
+            for port, entry in (data.get('values') or {}).items():
+                if not isinstance(entry, dict):
+                    continue
+                for param, value in entry.items():
+                    if param != 'timestamp':
+                        fields.append((f"values/{port}/{param}", value))
+            return fields
+        return [('value', data.get('value'))]
+
+    @staticmethod
+    def _unflatten(fields, score_ms):
+        if any(field.startswith('values/') for field in fields):
+            values = {}
+            for field, value in fields.items():
+                _, port, param = field.split('/', 2)
+                values.setdefault(port, {})[param] = value
+            sample = {"values": values}
+        else:
+            sample = {"value": fields.get('value')}
+        sample["timestamp_local"] = format_local_timestamp(score_ms)
+        return sample
+
+    def append(self, client, key, score_ms, data):
+        score_ms = int(score_ms)
+        new_fields = []
+        for field, value in self._flatten(data):
+            number = _to_float(value)
+            if number is None:
+                if value is None or value == "":
+                    continue
+                with self._lock:
+                    changed = self._labels.get((key, field)) != value
+                    self._labels[(key, field)] = value
+                if changed:
+                    client.zadd(f"{key}{self.LABELS_SUFFIX}",
+                                {json.dumps([score_ms, field, value], separators=(',', ':')): score_ms})
+                continue
+            client.append(self._field_key(key, field, 'head'), pack_raw_points([(score_ms, number)]))
+            with self._lock:
+                known = self._fields.setdefault(key, set())
+                if field not in known:
+                    known.add(field)
+                    new_fields.append(field)
+        if new_fields:
+            client.sadd(f"{key}{self.FIELDS_SUFFIX}", *new_fields)
+        with self._lock:
+            self._open_heads.setdefault(key, time.monotonic())
+
+    def _get_fields(self, key):
+        return sorted(member.decode() for member in self.binary_client.smembers(f"{key}{self.FIELDS_SUFFIX}"))
+
+    def _read_field_points(self, key, fields, start_ms=None, end_ms=None):
+        """{field: [(ts, value)]} of chunks, sealing and head overlapping the range"""
+        pipeline = self.binary_client.pipeline(transaction=False)
+        for field in fields:
+            low = '-inf' if start_ms is None else int(start_ms)
+            pipeline.zrangebyscore(self._field_key(key, field, 'chunks'), low, '+inf')
+            pipeline.get(self._field_key(key, field, 'sealing'))
+            pipeline.get(self._field_key(key, field, 'head'))
+        replies = pipeline.execute()
+
+        low = float('-inf') if start_ms is None else int(start_ms)
+        high = float('inf') if end_ms is None else int(end_ms)
+        points_by_field = {}
+        for index, field in enumerate(fields):
+            chunks, sealing, head = replies[index * 3:index * 3 + 3]
+            points = []
+            for member in chunks:
+                first_ts, _ = self.CHUNK_PREFIX.unpack_from(member)
+                if first_ts > high:
+                    continue
+                points.extend(decode_chunk(member[self.CHUNK_PREFIX.size:]))
+            points.extend(unpack_raw_points(sealing))
+            points.extend(unpack_raw_points(head))
+            points_by_field[field] = sorted(p for p in points if low <= p[0] <= high)
+        return points_by_field
+
+    def _read_labels(self, key, end_ms=None):
+        high = '+inf' if end_ms is None else int(end_ms)
+        entries = []
+        for member in self.redis_client.zrangebyscore(f"{key}{self.LABELS_SUFFIX}", '-inf', high):
+            try:
+                entries.append(tuple(json.loads(member)))
+            except Exception:
+                continue
+        return sorted(entries, key=lambda entry: entry[0])
+
+    def _build_samples(self, points_by_field, labels, start_ms=None):
+        """Join per-field points (and the label state at each timestamp) into samples"""
+        rows = {}
+        for field, points in points_by_field.items():
+            for ts, value in points:
+                rows.setdefault(int(ts), {})[field] = value
+        if not rows:
+            # Only labels: every change is a sample
+            low = float('-inf') if start_ms is None else start_ms
+            for ts, field, value in labels:
+                if ts >= low:
+                    rows.setdefault(int(ts), {})
+        timestamps = sorted(rows)
+
+        samples = []
+        state = {}
+        label_index = 0
+        for ts in timestamps:
+            while label_index < len(labels) and labels[label_index][0] <= ts:
+                _, field, value = labels[label_index]
+                state[field] = value
+                label_index += 1
+            fields = dict(state)
+            fields.update(rows[ts])
+            samples.append((ts, self._unflatten(fields, ts)))
+        return samples
+
+    def range(self, key, start_ms=None, end_ms=None):
+        fields = self._get_fields(key)
+        points_by_field = self._read_field_points(key, fields, start_ms, end_ms)
+        return self._build_samples(points_by_field, self._read_labels(key, end_ms), start_ms)
+
+    def latest(self, key, count):
+        fields = self._get_fields(key)
+        if not fields:
+            labels = self._read_labels(key)
+            start_ms = labels[-count][0] if len(labels) >= count else None
+        else:
+            # Walk back one chunk at a time until enough points are decoded
+            start_ms = None
+            pipeline = self.binary_client.pipeline(transaction=False)
+            for field in fields:
+                pipeline.strlen(self._field_key(key, field, 'head'))
+                pipeline.strlen(self._field_key(key, field, 'sealing'))
+                pipeline.zrevrange(self._field_key(key, field, 'chunks'), 0, -1, withscores=True)
+            replies = pipeline.execute()
+            for index in range(len(fields)):
+                head_len, sealing_len, chunks = replies[index * 3:index * 3 + 3]
+                available = (head_len + sealing_len) // RAW_RECORD.size
+                for member, _ in chunks:
+                    if available >= count:
+                        break
+                    first_ts, _ = self.CHUNK_PREFIX.unpack_from(member)
+                    available += chunk_point_count(member[self.CHUNK_PREFIX.size:])
+                    start_ms = first_ts if start_ms is None else min(start_ms, first_ts)
+                if available < count:
+                    start_ms = None
+                    break
+        samples = self.range(key, start_ms)
+        return [sample for _, sample in reversed(samples[-count:])]
+
+    def points(self, key, start_ms=None, end_ms=None):
+        # Single parameter series are read without building samples
+        return self._read_field_points(key, ['value'], start_ms, end_ms)['value']
+
+    def _encode_member(self, points):
+        return self.CHUNK_PREFIX.pack(int(points[0][0]), int(points[-1][0])) + encode_chunk(points)
+
+    def seal(self, key):
+        """Compress the heads of key into one chunk per field, returns points sealed"""
+        fields = self._get_fields(key)
+        if not fields:
+            return 0
+        # Rotate each head atomically; a sealing key left by a crash is
+        # picked up again by the GET before the RENAME
+        pipeline = self.binary_client.pipeline(transaction=True)
+        for field in fields:
+            pipeline.get(self._field_key(key, field, 'sealing'))
+            pipeline.rename(self._field_key(key, field, 'head'), self._field_key(key, field, 'sealing'))
+            pipeline.get(self._field_key(key, field, 'sealing'))
+        replies = pipeline.execute(raise_on_error=False)
+
+        sealed = 0
+        pipeline = self.binary_client.pipeline(transaction=True)
+        for index, field in enumerate(fields):
+            old, renamed, new = replies[index * 3:index * 3 + 3]
+            data = (old or b'') + (new if not isinstance(renamed, Exception) and new else b'')
+            points = sorted(unpack_raw_points(data))
+            if not points:
+                continue
+            pipeline.zadd(self._field_key(key, field, 'chunks'), {self._encode_member(points): points[-1][0]})
+            pipeline.delete(self._field_key(key, field, 'sealing'))
+            sealed += len(points)
+        pipeline.execute()
+        return sealed
+
+    def seal_due(self, force=False):
+        now = time.monotonic()
+        with self._lock:
+            due = [key for key, opened in self._open_heads.items()
+                   if force or now - opened >= settings.TIMESERIES_CHUNK_SECONDS]
+            for key in due:
+                del self._open_heads[key]
+        sealed = 0
+        for key in due:
+            try:
+                sealed += self.seal(key)
+            except Exception as e:
+                logger.error(f"Failed to seal time series chunk of {key}: {e}")
+        return sealed
+
+    def trim(self, client, key, cutoff_ms):
+        counters = []
+        # Chunks are removed by member, so the points they held are known
+        chunk_keys = [self._field_key(key, field, 'chunks') for field in self._get_fields(key)]
+        pipeline = self.binary_client.pipeline(transaction=False)
+        for chunks_key in chunk_keys:
+            pipeline.zrangebyscore(chunks_key, 0, int(cutoff_ms))
+        for chunks_key, members in zip(chunk_keys, pipeline.execute()):
+            if not members:
+                continue
+            client.zrem(chunks_key, *members)
+            points = sum(chunk_point_count(member[self.CHUNK_PREFIX.size:]) for member in members)
+            counters.append(lambda removed, points=points: points if removed else 0)
+        # Keep the newest change of each label so the state stays known
+        labels_key = f"{key}{self.LABELS_SUFFIX}"
+        expired = {}
+        for member in self.redis_client.zrangebyscore(labels_key, 0, int(cutoff_ms)):
+            try:
+                _, field, _ = json.loads(member)
+            except Exception:
+                client.zrem(labels_key, member)
+                counters.append(int)
+                continue
+            expired.setdefault(field, []).append(member)
+        superseded = [member for members in expired.values() for member in members[:-1]]
+        if superseded:
+            client.zrem(labels_key, *superseded)
+            counters.append(int)
+        return counters
+
+    def delete(self, client, key):
+        for storage_key in self.storage_keys(key):
+            client.delete(storage_key)
+        self.forget(key)
+
+    def forget(self, key):
+        with self._lock:
+            self._fields.pop(key, None)
+            self._open_heads.pop(key, None)
+            for label in [label for label in self._labels if label[0] == key]:
+                del self._labels[label]
+
+    def write_samples(self, client, key, samples):
+        """Write straight into sealed chunks, one per TIMESERIES_CHUNK_SECONDS window"""
+        window_ms = settings.TIMESERIES_CHUNK_SECONDS * 1000
+        points_by_field = {}
+        for score_ms, sample in sorted(samples, key=lambda item: item[0]):
+            for field, value in self._flatten(sample):
+                number = _to_float(value)
+                if number is not None:
+                    points_by_field.setdefault(field, []).append((int(score_ms), number))
+                elif value is not None and value != "":
+                    if self._labels.get((key, field)) != value:
+                        self._labels[(key, field)] = value
+                        client.zadd(f"{key}{self.LABELS_SUFFIX}",
+                                    {json.dumps([int(score_ms), field, value], separators=(',', ':')): int(score_ms)})
+        for field, points in points_by_field.items():
+            windows = {}
+            for point in points:
+                windows.setdefault(point[0] // window_ms, []).append(point)
+            client.zadd(self._field_key(key, field, 'chunks'),
+                        {self._encode_member(chunk): chunk[-1][0] for chunk in windows.values()})
+        if points_by_field:
+            client.sadd(f"{key}{self.FIELDS_SUFFIX}", *points_by_field)
+        self.forget(key)
+
+    def owns(self, key):
+        return bool(self.redis_client.exists(f"{key}{self.FIELDS_SUFFIX}", f"{key}{self.LABELS_SUFFIX}"))
+
+    def storage_keys(self, key):
+        candidates = [f"{key}{self.FIELDS_SUFFIX}", f"{key}{self.LABELS_SUFFIX}"]
+        for field in self._get_fields(key):
+            candidates.extend(self._field_key(key, field, part) for part in ('head', 'sealing', 'chunks'))
+        pipeline = self.redis_client.pipeline(transaction=False)
+        for candidate in candidates:
+            pipeline.exists(candidate)
+        return [candidate for candidate, exists in zip(candidates, pipeline.execute()) if exists]
+
+    def series_key(self, raw_key):
+        for suffix in (self.FIELDS_SUFFIX, self.LABELS_SUFFIX):
+            if raw_key.endswith(suffix):
+                return raw_key[:-len(suffix)]
+        if self.FIELD_INFIX in raw_key:
+            return None
+        return raw_key
+
+
+TIMESERIES_BACKENDS = {
+    ZSetTimeseriesBackend.name: ZSetTimeseriesBackend,
+    RedisTimeSeriesBackend.name: RedisTimeSeriesBackend,
+    ChunkedTimeseriesBackend.name: ChunkedTimeseriesBackend,
+}
+
+
+def get_timeseries_backend(name, redis_client):
+    """Create the backend registered under name"""
+    try:
+        backend_class = TIMESERIES_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown time series backend '{name}', expected one of {sorted(TIMESERIES_BACKENDS)}")
+    return backend_class(redis_client)
+
+
+def detect_timeseries_backend(redis_client, key):
+    """Get a backend able to read key as it is currently stored, or None"""
+    chunked = ChunkedTimeseriesBackend(redis_client)
+    if chunked.owns(key):
+        return chunked
+    key_type = redis_client.type(key)
+    if key_type == 'zset':
+        return ZSetTimeseriesBackend(redis_client)
+    if key_type == RedisTimeSeriesBackend.NATIVE_TYPE:
+        return RedisTimeSeriesBackend(redis_client)
+    return None
+
+
+def migrate_timeseries_key(redis_client, key, target, dry_run=False):
+    """
+    Rewrite one time series key into the target backend's layout.
+
+    Keys the target cannot hold (e.g. string samples for a native series)
+    are left as they are. The samples are written under a temporary key
+    whose storage keys then replace the old ones in one MULTI block, so a
+    failed write leaves the original untouched. Samples appended while a key is copied are lost,
+    so run this with the poller stopped.
+
+    Returns:
+        int: Number of samples migrated, 0 if the key was skipped
+    """
+    if target.owns(key):
+        return 0
+    source = detect_timeseries_backend(redis_client, key)
+    if source is None:
+        return 0
+
+    samples = source.range(key)
+    if not samples or not target.can_store(samples):
+        return 0
+    if dry_run:
+        return len(samples)
+
+    tmp_key = f"{key}:migrating"
+    try:
+        pipeline = redis_client.pipeline(transaction=False)
+        target.delete(pipeline, tmp_key)
+        target.write_samples(pipeline, tmp_key, samples)
+        pipeline.execute()
+
+        pipeline = redis_client.pipeline(transaction=True)
+        source.delete(pipeline, key)
+        for storage_key in target.storage_keys(tmp_key):
+            pipeline.rename(storage_key, key + storage_key[len(tmp_key):])
+        pipeline.execute()
+    except Exception:
+        for storage_key in target.storage_keys(tmp_key):
+            redis_client.delete(storage_key)
+        raise
+    finally:
+        target.forget(tmp_key)
+        target.forget(key)
+    return len(samples)
+
+
+def migrate_timeseries(redis_client, target, match='device:*:timeseries:*', dry_run=False):
+    """
+    Migrate every time series key matching `match` into the target backend
+
+    Returns:
+        dict: keys scanned, keys migrated, samples migrated and failures
+    """
+    stats = {"keys_scanned": 0, "keys_migrated": 0, "samples_migrated": 0, "failed_keys": []}
+    chunked = ChunkedTimeseriesBackend(redis_client)
+    series_keys = set()
+    for raw_key in redis_client.scan_iter(match=match, count=500):
+        # Chunked series span several keys; migrate each series once
+        key = chunked.series_key(raw_key)
+        if key is None or key in series_keys or key.endswith(':migrating'):
+            continue
+        series_keys.add(key)
+        stats["keys_scanned"] += 1
+        try:
+            migrated = migrate_timeseries_key(redis_client, key, target, dry_run=dry_run)
+        except Exception as e:
+            logger.error(f"Failed to migrate time series key {key}: {e}")
+            stats["failed_keys"].append(key)
+            continue
+        if migrated:
+            stats["keys_migrated"] += 1
+            stats["samples_migrated"] += migrated
+    return stats
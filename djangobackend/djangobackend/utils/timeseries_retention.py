@@ -0,0 +1,190 @@
+import threading
+import time
+import logging
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class TimeseriesRetention:
+    """
+    Trims time series keys of a RedisManager off the write path.
+
+    Writers only note which keys received samples; keys already in Redis are
+    picked up from the device key registries when the background thread
+    starts. The thread trims a key once its trim interval has elapsed or once
+    it has collected enough writes since the last trim, using the retention
+    of the key's component.
+    The same thread lets the time series backend seal its chunks.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        # key -> {"component", "retention", "writes", "last_trim"}
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "runs": 0,
+            "keys_trimmed": 0,
+            "reclaimed_total": 0,
+            "last_run_reclaimed": 0,
+            "last_run_ms": 0.0,
+        }
+
+    def get_retention_seconds(self, component):
+        """Retention of a component, falling back to the 'default' entry"""
+        retention = settings.TIMESERIES_RETENTION_SECONDS
+        return retention.get(component, retention['default'])
+
+    def note_write(self, key, component, retention_seconds=None):
+        """Record that a sample was appended to a time series key
+
+        retention_seconds overrides the component's retention, e.g. for rollup tiers.
+        """
+        with self._lock:
+            state = self._keys.get(key)
+            if state is None:
+                state = {"component": component, "retention": retention_seconds,
+                         "writes": 0, "last_trim": time.monotonic()}
+                self._keys[key] = state
+            state["writes"] += 1
+        self._ensure_started()
+
+    def forget_keys(self, keys):
+        """Stop tracking keys, e.g. after a device's data was deleted"""
+        with self._lock:
+            for key in keys:
+                self._keys.pop(key, None)
+        for key in keys:
+            self.manager.timeseries.forget(key)
+
+    def seed_keys(self):
+        """
+        Track the time series and rollup keys listed in the device key
+        registries, e.g. written before a restart, so they are trimmed even if
+        they never get another sample
+
+        Returns:
+            int: Number of keys added
+        """
+        client = self.manager.redis_client
+        tier_retention = {tier['name']: tier['retention_seconds'] for tier in self.manager.rollups.get_tiers()}
+        found = {}
+        for registry_key in client.scan_iter(match='device:*:keys', count=1000):
+            prefix = registry_key[:-len('keys')]
+            for key in client.smembers(registry_key):
+                if not key.startswith(prefix):
+                    continue
+                fields = key[len(prefix):].split(':')
+                # Storage keys of a backend (e.g. chunks) have more fields than the series keys
+                if fields[0] == 'timeseries' and len(fields) == 3:
+                    found[key] = (fields[1], None)
+                elif fields[0] == 'rollup' and len(fields) == 5 and fields[1] in tier_retention:
+                    found[key] = (fields[2], tier_retention[fields[1]])
+
+        # Due on the first pass
+        last_trim = time.monotonic() - settings.TIMESERIES_TRIM_INTERVAL_SECONDS
+        added = 0
+        with self._lock:
+            for key, (component, retention_seconds) in found.items():
+                if key not in self._keys:
+                    self._keys[key] = {"component": component, "retention": retention_seconds,
+                                       "writes": 0, "last_trim": last_trim}
+                    added += 1
+        if added:
+            logger.info(f"Tracking {added} existing time series keys of db{self.manager.db_number} for retention")
+        return added
+
+    def _get_due_keys(self, force=False):
+        now = time.monotonic()
+        interval = settings.TIMESERIES_TRIM_INTERVAL_SECONDS
+        threshold = settings.TIMESERIES_TRIM_WRITE_THRESHOLD
+        due = []
+        with self._lock:
+            for key, state in self._keys.items():
+                # Keys without new writes are still trimmed every interval, or they would keep samples forever
+                if force or state["writes"] >= threshold or now - state["last_trim"] >= interval:
+                    due.append((key, state["retention"] or self.get_retention_seconds(state["component"])))
+                    state["writes"] = 0
+                    state["last_trim"] = now
+        return due
+
+    def trim_due_keys(self, force=False):
+        """
+        Trim every due key in one pipeline
+
+        Returns:
+            int: Number of samples reclaimed
+        """
+        due = self._get_due_keys(force)
+        if not due:
+            return 0
+
+        started = time.monotonic()
+        # Cutoff from server time so skewed device clocks cannot cause mass deletes
+        now_ms = int(time.time() * 1000)
+        pipeline = self.manager.redis_client.pipeline(transaction=False)
+        counters = []
+        for key, retention_seconds in due:
+            cutoff_ms = now_ms - retention_seconds * 1000
+            counters.extend(self.manager.timeseries.trim(pipeline, key, cutoff_ms))
+        # Replies are backend specific (e.g. chunks removed); each backend counts samples
+        reclaimed = sum(count(reply or 0) for count, reply in zip(counters, pipeline.execute()))
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._stats_lock:
+            self._stats["runs"] += 1
+            self._stats["keys_trimmed"] += len(due)
+            self._stats["reclaimed_total"] += reclaimed
+            self._stats["last_run_reclaimed"] = reclaimed
+            self._stats["last_run_ms"] = elapsed_ms
+        if reclaimed:
+            logger.debug(f"Trimmed {len(due)} time series keys, reclaimed {reclaimed} points in {elapsed_ms:.1f} ms")
+        return reclaimed
+
+    def get_stats(self):
+        """Get trim counters and the number of tracked keys"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._lock:
+            stats["tracked_keys"] = len(self._keys)
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"timeseries-retention-db{self.manager.db_number}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        try:
+            self.seed_keys()
+        except Exception as e:
+            logger.error(f"Failed to seed time series retention keys: {e}")
+        while not self._stop_event.wait(settings.TIMESERIES_TRIM_TICK_SECONDS):
+            try:
+                self.manager.timeseries.seal_due()
+                self.trim_due_keys()
+            except Exception as e:
+                logger.error(f"Time series retention run failed: {e}")
+
+    def stop(self):
+        """Stop the background thread after a final seal and trim of every tracked key"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.manager.timeseries.seal_due(force=True)
+            self.trim_due_keys(force=True)
+        except Exception as e:
+            logger.error(f"Final time series trim failed: {e}")
@@ -0,0 +1,311 @@
+import threading
+import time
+import logging
+from django.conf import settings
+from .downsampling import aggregate_values
+from .timeseries_backends import format_local_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Aggregates kept per rollup bucket; avg is derived from sum / count
+ROLLUP_AGGREGATES = ('min', 'max', 'sum', 'count', 'first', 'last')
+
+# Stored aggregates needed to answer each query aggregator
+_REQUIRED_AGGREGATES = {
+    'min': ('min',),
+    'max': ('max',),
+    'avg': ('sum', 'count'),
+    'sum': ('sum',),
+    'count': ('count',),
+    'first': ('first',),
+    'last': ('last',),
+}
+
+# How a query bucket combines the stored aggregates of the rollup buckets it spans
+_MERGE_AGGREGATES = {
+    'min': 'min',
+    'max': 'max',
+    'sum': 'sum',
+    'count': 'sum',
+    'first': 'first',
+    'last': 'last',
+}
+
+
+class _Bucket:
+    __slots__ = ('start', 'min', 'max', 'sum', 'count', 'first', 'last', 'touched', 'closed')
+
+    def __init__(self, start, value):
+        self.start = start
+        self.closed = False
+        self.min = self.max = self.sum = self.first = self.last = value
+        self.count = 1
+        self.touched = time.monotonic()
+
+    def add(self, value):
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.sum += value
+        self.count += 1
+        self.last = value
+        self.touched = time.monotonic()
+
+
+class TimeseriesRollups:
+    """
+    Aggregates monitoring samples of a RedisManager into coarser tiers
+    (TIMESERIES_ROLLUP_TIERS, e.g. 1s/1m/1h) that outlive the raw history.
+
+    Writers feed every numeric sample into one open bucket per series and
+    tier, kept in memory. A bucket closes when a sample of a later bucket
+    arrives or when it was idle for its resolution plus
+    TIMESERIES_ROLLUP_GRACE_SECONDS. A background thread writes closed
+    buckets through the manager's time series backend, one key per stored
+    aggregate:
+
+        device:{id}:rollup:{tier}:{component}:{parameter}:{aggregate}
+
+    Queries merge the buckets not written yet (open, closed or being
+    flushed) into the stored ones, so the newest part of a range is there.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+        # (device_id, component, parameter) -> {tier name: open _Bucket}
+        self._open = {}
+        # [(device_id, component, parameter, tier, _Bucket)] waiting to be written
+        self._closed = []
+        # Same, taken by the flush running now
+        self._flushing = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._stats = {
+            "samples": 0,
+            "late_samples": 0,
+            "buckets_written": 0,
+            "flushes": 0,
+            "last_flush_ms": 0.0,
+        }
+
+    @staticmethod
+    def get_tiers():
+        """Configured tiers, finest first"""
+        return sorted(settings.TIMESERIES_ROLLUP_TIERS, key=lambda tier: tier['resolution_seconds'])
+
+    def _get_rollup_key(self, device_id, tier, component, parameter, aggregate):
+        """Generate rollup key"""
+        return f"device:{device_id}:rollup:{tier}:{component}:{parameter}:{aggregate}"
+
+    def note_sample(self, device_id, component, parameter, score_ms, value):
+        """Add one numeric sample to the open bucket of every tier"""
+        if not settings.TIMESERIES_ROLLUPS_ENABLED:
+            return
+        series = (device_id, component, parameter)
+        with self._lock:
+            self._stats["samples"] += 1
+            open_buckets = self._open.setdefault(series, {})
+            for tier in self.get_tiers():
+                resolution_ms = tier['resolution_seconds'] * 1000
+                start = int(score_ms) - int(score_ms) % resolution_ms
+                bucket = open_buckets.get(tier['name'])
+                if bucket is None or start > bucket.start:
+                    if bucket is not None and not bucket.closed:
+                        self._closed.append((device_id, component, parameter, tier, bucket))
+                    open_buckets[tier['name']] = _Bucket(start, value)
+                elif start == bucket.start and not bucket.closed:
+                    bucket.add(value)
+                else:
+                    # Bucket already written; drop instead of writing it twice
+                    self._stats["late_samples"] += 1
+        self._ensure_started()
+
+    def forget_device(self, device_id):
+        """Drop open and pending buckets of a device, e.g. after its data was deleted"""
+        with self._lock:
+            for series in [series for series in self._open if series[0] == device_id]:
+                del self._open[series]
+            self._closed = [entry for entry in self._closed if entry[0] != device_id]
+
+    def _unwritten_buckets(self, device_id, component, parameter, tier, start_ms, end_ms):
+        """Aggregates of the buckets of a series and tier not in Redis yet, as {start: {aggregate: value}}"""
+        series = (device_id, component, parameter)
+        with self._lock:
+            buckets = [bucket for dev, comp, param, pending_tier, bucket in self._closed + self._flushing
+                       if (dev, comp, param) == series and pending_tier['name'] == tier['name']]
+            bucket = self._open.get(series, {}).get(tier['name'])
+            if bucket is not None and not bucket.closed:
+                buckets.append(bucket)
+            return {
+                bucket.start: {aggregate: float(getattr(bucket, aggregate)) for aggregate in ROLLUP_AGGREGATES}
+                for bucket in buckets
+                if start_ms <= bucket.start and (end_ms is None or bucket.start <= end_ms)
+            }
+
+    def _collect_closed(self, force=False):
+        now = time.monotonic()
+        grace = settings.TIMESERIES_ROLLUP_GRACE_SECONDS
+        with self._lock:
+            for (device_id, component, parameter), open_buckets in self._open.items():
+                for tier in self.get_tiers():
+                    bucket = open_buckets.get(tier['name'])
+                    if bucket is None or bucket.closed:
+                        continue
+                    if force or now - bucket.touched >= tier['resolution_seconds'] + grace:
+                        self._closed.append((device_id, component, parameter, tier, bucket))
+                        # Stays in place so late samples of this bucket are still rejected
+                        bucket.closed = True
+            closed, self._closed = self._closed, []
+            self._flushing = closed
+        return closed
+
+    def flush(self, force=False):
+        """
+        Write closed buckets in one pipeline
+
+        Returns:
+            int: Number of buckets written
+        """
+        closed = self._collect_closed(force)
+        if not closed:
+            return 0
+
+        started = time.monotonic()
+        timeseries = self.manager.timeseries
+        try:
+            with self.manager.write_batch() as batch:
+                for device_id, component, parameter, tier, bucket in closed:
+                    timestamp_local = format_local_timestamp(bucket.start)
+                    for aggregate in ROLLUP_AGGREGATES:
+                        key = self._get_rollup_key(device_id, tier['name'], component, parameter, aggregate)
+                        timeseries.append(batch, key, bucket.start,
+                                          {"value": float(getattr(bucket, aggregate)), "timestamp_local": timestamp_local})
+                        self.manager.retention.note_write(key, component, tier['retention_seconds'])
+                        self.manager.register_keys(batch, device_id, key)
+        except Exception:
+            with self._lock:
+                # Kept for the next flush; still marked closed so late samples stay rejected
+                self._closed = closed + self._closed
+            raise
+        finally:
+            with self._lock:
+                self._flushing = []
+
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._lock:
+            self._stats["buckets_written"] += len(closed)
+            self._stats["flushes"] += 1
+            self._stats["last_flush_ms"] = elapsed_ms
+        return len(closed)
+
+    def select_tier(self, component, start_ms, bucket_ms):
+        """
+        Cheapest tier able to answer a query starting at start_ms with buckets
+        of bucket_ms, or None if the raw samples should be used.
+
+        Picks the coarsest tier whose resolution fits in a bucket and whose
+        retention reaches back to start_ms. When the raw history does not
+        reach that far either, the fitting tier with the longest retention
+        is used.
+        """
+        if not settings.TIMESERIES_ROLLUPS_ENABLED:
+            return None
+        now_ms = int(time.time() * 1000)
+        fitting = [tier for tier in self.get_tiers() if tier['resolution_seconds'] * 1000 <= bucket_ms]
+        if not fitting:
+            return None
+        covering = [tier for tier in fitting if now_ms - tier['retention_seconds'] * 1000 <= start_ms]
+        if covering:
+            return covering[-1]
+        raw_retention_ms = self.manager.retention.get_retention_seconds(component) * 1000
+        if now_ms - raw_retention_ms <= start_ms:
+            return None
+        return max(fitting, key=lambda tier: tier['retention_seconds'])
+
+    def aggregate(self, device_id, component, parameter, tier, start_ms, end_ms, bucket_ms, aggregators):
+        """
+        Re-aggregate the rollup buckets of a tier into buckets of bucket_ms
+
+        Returns:
+            list: [(bucket_start_ms, {aggregator: value})] in time order
+        """
+        stored = sorted({aggregate for aggregator in aggregators for aggregate in _REQUIRED_AGGREGATES[aggregator]})
+        timeseries = self.manager.timeseries
+        # Rollup buckets are scored by their start; include the one holding start_ms
+        resolution_ms = tier['resolution_seconds'] * 1000
+        start_ms = int(start_ms) - int(start_ms) % resolution_ms
+        unwritten = self._unwritten_buckets(device_id, component, parameter, tier, start_ms, end_ms)
+        merged = {}
+        for aggregate in stored:
+            key = self._get_rollup_key(device_id, tier['name'], component, parameter, aggregate)
+            points = list(timeseries.points(key, start_ms, end_ms))
+            # A bucket written while this ran is taken from Redis only
+            written = {int(ts) for ts, _ in points}
+            points += [(ts, values[aggregate]) for ts, values in unwritten.items() if ts not in written]
+            for ts, value in points:
+                bucket = int(ts) - int(ts) % bucket_ms
+                merged.setdefault(bucket, {}).setdefault(aggregate, []).append((ts, value))
+
+        result = []
+        for bucket, values in sorted(merged.items()):
+            combined = {
+                aggregate: aggregate_values([value for _, value in sorted(points)], _MERGE_AGGREGATES[aggregate])
+                for aggregate, points in values.items()
+            }
+            entry = {}
+            for aggregator in aggregators:
+                if aggregator == 'avg':
+                    if combined.get('count'):
+                        entry['avg'] = combined['sum'] / combined['count']
+                elif aggregator in combined:
+                    entry[aggregator] = combined[aggregator]
+            if entry:
+                result.append((bucket, entry))
+        return result
+
+    def points(self, device_id, component, parameter, tier, start_ms, end_ms):
+        """Average of each rollup bucket of a tier as [(bucket_start_ms, value)]"""
+        return [(bucket, values['avg']) for bucket, values in
+                self.aggregate(device_id, component, parameter, tier, start_ms, end_ms,
+                               tier['resolution_seconds'] * 1000, ('avg',))
+                if 'avg' in values]
+
+    def get_stats(self):
+        """Get rollup counters and the number of open series"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["open_series"] = len(self._open)
+            stats["pending_buckets"] = len(self._closed)
+        stats["tiers"] = [tier['name'] for tier in self.get_tiers()]
+        return stats
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(
+                target=self._run, name=f"timeseries-rollups-db{self.manager.db_number}", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.wait(settings.TIMESERIES_ROLLUP_FLUSH_SECONDS):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Time series rollup flush failed: {e}")
+
+    def stop(self):
+        """Stop the background thread after writing every open bucket"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        try:
+            self.flush(force=True)
+        except Exception as e:
+            logger.error(f"Final time series rollup flush failed: {e}")
@@ -0,0 +1,123 @@
+import concurrent.futures
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerPoolFull(RuntimeError):
+    """Raised when a task cannot be queued because the pool's queue stays full"""
+
+
+class WorkerPool:
+    """
+    Fixed set of long-lived, named worker threads fed from a bounded queue.
+
+    Threads are started on first use and live until shutdown(), so no thread
+    is created per task. When the queue is full, submit() blocks the caller
+    (backpressure) or raises WorkerPoolFull if it cannot queue within
+    `timeout` seconds.
+    """
+
+    def __init__(self, name, size, queue_size):
+        self.name = name
+        self.size = max(1, int(size))
+        self._queue = queue.Queue(maxsize=max(1, int(queue_size)))
+        self._threads = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._busy = 0
+        self._stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+            "total_queue_wait_ms": 0.0,
+            "max_queue_wait_ms": 0.0,
+        }
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads or self._shutdown:
+                return
+            for i in range(self.size):
+                thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, fn, *args, block=True, timeout=None, **kwargs):
+        """
+        Queue fn(*args, **kwargs) and return a concurrent.futures.Future.
+        With block=False or a timeout, raises WorkerPoolFull instead of
+        waiting longer for queue space.
+        """
+        if self._shutdown:
+            raise RuntimeError(f"Worker pool {self.name} is shut down")
+        self._ensure_started()
+        future = concurrent.futures.Future()
+        try:
+            self._queue.put((future, fn, args, kwargs, time.monotonic()), block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise WorkerPoolFull(f"Worker pool {self.name} queue is full ({self._queue.maxsize} tasks)")
+        with self._lock:
+            self._stats["submitted"] += 1
+            self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], self._queue.qsize())
+        return future
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, fn, args, kwargs, queued = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            wait_ms = (time.monotonic() - queued) * 1000
+            with self._lock:
+                self._busy += 1
+                self._stats["total_queue_wait_ms"] += wait_ms
+                self._stats["max_queue_wait_ms"] = max(self._stats["max_queue_wait_ms"], wait_ms)
+            try:
+                future.set_result(fn(*args, **kwargs))
+                failed = False
+            except BaseException as e:
+                future.set_exception(e)
+                failed = True
+            with self._lock:
+                self._busy -= 1
+                self._stats["failed" if failed else "completed"] += 1
+
+    def shutdown(self, wait=True):
+        """Let the workers finish queued tasks, then stop them"""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            threads = list(self._threads)
+        for _ in threads:
+            # Blocks while the queue is full, i.e. until workers make room
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def get_metrics(self):
+        """Get queue depth, busy workers and task counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["busy"] = self._busy
+            stats["threads"] = len(self._threads)
+        started = stats["completed"] + stats["failed"] + stats["busy"]
+        total_queue_wait_ms = stats.pop("total_queue_wait_ms")
+        stats["avg_queue_wait_ms"] = total_queue_wait_ms / started if started else 0.0
+        stats["size"] = self.size
+        stats["queue_depth"] = self._queue.qsize()
+        stats["queue_size"] = self._queue.maxsize
+        return stats
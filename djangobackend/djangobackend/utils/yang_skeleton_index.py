@@ -0,0 +1,151 @@
+import os
+import threading
+import logging
+
+from lxml import etree
+
+from ..settings import BASE_DIR
+from .common import clean_xml_from_namespaces, get_namespace_attribute_dictionary
+from .component_to_yang_module_map import YANG_MODULES
+
+logger = logging.getLogger(__name__)
+
+# Parsed skeleton indexes keyed by skeleton file path
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class SkeletonIndex:
+    """
+    In-memory index of one YANG XML skeleton.
+
+    Maps every element name to the xpaths (in document order) and namespaces
+    it appears under, so builders can resolve a parameter without searching
+    the skeleton tree.
+    """
+
+    def __init__(self, xml_file_path, mtime, root):
+        self.xml_file_path = xml_file_path
+        self.mtime = mtime
+        # Same tag -> xmlns mapping the builders used to compute per request
+        self.namespaces = get_namespace_attribute_dictionary(root)
+        # name -> list of (xpath, namespace, is_leaf)
+        self.elements = {}
+
+        inherited_namespaces = {}
+        for elem in root.getroot().iter():
+            if not isinstance(elem.tag, str):
+                continue
+            parent = elem.getparent()
+            namespace = elem.get("xmlns") or inherited_namespaces.get(parent)
+            inherited_namespaces[elem] = namespace
+            if parent is None:
+                continue
+            is_leaf = not any(isinstance(child.tag, str) for child in elem)
+            self.elements.setdefault(elem.tag, []).append(
+                (root.getpath(elem), namespace, is_leaf))
+
+    def get_xpath(self, element_name):
+        """Return the first xpath of an element, like root.find('.//name')"""
+        entries = self.elements.get(element_name)
+        return entries[0][0] if entries else None
+
+    def get_namespace(self, element_name):
+        """Return the namespace of the first element with this name"""
+        entries = self.elements.get(element_name)
+        return entries[0][1] if entries else None
+
+    def get_ambiguous_leaves(self):
+        """Return leaf names that appear in more than one place with all their xpaths"""
+        report = {}
+        for name, entries in self.elements.items():
+            leaf_paths = [xpath for xpath, _, is_leaf in entries if is_leaf]
+            if len(leaf_paths) > 1:
+                report[name] = leaf_paths
+        return report
+
+
+def get_xml_skeleton_file_path(component, device_id=None):
+    """Resolve the XML skeleton used to build payloads for a component"""
+    # Try device-specific XML skeleton first, then fall back to components_xml
+    if device_id:
+        from .data import get_device_xml_skeletons_dir
+        device_xml_dir = get_device_xml_skeletons_dir(device_id)
+        xml_file_path = os.path.join(device_xml_dir, f"{YANG_MODULES[component]}.xml")
+
+        # If device-specific file doesn't exist, fall back to components_xml
+        if not os.path.exists(xml_file_path):
+            xml_file_path = os.path.join(
+                BASE_DIR, 'data', 'components_xml', f"{YANG_MODULES[component]}.xml")
+    else:
+        # Use components_xml as default
+        xml_file_path = os.path.join(
+            BASE_DIR, 'data', 'components_xml', f"{YANG_MODULES[component]}.xml")
+
+    # Check if the XML file exists
+    if not os.path.exists(xml_file_path):
+        raise FileNotFoundError(f"XML skeleton file not found: {xml_file_path}. Please generate schemas for this component first.")
+
+    return xml_file_path
+
+
+def get_skeleton_index(component, device_id=None):
+    """
+    Get the index for a component skeleton, building it on first use
+
+    The index is rebuilt when the skeleton file's mtime changes.
+    """
+    xml_file_path = get_xml_skeleton_file_path(component, device_id)
+    mtime = os.stat(xml_file_path).st_mtime_ns
+
+    with _indexes_lock:
+        index = _indexes.get(xml_file_path)
+    if index is not None and index.mtime == mtime:
+        return index
+
+    parser = etree.XMLParser(remove_blank_text=True)
+    root = etree.parse(xml_file_path, parser)
+    clean_xml_from_namespaces(root)
+
+    index = SkeletonIndex(xml_file_path, mtime, root)
+    ambiguous_leaves = index.get_ambiguous_leaves()
+    if ambiguous_leaves:
+        logger.info(f"Skeleton {xml_file_path} has ambiguous leaves: {sorted(ambiguous_leaves)}")
+
+    with _indexes_lock:
+        _indexes[xml_file_path] = index
+    return index
+
+
+def invalidate_skeleton_index(device_id=None):
+    """
+    Drop parsed skeleton indexes after skeletons are rewritten
+
+    Args:
+        device_id (str, optional): Only drop indexes of this device's
+            skeletons. When omitted every index is dropped.
+    """
+    with _indexes_lock:
+        if device_id is None:
+            _indexes.clear()
+            return
+        device_dir_name = f'device_{device_id}'
+        for path in [p for p in _indexes if device_dir_name in p.split(os.sep)]:
+            del _indexes[path]
+
+
+def get_skeleton_ambiguity_report(device_id=None):
+    """
+    Report leaf names that appear in more than one place per component
+
+    Returns:
+        dict: component -> {leaf name: [xpaths]}
+    """
+    report = {}
+    for component in YANG_MODULES:
+        try:
+            index = get_skeleton_index(component, device_id)
+        except FileNotFoundError:
+            continue
+        report[component] = index.get_ambiguous_leaves()
+    return report
@@ -1,22 +1,30 @@
 # import random
 
+from django.conf import settings
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 
 from .utils.data import ERROR_MESSAGES, cleanup_device_data
 from .utils.generate_schema_dependencies import generate_schema_dependencies
 from .utils.generate_schemas import generate_yang_schemas
+from .utils.yang_skeleton_index import get_skeleton_ambiguity_report
 from .utils.common import validate_device_operation
 from .utils.redis_manager import monitoring_redis, running_config_redis, operational_config_redis
-from .utils.background_poller import device_poller
+from .utils.background_poller import device_poller, get_active_poller, announce_device_cleanup
 from .utils.device_storage import get_all_devices, save_device, delete_device, get_device_by_id
+from .utils.device_connection_manager import get_session_pool_metrics
+from .utils.downsampling import AGGREGATORS, parse_epoch_ms, parse_step_ms
 import traceback
 
 @api_view(['GET'])
 def get_redis_keys(request):
-    """Temporary endpoint to list all keys in monitoring Redis DB"""
+    """Temporary endpoint to list keys in monitoring Redis DB (of one device with ?deviceId=)"""
     try:
-        keys = monitoring_redis.redis_client.keys('*')
+        device_id = request.GET.get('deviceId')
+        if device_id:
+            keys = monitoring_redis.get_device_keys(device_id)
+        else:
+            keys = monitoring_redis.redis_client.scan_iter(match='*', count=1000)
         return Response({"data": [k for k in keys]})
     except Exception as e:
         return Response({"error": {"message": f"Failed to get Redis keys: {str(e)}"}}, status=500)
@@ -32,12 +40,15 @@ def device_cleanup(request):
             return Response({"error": {"message": error_message}}, status=400)
         
         # Stop polling for this device
-        device_poller.stop_polling(device_id)
+        if settings.POLLER_AUTOSTART_IN_WEB:
+            get_active_poller().stop_polling(device_id)
         
         # Clean up device data from Redis
         monitoring_redis.cleanup_device_data(device_id)
         running_config_redis.cleanup_device_data(device_id)
         operational_config_redis.cleanup_device_data(device_id)
+        # Pollers in other processes (run_poller, shards) drop their cached values
+        announce_device_cleanup(device_id)
         
         # Clean up device data from legacy storage
         cleanup_device_data(device_id)
@@ -83,6 +94,17 @@ def device_schemas(request):
     except Exception as e:
         return Response({"error": {"message": f"Schema generation error: {str(e)}"}}, status=500)
 
+
+@api_view(['GET'])
+def device_schema_ambiguities(request):
+    """Report skeleton leaf names that resolve to more than one xpath"""
+    try:
+        device_id = request.GET.get('deviceId')
+        report = get_skeleton_ambiguity_report(device_id)
+        return Response({"data": report})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to build schema ambiguity report: {str(e)}"}}, status=500)
+
         
 def get_subrequests_array(request):
     # Accept list or dict; return empty list for None or unexpected types
@@ -117,7 +139,8 @@ def device_data(request):
             return Response({"error": {"message": error_message}}, status=400)
         
         # Start background polling for this device if not already polling
-        device_poller.start_polling(device_id)
+        if settings.POLLER_AUTOSTART_IN_WEB:
+            get_active_poller().start_polling(device_id)
         
         # Check if original data_params was a single dict (not a list)
         is_single_request = type(data_params) == dict
@@ -260,9 +283,48 @@ def redis_monitoring_data(request):
         return Response({"error": {"message": f"Failed to get monitoring data: {str(e)}"}}, status=500)
 
 
+@api_view(['POST'])
+def redis_monitoring_batch(request):
+    """Get current monitoring values of many devices and components in one request
+
+    Body: {"selectors": [{"deviceId", "component", "parameters": [...]}, ...]}
+    ("parameter" is accepted for a single one). Returns one
+    {"deviceId", "component", "values", "timestamp_local"} entry per selector.
+    """
+    try:
+        selectors = request.data.get('selectors') if isinstance(request.data, dict) else None
+        if not isinstance(selectors, list) or not selectors:
+            return Response({"error": {"message": "Missing required parameter: selectors"}}, status=400)
+        if len(selectors) > settings.MONITORING_BATCH_MAX_SELECTORS:
+            return Response({"error": {"message": f"Too many selectors (max {settings.MONITORING_BATCH_MAX_SELECTORS})"}}, status=400)
+
+        parsed = []
+        for i, selector in enumerate(selectors):
+            if not isinstance(selector, dict):
+                return Response({"error": {"message": f"Selector {i} must be an object"}}, status=400)
+            device_id = selector.get('deviceId')
+            component = selector.get('component')
+            parameters = selector.get('parameters')
+            if parameters is None and selector.get('parameter'):
+                parameters = [selector['parameter']]
+            if not device_id or not component or not isinstance(parameters, list) or not parameters:
+                return Response({"error": {"message": f"Selector {i} needs deviceId, component and parameters"}}, status=400)
+            parsed.append((str(device_id), component, [str(param) for param in parameters]))
+
+        data = monitoring_redis.get_monitoring_data_multi(parsed)
+        return Response({"data": data})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get monitoring batch: {str(e)}"}}, status=500)
+
+
 @api_view(['GET'])
 def redis_timeseries_data(request):
-    """Get historical time series data from Redis"""
+    """Get historical time series data from Redis
+
+    Query params: deviceId, component, parameter, count (newest N samples),
+    from/to (epoch s or ms), buckets or step (e.g. 500, 10s, 1m) and
+    agg (min|max|avg|sum|count|first|last|lttb)
+    """
     try:
         device_id = request.GET.get('deviceId')
         component = request.GET.get('component')
@@ -272,7 +334,23 @@ def redis_timeseries_data(request):
         if not device_id or not component or not parameter:
             return Response({"error": {"message": "Missing required parameters: deviceId, component, parameter"}}, status=400)
 
-        data = monitoring_redis.get_timeseries_data(device_id, component, parameter, count)
+        try:
+            start_ms = parse_epoch_ms(request.GET['from']) if request.GET.get('from') else None
+            end_ms = parse_epoch_ms(request.GET['to']) if request.GET.get('to') else None
+            buckets = int(request.GET['buckets']) if request.GET.get('buckets') else None
+            step_ms = parse_step_ms(request.GET['step']) if request.GET.get('step') else None
+        except ValueError as e:
+            return Response({"error": {"message": f"Invalid range parameters: {str(e)}"}}, status=400)
+        agg = request.GET.get('agg') or None
+        if agg and agg != 'lttb' and agg not in AGGREGATORS:
+            return Response({"error": {"message": f"Invalid agg '{agg}'"}}, status=400)
+        if (buckets is not None and buckets <= 0) or (step_ms is not None and step_ms <= 0):
+            return Response({"error": {"message": "buckets and step must be positive"}}, status=400)
+
+        data = monitoring_redis.get_timeseries_data(
+            device_id, component, parameter, count,
+            start_ms=start_ms, end_ms=end_ms, buckets=buckets, step_ms=step_ms, agg=agg
+        )
         return Response({"data": data})
     except Exception as e:
         return Response({"error": {"message": f"Failed to get time series data: {str(e)}"}}, status=500)
@@ -381,6 +459,49 @@ def redis_device_summary(request):
         return Response({"error": {"message": f"Failed to get device summary: {str(e)}"}}, status=500)
 
 
+@api_view(['GET'])
+def redis_write_stats(request):
+    """Get flush size and latency counters of batched Redis writes per DB"""
+    try:
+        return Response({"data": {
+            "monitoring": monitoring_redis.get_write_batch_stats(),
+            "running_config": running_config_redis.get_write_batch_stats(),
+            "operational_config": operational_config_redis.get_write_batch_stats(),
+            "change_filter": device_poller.change_filter.get_stats(),
+        }})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get Redis write stats: {str(e)}"}}, status=500)
+
+
+@api_view(['GET'])
+def redis_retention_stats(request):
+    """Get how many time series points background trimming reclaimed, and rollup counters"""
+    try:
+        stats = monitoring_redis.retention.get_stats()
+        stats["rollups"] = monitoring_redis.rollups.get_stats()
+        return Response({"data": stats})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get retention stats: {str(e)}"}}, status=500)
+
+
+@api_view(['GET'])
+def netconf_session_pools(request):
+    """Get NETCONF session pool wait time and utilization per device"""
+    try:
+        return Response({"data": get_session_pool_metrics()})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get session pool metrics: {str(e)}"}}, status=500)
+
+
+@api_view(['GET'])
+def poller_schedule_metrics(request):
+    """Get poll start jitter, duration and missed deadlines per device"""
+    try:
+        return Response({"data": get_active_poller().get_schedule_metrics()})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get poller metrics: {str(e)}"}}, status=500)
+
+
 @api_view(['GET', 'POST', 'PUT', 'DELETE'])
 def device_management(request):
     """Device management endpoint"""
@@ -429,4 +550,14 @@ def device_management(request):
                 return Response({"error": {"message": "Failed to delete device"}}, status=500)
     
     except Exception as e:
-        return Response({"error": {"message": f"Device management failed: {str(e)}"}}, status=500)
\ No newline at end of file
+        return Response({"error": {"message": f"Device management failed: {str(e)}"}}, status=500)
+
+
+@api_view(['GET'])
+def poller_cluster_assignments(request):
+    """Get the live poller nodes and the devices each one holds a lease on"""
+    try:
+        from .utils.poller_cluster import poller_cluster
+        return Response({"data": poller_cluster.get_assignments()})
+    except Exception as e:
+        return Response({"error": {"message": f"Failed to get poller assignments: {str(e)}"}}, status=500)
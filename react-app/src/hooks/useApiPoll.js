@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react';
 import { toast } from 'react-hot-toast';
-import { getRedisMonitoringData } from '../utils/api'; // use Redis instead of DEVICE_DATA_URL
+import { getRedisMonitoringDataMulti } from '../utils/api'; // use Redis instead of DEVICE_DATA_URL
 import { getCurrentDeviceId } from '../utils/utils';
 
 function useApiPoll(interval, requestData) {
@@ -31,22 +31,22 @@ function useApiPoll(interval, requestData) {
           return;
         }
 
-        const results = await Promise.all(
-          requestData.map(({ component, parameter, key }) =>
-            getRedisMonitoringData(deviceId, component, parameter)
-              .then(res => ({
-                key,
-                data: {
-                  [parameter]: res?.data?.value ?? null,
-                  timestamp: res?.data?.timestamp ?? null
-                }
-              }))
-              .catch(err => ({
-                key,
-                error: { message: err.message }
-              }))
-          )
-        );
+        // One batch request for all entries, answered in order
+        let results;
+        try {
+          const res = await getRedisMonitoringDataMulti(
+            requestData.map(({ component, parameter }) => ({ deviceId, component, parameters: [parameter] }))
+          );
+          results = requestData.map(({ parameter, key }, index) => ({
+            key,
+            data: {
+              [parameter]: res?.data?.[index]?.values?.[parameter] ?? null,
+              timestamp: res?.data?.[index]?.timestamp_local ?? null
+            }
+          }));
+        } catch (err) {
+          results = requestData.map(({ key }) => ({ key, error: { message: err.message } }));
+        }
 
         setData(results);
       } catch (e) {
@@ -0,0 +1,75 @@
+import { useEffect, useState } from 'react';
+import { REDIS_MONITORING_STREAM_URL } from '../utils/data';
+import { getCurrentDeviceId } from '../utils/utils';
+
+// Live monitoring values pushed by the backend (server-sent events) instead of polling.
+// Returns { data, connected }: data is { [component]: { [parameter]: { value, timestamp_local } } }
+// for the current device, connected tells whether the stream is open. Pages keep polling
+// while it is not, e.g. when the backend does not run under ASGI (djangobackend.asgi).
+function useMonitoringStream(components) {
+  const [data, setData] = useState({});
+  const [connected, setConnected] = useState(false);
+  const [deviceId, setDeviceId] = useState(getCurrentDeviceId());
+  const componentFilter = Array.isArray(components) ? components.join(',') : '';
+
+  useEffect(() => {
+    const handleDeviceChange = (event) => {
+      setDeviceId(event.detail?.deviceId || null);
+    };
+
+    window.addEventListener('deviceChange', handleDeviceChange);
+    return () => window.removeEventListener('deviceChange', handleDeviceChange);
+  }, []);
+
+  useEffect(() => {
+    setData({});
+    setConnected(false);
+    if (!deviceId) {
+      return;
+    }
+
+    let url = `${REDIS_MONITORING_STREAM_URL}?deviceId=${encodeURIComponent(deviceId)}`;
+    if (componentFilter) {
+      url += `&component=${encodeURIComponent(componentFilter)}`;
+    }
+    const source = new EventSource(url);
+    source.onopen = () => setConnected(true);
+
+    source.addEventListener('change', (event) => {
+      try {
+        const { component, parameter, value, timestamp_local } = JSON.parse(event.data);
+        setData(prev => ({
+          ...prev,
+          [component]: {
+            ...prev[component],
+            [parameter]: { value, timestamp_local },
+          },
+        }));
+      } catch (e) {
+        console.error('Monitoring stream: could not parse event', e);
+      }
+    });
+    // EventSource reconnects by itself after errors; poll until it is back
+    source.onerror = () => {
+      setConnected(false);
+      console.warn('Monitoring stream disconnected, reconnecting');
+    };
+
+    return () => source.close();
+  }, [deviceId, componentFilter]);
+
+  return { data, connected };
+}
+
+// { [parameter]: value } of one component's stream entries
+export function getStreamValues(componentData) {
+  const values = {};
+  Object.entries(componentData || {}).forEach(([parameter, entry]) => {
+    if (entry?.value !== null && entry?.value !== undefined) {
+      values[parameter] = entry.value;
+    }
+  });
+  return values;
+}
+
+export default useMonitoringStream;
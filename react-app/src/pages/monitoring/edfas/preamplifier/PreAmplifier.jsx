@@ -1,7 +1,8 @@
 import { Box } from '@mui/material';
 import { useEffect, useState, useMemo } from 'react';
-import { getRedisMonitoringData } from '../../../../utils/api';
+import { getRedisMonitoringValues } from '../../../../utils/api';
 import useDataPollInterval from '../../../../hooks/useDataPollInterval';
+import useMonitoringStream, { getStreamValues } from '../../../../hooks/useMonitoringStream';
 import {
   EDFA_PARAMS,
   EDFA_PLOTTABLE_PARAMETERS,
@@ -20,19 +21,8 @@ async function fetchPreamplifierData(currentDeviceId) {
     EDFA_PARAMS.MeasuredGain,
   ];
 
-  const dataPromises = paramsToFetch.map(param =>
-    getRedisMonitoringData(currentDeviceId, `edfa-${EDFA_TYPE.Preamplifier}`, param)
-  );
-
-  const results = await Promise.all(dataPromises);
-  
-  const fetchedData = {};
-  results.forEach((res, index) => {
-    if (res?.data?.value !== undefined) {
-      fetchedData[paramsToFetch[index]] = res.data.value;
-    }
-  });
-  return fetchedData;
+  // All parameters in one batch request
+  return await getRedisMonitoringValues(currentDeviceId, `edfa-${EDFA_TYPE.Preamplifier}`, paramsToFetch);
 }
 
 function Preamplifier() {
@@ -40,6 +30,8 @@ function Preamplifier() {
   const [currentEdfaData, setCurrentEdfaData] = useState(null);
   const pollInterval = useDataPollInterval();
   const currentDeviceId = getCurrentDeviceId();
+  const component = `edfa-${EDFA_TYPE.Preamplifier}`;
+  const { data: streamData, connected: streamConnected } = useMonitoringStream([component]);
 
   useEffect(() => {
     let intervalId;
@@ -49,10 +41,20 @@ function Preamplifier() {
         setCurrentEdfaData(data);
       };
       poll(); // Initial fetch
-      intervalId = setInterval(poll, pollInterval);
+      // Changes arrive over the monitoring stream while it is connected
+      if (!streamConnected) {
+        intervalId = setInterval(poll, pollInterval);
+      }
     }
     return () => clearInterval(intervalId);
-  }, [pollInterval, currentDeviceId]);
+  }, [pollInterval, currentDeviceId, streamConnected]);
+
+  useEffect(() => {
+    const values = getStreamValues(streamData[component]);
+    if (streamConnected && Object.keys(values).length) {
+      setCurrentEdfaData(prev => ({ ...prev, ...values }));
+    }
+  }, [streamData, streamConnected, component]);
 
   useEffect(() => {
     if (currentEdfaData) {
@@ -1,8 +1,9 @@
 import { Box, Divider, Typography } from '@mui/material';
 import React, { useEffect, useMemo, useState } from 'react';
 import { useParams } from 'react-router-dom';
-import { getRedisMonitoringData, getRedisOperationalConfig } from '../../../utils/api';
+import { getRedisMonitoringValues, getRedisOperationalConfig } from '../../../utils/api';
 import useDataPollInterval from '../../../hooks/useDataPollInterval';
+import useMonitoringStream, { getStreamValues } from '../../../hooks/useMonitoringStream';
 import {
   OPTICAL_PORT_PARAMS,
   OPTICAL_PORT_PLOTTABLE_PARAMETERS,
@@ -35,19 +36,8 @@ async function fetchData(portNumber, currentDeviceId) {
     monitoringParamsToFetch.push(OPTICAL_PORT_PARAMS.OutputPower);
   }
 
-  // Fetch each monitoring parameter individually
-  const monitoringDataPromises = monitoringParamsToFetch.map(param =>
-    getRedisMonitoringData(currentDeviceId, componentName, param)
-  );
-
-  const monitoringResults = await Promise.all(monitoringDataPromises);
-
-  let monitoringValues = {};
-  monitoringResults.forEach((res, index) => {
-    if (res?.data?.value !== undefined) {
-      monitoringValues[monitoringParamsToFetch[index]] = res.data.value;
-    }
-  });
+  // Fetch all monitoring parameters in one batch request
+  const monitoringValues = await getRedisMonitoringValues(currentDeviceId, componentName, monitoringParamsToFetch);
 
   // Fetch individual operational configuration data (this part was already correct in logic)
   const operationalConfigParams = [
@@ -87,6 +77,13 @@ function OpticalPort() {
     return getPortType(params.port);
   }, [params.port]);
 
+  // Monitoring values are published per port of the grouped snapshot,
+  // operational config under the port's own component
+  const portSuffix = portType === PORT_TYPE.Multiplexer ? 'mux' : 'demux';
+  const groupedComponent = `optical-ports-${portSuffix}`;
+  const portComponent = `optical-port-${portSuffix}-${params.port}`;
+  const { data: streamData, connected: streamConnected } = useMonitoringStream([groupedComponent, portComponent]);
+
   useEffect(() => {
     let intervalId;
     if (pollInterval && currentDeviceId) {
@@ -95,10 +92,23 @@ function OpticalPort() {
         setCurrentPortData({ data });
       };
       poll(); // Initial fetch
-      intervalId = setInterval(poll, pollInterval);
+      // Changes arrive over the monitoring stream while it is connected
+      if (!streamConnected) {
+        intervalId = setInterval(poll, pollInterval);
+      }
     }
     return () => clearInterval(intervalId);
-  }, [pollInterval, params.port, currentDeviceId]);
+  }, [pollInterval, params.port, currentDeviceId, streamConnected]);
+
+  useEffect(() => {
+    const values = {
+      ...(streamData[groupedComponent]?.[params.port]?.value || {}),
+      ...getStreamValues(streamData[portComponent]),
+    };
+    if (streamConnected && Object.keys(values).length) {
+      setCurrentPortData(prev => ({ data: { ...prev?.data, ...values } }));
+    }
+  }, [streamData, streamConnected, groupedComponent, portComponent, params.port]);
 
   useEffect(() => {
     if (currentPortData) {
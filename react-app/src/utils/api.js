@@ -4,6 +4,7 @@ import {
   DEVICE_SCHEMA_DEPENDENCIES_URL,
   DEVICE_CLEANUP_URL,
   REDIS_MONITORING_URL,
+  REDIS_MONITORING_BATCH_URL,
   REDIS_RUNNING_CONFIG_URL,
   REDIS_OPERATIONAL_CONFIG_URL,
   REDIS_DEVICE_STATUS_URL,
@@ -67,6 +68,31 @@ export async function getRedisMonitoringData(deviceId, component, parameter) {
   const url = `${REDIS_MONITORING_URL}?deviceId=${deviceId}&component=${component}&parameter=${parameter}`;
   return await apiRequestSender(url, { method: 'GET' });
 }
+
+// Current values of many devices/components in one request.
+// selectors: [{ deviceId, component, parameters: [...] }]
+export async function getRedisMonitoringDataMulti(selectors) {
+  return await apiRequestSender(REDIS_MONITORING_BATCH_URL, {
+    method: 'POST',
+    body: JSON.stringify({ selectors }),
+    headers: {
+      'Content-Type': 'application/json',
+    },
+  });
+}
+
+// Current values of several parameters of one component in one request.
+// Returns { [parameter]: value } for the parameters that have a value.
+export async function getRedisMonitoringValues(deviceId, component, parameters) {
+  const res = await getRedisMonitoringDataMulti([{ deviceId, component, parameters }]);
+  const values = {};
+  Object.entries(res?.data?.[0]?.values || {}).forEach(([parameter, value]) => {
+    if (value !== null && value !== undefined) {
+      values[parameter] = value;
+    }
+  });
+  return values;
+}
  
 
 
@@ -6,6 +6,8 @@ export const DEVICE_CLEANUP_URL = 'http://localhost:8000/api/device_cleanup';
 
 // Redis API endpoints
 export const REDIS_MONITORING_URL = 'http://localhost:8000/api/redis/monitoring';
+export const REDIS_MONITORING_BATCH_URL = 'http://localhost:8000/api/redis/monitoring/batch';
+export const REDIS_MONITORING_STREAM_URL = 'http://localhost:8000/api/redis/stream';
 export const REDIS_RUNNING_CONFIG_URL = 'http://localhost:8000/api/redis/running_config';
 export const REDIS_OPERATIONAL_CONFIG_URL = 'http://localhost:8000/api/redis/operational_config';
 export const REDIS_DEVICE_STATUS_URL = 'http://localhost:8000/api/redis/device_status';